@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+from dog.guild_config import GuildConfigManager
+
+# Compares checking whether members can edit a guild's config by scanning the
+# `editors` list (like before editors were compiled) with `can_edit`, for
+# members with many roles against a config with many editors. Run from the
+# repository's root:
+#
+#     python -m benchmarks.editors [--editors 500] [--roles 100]
+
+GUILD_ID = 1
+
+
+class Guild:
+    def __init__(self, members) -> None:
+        self.id = GUILD_ID
+        self.owner_id = 0
+        self.get_member = members.get
+
+    def __str__(self):
+        # `into_str_id` falls back to this for anything but a `discord.Guild`
+        return str(self.id)
+
+
+class User:
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+    def __str__(self):
+        return f"user{self.id}#0001"
+
+
+def scan_editors(editors, user, member) -> bool:
+    # what can_edit used to do for every check
+    return (
+        str(user) in editors
+        or user.id in editors
+        or (member is not None and any(role.id in editors for role in member.roles))
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--editors", type=int, default=500)
+    parser.add_argument("--roles", type=int, default=100)
+    parser.add_argument("--checks", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    role_ids = range(10_000, 20_000)
+    # mostly role IDs that nobody has, so most checks have to look at everything
+    editors = [rng.randrange(10**6, 10**7) for _ in range(args.editors)]
+    editors += [f"someone{index}#0001" for index in range(args.editors // 10)]
+
+    members = {}
+    for user_id in range(100, 1100):
+        roles = rng.sample(role_ids, args.roles)
+        members[user_id] = SimpleNamespace(
+            id=user_id,
+            _roles=set(roles),
+            roles=[SimpleNamespace(id=role_id) for role_id in roles],
+        )
+    guild = Guild(members)
+    users = [User(rng.choice(list(members))) for _ in range(args.checks)]
+
+    # the config is stored in the working directory
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        manager = GuildConfigManager(SimpleNamespace(get_guild=lambda id: guild))
+        config = "editors:\n" + "".join(f"  - {editor!r}\n" for editor in editors)
+        asyncio.run(manager.persistent.put(str(GUILD_ID), config))
+        manager.can_edit(users[0], guild)  # parse the config ahead of time
+
+        started = time.perf_counter()
+        for user in users:
+            scan_editors(editors, user, guild.get_member(user.id))
+        scanned = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for user in users:
+            manager.can_edit(user, guild)
+        compiled = time.perf_counter() - started
+
+    print(f"{args.editors} editors, members with {args.roles} roles")
+    for label, elapsed in [("scanning editors", scanned), ("can_edit", compiled)]:
+        per_check = elapsed / args.checks * 1e6
+        print(f"{label:20} {elapsed:8.3f}s  {per_check:8.1f}µs/check")
+
+
+if __name__ == "__main__":
+    main()
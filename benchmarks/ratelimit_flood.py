@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from dog.web.ratelimit import MemoryBackend, SQLiteBackend
+
+# Floods the web ratelimiting backends with requests from distinct (spoofed)
+# addresses, reporting throughput and how much memory the buckets take up.
+# Run from the repository's root:
+#
+#     python -m benchmarks.ratelimit_flood [--requests 200000]
+
+
+def address(index: int) -> str:
+    return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+
+async def flood(backend, requests: int) -> float:
+    started = time.perf_counter()
+    for index in range(requests):
+        await backend.take(address(index), 5, 60.0)
+    return time.perf_counter() - started
+
+
+def report(label: str, requests: int, elapsed: float, memory: int) -> None:
+    print(
+        f"{label:10} {requests / elapsed:10.0f} requests/s"
+        f"  {memory / 1024:8.0f} KiB peak"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--capacity", type=int, default=10_000)
+    parser.add_argument(
+        "--sqlite-requests",
+        type=int,
+        default=20_000,
+        help="how many requests to send to the SQLite backend (it's slower)",
+    )
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    backend = MemoryBackend(capacity=args.capacity)
+    elapsed = asyncio.run(flood(backend, args.requests))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report("memory", args.requests, elapsed, peak)
+    print(f"{'':10} {len(backend.buckets)} buckets kept")
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SQLiteBackend(str(Path(directory) / "ratelimits.db"))
+        tracemalloc.start()
+        elapsed = asyncio.run(flood(backend, args.sqlite_requests))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report("sqlite", args.sqlite_requests, elapsed, peak)
+
+
+if __name__ == "__main__":
+    main()
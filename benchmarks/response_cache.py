@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import time
+
+from quart import Quart, jsonify
+
+from dog.web.cache import ResponseCache, cached
+
+# Compares the CPU time spent answering a dashboard polling a guild's
+# endpoint, with and without the response cache. The endpoint renders a
+# stand-in for a large response (a few hundred channels and roles). Run from
+# the repository's root:
+#
+#     python -m benchmarks.response_cache [--requests 2000]
+#
+# Requests go through Quart's test client, whose overhead is included.
+
+
+def render_guild(guild_id: int):
+    return jsonify(
+        {
+            "id": str(guild_id),
+            "name": "A guild",
+            "channels": [
+                {"id": str(10**17 + index), "name": f"channel-{index}"}
+                for index in range(300)
+            ],
+            "roles": [
+                {"id": str(10**18 + index), "name": f"role {index}", "color": index}
+                for index in range(200)
+            ],
+        }
+    )
+
+
+def make_app() -> Quart:
+    app = Quart(__name__)
+    app.response_cache = ResponseCache()  # type: ignore
+
+    @app.route("/uncached/<int:guild_id>")
+    async def uncached_guild(guild_id):
+        return render_guild(guild_id)
+
+    @app.route("/cached/<int:guild_id>")
+    @cached(60)
+    async def cached_guild(guild_id):
+        return render_guild(guild_id)
+
+    return app
+
+
+async def poll(app: Quart, path: str, requests: int, *, etag: bool) -> float:
+    client = app.test_client()
+    headers = {}
+    if etag:
+        response = await client.get(path)
+        headers["If-None-Match"] = response.headers["ETag"].strip('"')
+
+    started = time.process_time()
+    for _ in range(requests):
+        response = await client.get(path, headers=headers)
+        await response.get_data()
+    return time.process_time() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app()
+    runs = [
+        ("uncached", "/uncached/1", False),
+        ("cached", "/cached/1", False),
+        ("cached, 304", "/cached/1", True),
+    ]
+    for label, path, etag in runs:
+        elapsed = asyncio.run(poll(app, path, args.requests, etag=etag))
+        per_request = elapsed / args.requests * 1e6
+        print(f"{label:12} {elapsed:8.3f}s CPU  {per_request:8.1f}µs/request")
+
+
+if __name__ == "__main__":
+    main()
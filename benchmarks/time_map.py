@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from PIL import Image
+
+from dog.avatars import AvatarCache
+from dog.ext.time.map import Map
+from dog.rendering import Renderer
+
+# Renders time maps of members whose avatars are served by a local server
+# (with some latency, like Discord's CDN), reporting render times against
+# member count. Avatars are fetched one at a time (like before they were
+# prefetched concurrently) and then concurrently, from a cold cache each
+# time. Maps are drawn in a pool of rendering processes, like the bot does by
+# default. Run from the repository's root:
+#
+#     python -m benchmarks.time_map [--members 25,100,300] [--processes 2]
+
+PORT = 8765
+ZONES = ["UTC-8", "UTC-5", "UTC", "UTC+1", "UTC+3", "UTC+5:30", "UTC+8", "UTC+10"]
+
+
+def fixture_avatar(index: int) -> bytes:
+    buffer = BytesIO()
+    color = (index * 37 % 256, index * 91 % 256, index * 53 % 256)
+    Image.new("RGB", (256, 256), color).save(buffer, format="png")
+    return buffer.getvalue()
+
+
+# rendering processes keep their own chunk caches, so every render uses new
+# avatar hashes to keep it from reusing chunks drawn by the previous one
+renders = itertools.count()
+
+
+class Asset:
+    def __init__(self, index: int, render: int) -> None:
+        self.key = f"avatar{index}-{render}"
+        self.url = f"http://127.0.0.1:{PORT}/{index}.png"
+
+    def replace(self, **kwargs) -> "Asset":
+        return self
+
+    def __str__(self):
+        return self.url
+
+
+class Member:
+    def __init__(self, index: int, render: int) -> None:
+        self.id = index
+        self.name = f"member {index}"
+        self.display_avatar = Asset(index, render)
+
+
+async def serve(count: int, latency: float) -> web.AppRunner:
+    avatars = [fixture_avatar(index) for index in range(count)]
+
+    async def avatar(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        index = int(request.match_info["index"])
+        return web.Response(body=avatars[index], content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/{index:\\d+}.png", avatar)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    return runner
+
+
+async def render(session, renderer, count: int, concurrency: int) -> float:
+    loop = asyncio.get_running_loop()
+    render_id = next(renders)
+
+    with tempfile.TemporaryDirectory() as directory:
+        avatars = AvatarCache(session=session, loop=loop, directory=Path(directory))
+        chart = Map(
+            avatars=avatars, concurrency=concurrency, renderer=renderer, loop=loop
+        )
+        for index in range(count):
+            chart.add_member(Member(index, render_id), ZONES[index % len(ZONES)])
+
+        started = time.perf_counter()
+        await chart.draw()
+        await chart.render()
+        elapsed = time.perf_counter() - started
+        chart.close()
+
+    return elapsed
+
+
+async def run(counts, latency: float, processes: int) -> None:
+    runner = await serve(max(counts), latency)
+    renderer = None
+    if processes > 0:
+        renderer = Renderer(loop=asyncio.get_running_loop(), processes=processes)
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            print(f"{'members':>8} {'one at a time':>14} {'concurrently':>14}")
+            for count in counts:
+                sequential = await render(session, renderer, count, 1)
+                concurrent = await render(session, renderer, count, 8)
+                print(f"{count:8} {sequential:13.2f}s {concurrent:13.2f}s")
+    finally:
+        if renderer is not None:
+            renderer.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--members",
+        type=lambda counts: [int(count) for count in counts.split(",")],
+        default=[25, 100, 300],
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=2,
+        help="how many processes to render in (0 renders in threads instead)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.members, args.latency, args.processes))
+
+
+if __name__ == "__main__":
+    main()
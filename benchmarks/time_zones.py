@@ -0,0 +1,56 @@
+import argparse
+import datetime
+import random
+import time
+
+import dateutil.tz
+
+from dog.ext.time.formatting import format_dt
+from dog.ext.time.zones import get_zone
+
+# Compares what the `time` command spends on looking up and formatting a
+# user's time, with an uncached dateutil lookup (like before zones were
+# cached) and with `get_zone`. Run from the repository's root:
+#
+#     python -m benchmarks.time_zones [--requests 20000]
+
+ZONES = [
+    "America/New_York",
+    "America/Los_Angeles",
+    "America/Sao_Paulo",
+    "Europe/London",
+    "Europe/Berlin",
+    "Europe/Kyiv",
+    "Asia/Kolkata",
+    "Asia/Tokyo",
+    "Australia/Sydney",
+    "Pacific/Auckland",
+]
+
+
+def run(lookup, names) -> float:
+    started = time.perf_counter()
+    for name in names:
+        format_dt(datetime.datetime.now(lookup(name)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    names = random.Random(0).choices(ZONES, k=args.requests)
+    get_zone.cache_clear()
+
+    for label, lookup in [
+        ("dateutil.tz.gettz (uncached)", dateutil.tz.gettz.nocache),
+        ("get_zone", get_zone),
+    ]:
+        elapsed = run(lookup, names)
+        per_request = elapsed / args.requests * 1e6
+        print(f"{label:30} {elapsed:8.3f}s  {per_request:8.1f}µs/request")
+
+
+if __name__ == "__main__":
+    main()
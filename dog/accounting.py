@@ -0,0 +1,143 @@
+__all__ = ["GuildCosts", "GuildUsage"]
+
+import collections
+import time
+from typing import Counter, Deque, Dict, List, Optional, Tuple
+
+
+class GuildUsage:
+    """The CPU time and number of calls attributed to a guild."""
+
+    __slots__ = ("cpu", "calls", "breakdown")
+
+    def __init__(self) -> None:
+        self.cpu = 0.0
+        self.calls = 0
+
+        #: A counter of listener and command names to the CPU time they took.
+        self.breakdown: Counter[str] = collections.Counter()
+
+    def __repr__(self):
+        return f"<GuildUsage cpu={self.cpu:.4f} calls={self.calls}>"
+
+    def merge(self, other: "GuildUsage") -> None:
+        self.cpu += other.cpu
+        self.calls += other.calls
+        self.breakdown.update(other.breakdown)
+
+
+class _Metered:
+    """Wraps a coroutine, measuring the CPU time spent in each of its steps.
+
+    Time spent suspended (waiting on I/O, sleeping, etc.) isn't counted, nor
+    is time spent running other tasks in between.
+    """
+
+    __slots__ = ("coro", "done")
+
+    def __init__(self, coro, done) -> None:
+        self.coro = coro
+        self.done = done
+
+    def __await__(self):
+        coro = self.coro
+        cpu = 0.0
+        value = error = None
+
+        try:
+            while True:
+                started_at = time.thread_time()
+                try:
+                    if error is None:
+                        yielded = coro.send(value)
+                    else:
+                        yielded = coro.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    cpu += time.thread_time() - started_at
+
+                try:
+                    value, error = (yield yielded), None
+                except GeneratorExit:
+                    coro.close()
+                    raise
+                except BaseException as exc:
+                    value, error = None, exc
+        finally:
+            self.done(cpu)
+
+
+class GuildCosts:
+    """Accounts the CPU time spent on behalf of each guild.
+
+    Usage is accumulated into a window that is rolled up into a fixed-size
+    history every ``window`` seconds. Each window tracks at most ``capacity``
+    guilds; when it's full, the cheapest guild is evicted to make room, so
+    heavy guilds are never pushed out by a long tail of light ones.
+    """
+
+    def __init__(
+        self, *, capacity: int = 512, window: float = 60.0, windows: int = 60
+    ) -> None:
+        self.capacity = capacity
+        self.window = window
+
+        self.current: Dict[int, GuildUsage] = {}
+        self.history: Deque[Dict[int, GuildUsage]] = collections.deque(
+            maxlen=windows
+        )
+        self._window_ends_at = time.monotonic() + window
+
+    def _maybe_rollup(self) -> None:
+        now = time.monotonic()
+        if now < self._window_ends_at:
+            return
+
+        self.history.append(self.current)
+        self.current = {}
+        self._window_ends_at = now + self.window
+
+    def record(self, guild_id: int, name: str, cpu: float) -> None:
+        """Attribute some CPU time spent in a listener or command to a guild."""
+        self._maybe_rollup()
+
+        usage = self.current.get(guild_id)
+        if usage is None:
+            if len(self.current) >= self.capacity:
+                cheapest = min(self.current, key=lambda key: self.current[key].cpu)
+                del self.current[cheapest]
+            usage = self.current[guild_id] = GuildUsage()
+
+        usage.cpu += cpu
+        usage.calls += 1
+        usage.breakdown[name] += cpu
+
+    async def meter(self, coro, guild_id: int, name: str):
+        """Run a coroutine, attributing the CPU time it takes to a guild."""
+        return await _Metered(
+            coro, lambda cpu: self.record(guild_id, name, cpu)
+        )
+
+    def top(
+        self, limit: int = 10, *, windows: Optional[int] = None
+    ) -> List[Tuple[int, GuildUsage]]:
+        """Return the guilds that used the most CPU time, most expensive first.
+
+        ``windows`` limits the report to that many of the most recent windows
+        (in addition to the current one).
+        """
+        self._maybe_rollup()
+
+        history = list(self.history)
+        if windows is not None:
+            history = history[-windows:] if windows else []
+
+        totals: Dict[int, GuildUsage] = collections.defaultdict(GuildUsage)
+        for snapshot in history + [self.current]:
+            for guild_id, usage in snapshot.items():
+                totals[guild_id].merge(usage)
+
+        return sorted(totals.items(), key=lambda item: item[1].cpu, reverse=True)[
+            :limit
+        ]
@@ -0,0 +1,228 @@
+__all__ = ["AvatarCache", "AvatarUnavailable"]
+
+import asyncio
+import collections
+import functools
+import logging
+import os
+import re
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, OrderedDict
+
+import aiohttp
+import discord
+from PIL import Image
+
+log = logging.getLogger(__name__)
+
+# Avatar hashes are alphanumeric (with an "a_" prefix for animated ones), but
+# don't trust that when building paths.
+UNSAFE_FILENAME_CHARACTERS = re.compile(r"[^\w-]")
+
+
+class AvatarUnavailable(Exception):
+    """Raised when an avatar couldn't be downloaded or decoded."""
+
+
+class AvatarCache:
+    """A two-tiered cache of avatars, stored as decoded, resized RGBA tiles.
+
+    Tiles are keyed by the avatar's hash (which Discord derives from its
+    content) and the tile size, so a tile never has to be invalidated; a
+    changed avatar simply has a new hash.
+
+    The first tier is an in-memory LRU of :class:`PIL.Image.Image` objects.
+    The second tier is a directory of PNG encoded tiles on disk, whose total
+    size is capped by evicting the least recently used files. All disk I/O
+    and image processing happens in the default executor.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: aiohttp.ClientSession,
+        loop: asyncio.AbstractEventLoop,
+        directory: Path,
+        memory_capacity: int = 2048,
+        disk_capacity: int = 128 * 1024 * 1024,
+    ) -> None:
+        self.session = session
+        self.loop = loop
+        self.directory = directory
+        self.memory_capacity = memory_capacity
+        self.disk_capacity = disk_capacity
+
+        self.memory: OrderedDict[str, Image.Image] = collections.OrderedDict()
+
+        #: A mapping of filenames on disk to their sizes in bytes, least
+        #: recently used first. This is lazily populated from the directory.
+        self.disk: Optional[OrderedDict[str, int]] = None
+        self.disk_usage = 0
+
+        self._disk_lock = asyncio.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def __repr__(self):
+        return (
+            f"<AvatarCache memory={len(self.memory)}"
+            f" disk={len(self.disk or ())} disk_usage={self.disk_usage}>"
+        )
+
+    @staticmethod
+    def key(asset: discord.Asset, size: int) -> str:
+        return f"{UNSAFE_FILENAME_CHARACTERS.sub('', asset.key)}-{size}"
+
+    def _scan(self) -> OrderedDict[str, int]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        return collections.OrderedDict(
+            (entry.name, entry.stat().st_size) for entry in entries
+        )
+
+    async def _load_disk_index(self) -> OrderedDict[str, int]:
+        async with self._disk_lock:
+            if self.disk is None:
+                self.disk = await self.loop.run_in_executor(None, self._scan)
+                self.disk_usage = sum(self.disk.values())
+                log.debug(
+                    "loaded %d avatar tiles (%d bytes) from disk",
+                    len(self.disk),
+                    self.disk_usage,
+                )
+        return self.disk
+
+    def _remember(self, key: str, tile: Image.Image) -> None:
+        self.memory[key] = tile
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_capacity:
+            self.memory.popitem(last=False)
+
+    @staticmethod
+    def _decode(avatar_bytes: bytes, size: int) -> Image.Image:
+        with Image.open(BytesIO(avatar_bytes)) as avatar:
+            return avatar.convert("RGBA").resize((size, size), resample=Image.LANCZOS)
+
+    @staticmethod
+    def _encode(tile: Image.Image) -> bytes:
+        buffer = BytesIO()
+        tile.save(buffer, format="png")
+        return buffer.getvalue()
+
+    def _read_tile(self, filename: str) -> Image.Image:
+        path = self.directory / filename
+        # touch the file so eviction order survives restarts
+        os.utime(path)
+        with Image.open(path) as tile:
+            return tile.convert("RGBA")
+
+    def _write_tile(self, filename: str, tile: Image.Image) -> int:
+        data = self._encode(tile)
+        (self.directory / filename).write_bytes(data)
+        return len(data)
+
+    def _unlink(self, filenames) -> None:
+        for filename in filenames:
+            try:
+                (self.directory / filename).unlink()
+            except FileNotFoundError:
+                pass
+
+    async def _store_on_disk(self, filename: str, tile: Image.Image) -> None:
+        disk = await self._load_disk_index()
+        size = await self.loop.run_in_executor(
+            None, self._write_tile, filename, tile
+        )
+
+        self.disk_usage += size - disk.get(filename, 0)
+        disk[filename] = size
+        disk.move_to_end(filename)
+
+        if self.disk_usage <= self.disk_capacity:
+            return
+
+        # evict down to 90% of the capacity, so we don't evict on every write
+        evicted = []
+        while disk and self.disk_usage > self.disk_capacity * 0.9:
+            evicted_filename, evicted_size = disk.popitem(last=False)
+            self.disk_usage -= evicted_size
+            evicted.append(evicted_filename)
+
+        log.debug("evicting %d avatar tiles from disk", len(evicted))
+        await self.loop.run_in_executor(None, self._unlink, evicted)
+
+    async def _load(self, asset: discord.Asset, key: str, size: int) -> Image.Image:
+        filename = f"{key}.png"
+        disk = await self._load_disk_index()
+
+        if filename in disk:
+            try:
+                tile = await self.loop.run_in_executor(None, self._read_tile, filename)
+            except (OSError, ValueError) as error:
+                log.warning("discarding unreadable avatar tile %s: %r", filename, error)
+                self.disk_usage -= disk.pop(filename, 0)
+            else:
+                disk.move_to_end(filename)
+                return tile
+
+        url = str(asset.replace(format="png", size=size))
+        try:
+            async with self.session.get(url, raise_for_status=True) as resp:
+                avatar_bytes = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise AvatarUnavailable(f"Couldn't download {url}: {error}") from error
+
+        try:
+            tile = await self.loop.run_in_executor(
+                None, functools.partial(self._decode, avatar_bytes, size)
+            )
+        except (OSError, ValueError, Image.DecompressionBombError) as error:
+            # OSError includes PIL's UnidentifiedImageError
+            raise AvatarUnavailable(f"Couldn't decode {url}: {error}") from error
+
+        try:
+            await self._store_on_disk(filename, tile)
+        except OSError as error:
+            log.warning("failed to store avatar tile %s: %r", filename, error)
+        return tile
+
+    async def _load_and_remember(
+        self, asset: discord.Asset, key: str, size: int
+    ) -> Image.Image:
+        try:
+            tile = await self._load(asset, key, size)
+        finally:
+            del self._pending[key]
+        self._remember(key, tile)
+        return tile
+
+    async def tile(self, asset: discord.Asset, *, size: int = 64) -> Image.Image:
+        """Return an avatar as a ``size`` by ``size`` RGBA tile.
+
+        The returned image is shared, and must not be modified.
+
+        Raises :class:`AvatarUnavailable` if the avatar had to be downloaded
+        and that failed, or it couldn't be decoded.
+        """
+        key = self.key(asset, size)
+
+        tile = self.memory.get(key)
+        if tile is not None:
+            self.memory.move_to_end(key)
+            return tile
+
+        # tiles are loaded in their own task, which every task that wants the
+        # tile waits on. that way, one of them being cancelled doesn't cancel
+        # loading it for the others
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = self.loop.create_task(
+                self._load_and_remember(asset, key, size)
+            )
+            # don't complain about nobody retrieving the exception
+            pending.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        return await asyncio.shield(pending)
@@ -0,0 +1,377 @@
+__all__ = [
+    "KINDS",
+    "InvalidRecord",
+    "export_lines",
+    "export_page",
+    "export_records",
+    "import_batch",
+    "import_lines",
+    "split_lines",
+    "validate_record",
+]
+
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import os
+import sys
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from ruamel.yaml.error import YAMLError
+
+from dog.guild_config import parse_config
+
+log = logging.getLogger(__name__)
+
+# Backups are newline-delimited JSON, one record per line:
+#
+#     {"kind": "config", "guild_id": "1234", "config": "<YAML text>"}
+#     {"kind": "quotes", "guild_id": "1234", "quotes": {"name": {...}, ...}}
+#     {"kind": "timezone", "user_id": "1234", "timezone": "Europe/London"}
+
+KINDS = ("config", "quotes", "timezone")
+
+#: How many records of each kind to fetch from the bot at a time when
+#: exporting. Quotes are fetched a guild at a time, so those pages are
+#: smaller.
+EXPORT_PAGE_SIZES = {"config": 500, "quotes": 25, "timezone": 5000}
+
+# How many records (or bytes of records) to import at a time. Each batch is
+# saved with a single write per kind.
+IMPORT_BATCH_SIZE = 500
+IMPORT_BATCH_BYTES = 4 * 1024 * 1024
+
+# Only this many errors are reported back, though all are counted.
+MAX_REPORTED_ERRORS = 100
+
+
+class InvalidRecord(Exception):
+    """Raised when a record in a backup is invalid."""
+
+
+def _snowflake(record: Dict[str, Any], field: str) -> str:
+    value = record.get(field)
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str) or not value.isdigit():
+        raise InvalidRecord(f"`{field}` must be an ID.")
+    return value
+
+
+def validate_record(record: Any) -> Tuple[str, str, Any]:
+    """Validate a record, returning its kind, key, and value.
+
+    Raises :class:`InvalidRecord` if the record is invalid.
+    """
+    if not isinstance(record, dict):
+        raise InvalidRecord("Records must be objects.")
+
+    kind = record.get("kind")
+
+    if kind == "config":
+        guild_id = _snowflake(record, "guild_id")
+        text = record.get("config")
+        if not isinstance(text, str):
+            raise InvalidRecord("`config` must be a string.")
+        try:
+            parsed = parse_config(text)
+        except YAMLError as error:
+            raise InvalidRecord(f"Invalid YAML ({error}).") from None
+        if parsed is not None and not isinstance(parsed, dict):
+            raise InvalidRecord("This configuration isn't a mapping.")
+        return kind, guild_id, text
+
+    if kind == "quotes":
+        guild_id = _snowflake(record, "guild_id")
+        quotes = record.get("quotes")
+        if not isinstance(quotes, dict) or not all(
+            isinstance(quote, dict) and isinstance(quote.get("content"), str)
+            for quote in quotes.values()
+        ):
+            raise InvalidRecord("`quotes` must map names to quotes with content.")
+        return kind, guild_id, quotes
+
+    if kind == "timezone":
+        # imported here, since importing the time extension imports the bot
+        from dog.ext.time.zones import get_zone
+
+        user_id = _snowflake(record, "user_id")
+        timezone = record.get("timezone")
+        if not isinstance(timezone, str) or get_zone(timezone) is None:
+            raise InvalidRecord("`timezone` must be a valid timezone.")
+        return kind, user_id, timezone
+
+    raise InvalidRecord(f"Unknown kind {kind!r}.")
+
+
+def _storage(bot, kind: str):
+    if kind == "config":
+        return bot.guild_configs.persistent
+
+    cog = bot.get_cog("Quoting" if kind == "quotes" else "Time")
+    if cog is None:
+        return None
+    return cog.storage if kind == "quotes" else cog.timezones
+
+
+def _key_order(key: str) -> Tuple[int, str]:
+    # keys are IDs, so this sorts them numerically
+    return len(key), key
+
+
+def export_page(bot, kind: str, after: Optional[str], limit: int) -> Dict[str, Any]:
+    """Export up to ``limit`` records of a kind, in order of their keys (guild
+    or user IDs), starting after the key ``after`` (or from the start).
+
+    Returns the records, and the key to start the next page after (or
+    ``None`` if this was the last one). Since pages pick up from a key, not
+    a position, records being added or deleted between pages don't cause
+    others to be skipped or repeated. Nothing is exported for kinds whose
+    cog isn't loaded.
+    """
+    storage = _storage(bot, kind)
+    if storage is None:
+        return {"records": [], "next": None}
+
+    data = storage.all()
+    keys = data.keys()
+    if after is not None:
+        start = _key_order(after)
+        keys = [key for key in keys if _key_order(key) > start]
+    page = heapq.nsmallest(limit, keys, key=_key_order)
+    items = [(key, data[key]) for key in page]
+
+    if kind == "config":
+        # guilds with an empty config just don't have one
+        records = [
+            {"kind": kind, "guild_id": key, "config": value}
+            for key, value in items
+            if value
+        ]
+    elif kind == "quotes":
+        records = [
+            {"kind": kind, "guild_id": key, "quotes": value} for key, value in items
+        ]
+    else:
+        records = [
+            {"kind": kind, "user_id": key, "timezone": value} for key, value in items
+        ]
+
+    return {"records": records, "next": page[-1] if len(page) == limit else None}
+
+
+async def import_batch(bot, records: List[Any], *, dry_run: bool = False):
+    """Validate and import a batch of records.
+
+    Invalid records are skipped. The valid ones are saved with one write per
+    kind, unless ``dry_run`` is set. Returns how many records of each kind
+    were imported, and the index and message of each error.
+    """
+
+    def validate_all():
+        valid, errors = [], []
+        for index, record in enumerate(records):
+            try:
+                valid.append((index, *validate_record(record)))
+            except InvalidRecord as error:
+                errors.append({"index": index, "message": str(error)})
+        return valid, errors
+
+    valid, errors = await bot.loop.run_in_executor(None, validate_all)
+
+    batches: Dict[str, Dict[str, Any]] = {kind: {} for kind in KINDS}
+    for index, kind, key, value in valid:
+        if kind != "config" and _storage(bot, kind) is None:
+            errors.append({"index": index, "message": f"Can't import {kind} now."})
+            continue
+        batches[kind][key] = value
+
+    if not dry_run:
+        if batches["config"]:
+            await bot.guild_configs.write_many(batches["config"])
+        if batches["quotes"]:
+            await bot.get_cog("Quoting").save_many_quotes(batches["quotes"])
+        if batches["timezone"]:
+            await bot.get_cog("Time").set_timezones(
+                {int(key): value for key, value in batches["timezone"].items()}
+            )
+
+    errors.sort(key=lambda error: error["index"])
+    return {
+        "imported": {kind: len(batch) for kind, batch in batches.items()},
+        "errors": errors,
+    }
+
+
+async def export_records(backend, kinds=KINDS) -> AsyncIterator[Dict[str, Any]]:
+    """Export every record of some kinds from a backend, a page at a time."""
+    for kind in kinds:
+        after: Optional[str] = None
+
+        while True:
+            page = await backend.export_page(kind, after, EXPORT_PAGE_SIZES[kind])
+            for record in page["records"]:
+                yield record
+            after = page["next"]
+            if after is None:
+                break
+
+
+async def export_lines(backend, kinds=KINDS) -> AsyncIterator[bytes]:
+    """Like :func:`export_records`, but yields lines of newline-delimited
+    JSON.
+    """
+    async for record in export_records(backend, kinds):
+        yield json.dumps(record).encode() + b"\n"
+
+
+async def split_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a stream of chunks into lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def import_lines(
+    backend, lines: AsyncIterable[bytes], *, dry_run: bool = False
+) -> Dict[str, Any]:
+    """Import records from lines of newline-delimited JSON through a backend,
+    in batches.
+
+    Returns a report of how many records of each kind were imported (or
+    would have been, with ``dry_run``), and the errors that were encountered
+    (with line numbers).
+    """
+    imported = dict.fromkeys(KINDS, 0)
+    errors: List[Dict[str, Any]] = []
+    failed = 0
+
+    def error(line_number: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "message": message})
+
+    batch: List[Any] = []
+    line_numbers: List[int] = []
+    size = 0
+
+    async def flush():
+        nonlocal size
+        if not batch:
+            return
+
+        report = await backend.import_records(batch, dry_run)
+        for kind, count in report["imported"].items():
+            imported[kind] += count
+        for batch_error in report["errors"]:
+            error(line_numbers[batch_error["index"]], batch_error["message"])
+
+        batch.clear()
+        line_numbers.clear()
+        size = 0
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            error(line_number, "Invalid JSON.")
+            continue
+
+        batch.append(record)
+        line_numbers.append(line_number)
+        size += len(line)
+
+        if len(batch) >= IMPORT_BATCH_SIZE or size >= IMPORT_BATCH_BYTES:
+            await flush()
+
+    await flush()
+
+    errors.sort(key=lambda error: error["line"])
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+async def _cli(args: argparse.Namespace) -> int:
+    # imported here, since the web backend imports this module
+    from dog.web.ipc import RemoteBackend
+
+    backend = RemoteBackend(args.socket, timeout=120.0)
+
+    try:
+        if args.command == "export":
+            output = sys.stdout.buffer
+            async for line in export_lines(backend, args.kinds):
+                output.write(line)
+            output.flush()
+            return 0
+
+        async def read():
+            if args.file == "-":
+                for line in sys.stdin.buffer:
+                    yield line
+                return
+
+            with open(args.file, "rb") as fp:
+                for line in fp:
+                    yield line
+
+        report = await import_lines(backend, read(), dry_run=args.dry_run)
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return 1 if report["failed"] else 0
+    finally:
+        await backend.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Back up or restore guild configs, quotes, and timezones through the
+    socket of a running bot (see ``web.ipc_socket`` in the config).
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m dog.backup", description=main.__doc__
+    )
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("DOG_IPC_SOCKET"),
+        required="DOG_IPC_SOCKET" not in os.environ,
+        help="the path to the bot's IPC socket (default: $DOG_IPC_SOCKET)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write a backup to stdout")
+    export.add_argument(
+        "--kinds",
+        type=lambda kinds: kinds.split(","),
+        default=list(KINDS),
+        help="a comma-separated list of what to export (default: everything)",
+    )
+
+    restore = commands.add_parser("import", help="restore a backup")
+    restore.add_argument(
+        "file", nargs="?", default="-", help="the backup (default: stdin)"
+    )
+    restore.add_argument(
+        "--dry-run", action="store_true", help="only validate the backup"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "export" and not set(args.kinds) <= set(KINDS):
+        parser.error(f"kinds must be some of {', '.join(KINDS)}")
+
+    return asyncio.run(_cli(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
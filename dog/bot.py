@@ -7,12 +7,24 @@ import discord
 import hypercorn
 import lifesaver
 import hypercorn.asyncio
-from lifesaver.bot.storage import Storage
 
+from dog.web.backend import LocalBackend
+from dog.web.client import create_session
+from dog.web.ipc import IPCServer
+from dog.web.server import OAuthSettings
 from dog.web.server import app as webapp
 
+from . import instrumentation
+from .accounting import GuildCosts
+from .avatars import AvatarCache
+from .editables import EditableGuilds
 from .guild_config import GuildConfigManager
 from .help import HelpCommand
+from .monitoring import LoopMonitor
+from .rendering import Renderer
+from .storage import Storage
+from .utils import state_dir
+from .warmup import WarmUp
 
 log = logging.getLogger(__name__)
 
@@ -32,22 +44,68 @@ class Dogbot(lifesaver.Bot):
         # checks everywhere in the code.
         self.blacklisted_storage: Storage[str] = None  # type: ignore
         self.guild_configs: GuildConfigManager = None  # type: ignore
+        self.editable_guilds: EditableGuilds = None  # type: ignore
         self.session: aiohttp.ClientSession = None  # type: ignore
+        self.api_session: aiohttp.ClientSession = None  # type: ignore
+        self.avatar_cache: AvatarCache = None  # type: ignore
+        self.loop_monitor: LoopMonitor = None  # type: ignore
+        self.warm_up: WarmUp = None  # type: ignore
+        self.renderer: Optional[Renderer] = None
+        self.ipc_server: Optional[IPCServer] = None
+        self.guild_costs = GuildCosts()
 
     async def setup_hook(self):
         # Accesses to the asyncio loop have to happen in this method.
+        self.loop_monitor = LoopMonitor(self.loop)
+        self.loop_monitor.start()
+
         self.blacklisted_storage = Storage("blacklisted_users.json")
         self.session = aiohttp.ClientSession(loop=self.loop)
+        # used by the web dashboard to talk to discord's oauth api
+        self.api_session = create_session()
+        self.avatar_cache = AvatarCache(
+            session=self.session,
+            loop=self.loop,
+            directory=state_dir() / "avatar_cache",
+        )
         self.guild_configs = GuildConfigManager(self)
+        self.editable_guilds = EditableGuilds(self)
+
+        if self.config.render_processes > 0:
+            self.renderer = Renderer(
+                loop=self.loop,
+                processes=self.config.render_processes,
+                max_pending=self.config.render_queue_depth,
+            )
+
+        # parse every guild config (and prepare other per-guild state) ahead of
+        # time in the background, so the first event in each guild doesn't
+        # have to
+        self.warm_up = WarmUp(self)
+        self.warm_up.start()
 
         # webapp (quart) setup
         webapp.config.from_mapping(self.config.web.app)
-        webapp.bot = self  # type: ignore
+        webapp.backend = LocalBackend(self)  # type: ignore
+        webapp.oauth = OAuthSettings(  # type: ignore
+            client_id=self.config.oauth.client_id,
+            client_secret=self.config.oauth.client_secret,
+            redirect_uri=self.config.oauth.redirect_uri,
+        )
+        webapp.api_session = self.api_session  # type: ignore
         self.webapp = webapp
 
+        # let web workers in other processes use the bot, too
+        if self.config.web.ipc_socket:
+            self.ipc_server = IPCServer(webapp.backend, self.config.web.ipc_socket)
+            await self.ipc_server.start()
+
         # http server (hypercorn) setup
-        self.http_server_config = hypercorn.Config.from_mapping(self.config.web.http)
-        self.loop.create_task(self._serve_http())
+        if self.config.web.serve_http:
+            self.http_server_config = hypercorn.Config.from_mapping(
+                self.config.web.http
+            )
+            self.loop.create_task(self._serve_http())
 
     def dispatch(self, event_name, *args, **kwargs):
         """Modified version of the vanilla dispatch to fit disabled_cogs."""
@@ -71,14 +129,25 @@ class Dogbot(lifesaver.Bot):
             # to grab the cog name then check the configuration to avoid
             # dispatching if required
             ev_name = event.__qualname__
-            if ev_name.count(".") == 1 and guild and "." in ev_name:
+            cog_name = None
+            if ev_name.count(".") == 1:
                 cog_name, method_name = ev_name.split(".")
-                if self.cog_is_disabled(guild, cog_name):
+                if guild and self.cog_is_disabled(guild, cog_name):
                     # log.debug('Dropping dispatch of %s to %s in %d -- cog disabled.', ev, ev_name, guild.id)
                     continue
 
+            instrumentation.EVENTS.inc(cog_name or "", event_name)
+
             coro = self._run_event(event, event_name, *args, **kwargs)
-            asyncio.ensure_future(coro, loop=self.loop)
+            if guild is not None:
+                coro = self.guild_costs.meter(coro, guild.id, ev_name)
+            # name the task after the listener, so it can be told apart when
+            # profiling
+            self.loop.create_task(coro, name=f"dog: {ev_name}")
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        with instrumentation.LISTENER_LATENCY.time(event_name):
+            await super()._run_event(coro, event_name, *args, **kwargs)
 
     def cog_is_disabled(self, guild: discord.Guild, cog_name: str) -> bool:
         config = self.guild_configs.get(guild)
@@ -95,10 +164,34 @@ class Dogbot(lifesaver.Bot):
 
         return await super().can_run(ctx, **kwargs)
 
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            await super().invoke(ctx)
+            return
+
+        name = ctx.command.qualified_name
+
+        with instrumentation.COMMAND_LATENCY.time(name):
+            if ctx.guild is None:
+                await super().invoke(ctx)
+            else:
+                # this includes the time spent in `can_run`
+                await self.guild_costs.meter(super().invoke(ctx), ctx.guild.id, name)
+
     async def close(self):
         log.info("bot is exiting")
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+        if self.warm_up is not None:
+            self.warm_up.stop()
+        if self.renderer is not None:
+            self.renderer.close()
+        if self.ipc_server is not None:
+            self.ipc_server.close()
         if self.session is not None:
             await self.session.close()
+        if self.api_session is not None:
+            await self.api_session.close()
         log.info("closing web server")
         await super().close()
 
@@ -11,9 +11,31 @@ class DogWebConfig(lifesaver.config.Config):
     # Hypercorn config
     http: dict
 
-    # Quart config
+    # Quart config. Besides Quart's own settings, the web app reads:
+    #
+    # - RATELIMIT_TRUSTED_PROXIES: How many reverse proxies sit in front of
+    #   the web app (0 by default). Clients are ratelimited by their address
+    #   as reported in `X-Forwarded-For` by the proxies. Only set this when the
+    #   app can't be reached without going through them, or clients could
+    #   pick their own address.
+    # - RATELIMIT_DATABASE: A path to a SQLite database to share ratelimits
+    #   between web workers in.
+    # - METRICS_TOKEN: The token that has to be sent to `/api/metrics` (as
+    #   `Authorization: Bearer <token>`). Without one, metrics aren't served.
+    # - SESSION_DATABASE: A path to a SQLite database to keep logins in (by
+    #   default, `web_sessions.db` in the state directory). If `false`, logins
+    #   are only kept in memory.
     app: dict
 
+    # A path to a Unix socket to serve the web backend over. When set, the
+    # web app can also be served by separate worker processes that talk to
+    # the bot through this socket (see `dog.web.worker`).
+    ipc_socket: str = ""
+
+    # Whether the bot should serve the web app itself. Turn this off when
+    # the web app is only served by workers.
+    serve_http: bool = True
+
 
 class DogAPIKeysConfig(lifesaver.config.Config):
     google_maps: str
@@ -23,6 +45,14 @@ class DogConfig(lifesaver.bot.BotConfig):
     dashboard_link: str = "http://localhost:8080"
     server_invite: str = "https://discord.gg/invalid-invite"
 
+    # The number of processes to render images in. With 0, images are
+    # rendered in threads inside of the bot process instead.
+    render_processes: int = 2
+
+    # The maximum number of images that can be queued up for rendering
+    # before further requests are turned away.
+    render_queue_depth: int = 16
+
     oauth: DogOAuthConfig
     web: DogWebConfig
     api_keys: DogAPIKeysConfig
@@ -0,0 +1,173 @@
+__all__ = ["EditableGuilds"]
+
+import collections
+import logging
+import time
+from typing import Any, Callable, Iterable, Optional, OrderedDict, Set, Tuple
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("guild_ids", "response")
+
+    def __init__(self, guild_ids: Set[int]) -> None:
+        self.guild_ids = guild_ids
+
+        #: A tuple of when the response was cached and the response itself.
+        self.response: Optional[Tuple[float, Any]] = None
+
+
+class EditableGuilds:
+    """An index of the guilds that each user can edit the configuration of.
+
+    Only guilds that the user is a member of are indexed. A user's entry is
+    built by checking each of their mutual guilds once, then kept up to date
+    incrementally: only the affected guild (and, for member events, user) is
+    rechecked when a configuration is edited, roles or members change, or a
+    guild is joined, left, or becomes available again.
+
+    At most ``capacity`` users are indexed, least recently used first out.
+    """
+
+    def __init__(
+        self,
+        bot,
+        *,
+        capacity: int = 1024,
+        response_ttl: float = 10.0,
+    ) -> None:
+        self.bot = bot
+        self.capacity = capacity
+        self.response_ttl = response_ttl
+
+        self.users: OrderedDict[int, _Entry] = collections.OrderedDict()
+
+        for listener in (
+            self.on_guild_config_edit,
+            self.on_member_update,
+            self.on_member_join,
+            self.on_member_remove,
+            self.on_guild_role_update,
+            self.on_guild_role_delete,
+            self.on_guild_update,
+            self.on_guild_available,
+            self.on_guild_join,
+            self.on_guild_remove,
+        ):
+            bot.add_listener(listener)
+
+    def __repr__(self):
+        return f"<EditableGuilds users={len(self.users)}>"
+
+    def _entry(self, user: discord.abc.User) -> _Entry:
+        entry = self.users.get(user.id)
+        if entry is not None:
+            self.users.move_to_end(user.id)
+            return entry
+
+        can_edit = self.bot.guild_configs.can_edit
+        entry = self.users[user.id] = _Entry(
+            {guild.id for guild in user.mutual_guilds if can_edit(user, guild)}
+        )
+        self.users.move_to_end(user.id)
+        while len(self.users) > self.capacity:
+            self.users.popitem(last=False)
+        return entry
+
+    def get(self, user: discord.abc.User) -> Set[int]:
+        """Return the IDs of the guilds that a user can edit."""
+        return self._entry(user).guild_ids
+
+    def response(self, user: discord.abc.User, build: Callable[[Set[int]], Any]) -> Any:
+        """Return a response built from the guilds that a user can edit.
+
+        Responses are cached for ``response_ttl`` seconds, or until the set of
+        guilds changes.
+        """
+        entry = self._entry(user)
+        now = time.monotonic()
+
+        if entry.response is not None and now - entry.response[0] < self.response_ttl:
+            return entry.response[1]
+
+        response = build(entry.guild_ids)
+        entry.response = (now, response)
+        return response
+
+    def _recheck(self, guild: discord.Guild, user_ids: Iterable[int]) -> None:
+        can_edit = self.bot.guild_configs.can_edit
+
+        for user_id in list(user_ids):
+            entry = self.users.get(user_id)
+            if entry is None:
+                continue
+
+            user = self.bot.get_user(user_id)
+            if user is None:
+                del self.users[user_id]
+                continue
+
+            editable = guild.get_member(user_id) is not None and can_edit(user, guild)
+            if editable != (guild.id in entry.guild_ids):
+                log.debug(
+                    "editability of %d by %d changed to %r", guild.id, user_id, editable
+                )
+                if editable:
+                    entry.guild_ids.add(guild.id)
+                else:
+                    entry.guild_ids.discard(guild.id)
+                entry.response = None
+
+    def _recheck_guild(self, guild: discord.Guild) -> None:
+        self._recheck(guild, self.users.keys())
+
+    def _forget_guild(self, guild: discord.Guild) -> None:
+        for entry in self.users.values():
+            if guild.id in entry.guild_ids:
+                entry.guild_ids.discard(guild.id)
+                entry.response = None
+
+    async def on_guild_config_edit(self, guild: discord.Guild, _config) -> None:
+        self._recheck_guild(guild)
+
+    async def on_member_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        if before.roles != after.roles:
+            self._recheck(after.guild, [after.id])
+
+    async def on_member_join(self, member: discord.Member) -> None:
+        self._recheck(member.guild, [member.id])
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self._recheck(member.guild, [member.id])
+
+    async def on_guild_role_update(
+        self, before: discord.Role, after: discord.Role
+    ) -> None:
+        # permissions matter when the guild has no config
+        if before.permissions != after.permissions:
+            self._recheck_guild(after.guild)
+
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self._recheck_guild(role.guild)
+
+    async def on_guild_update(
+        self, before: discord.Guild, after: discord.Guild
+    ) -> None:
+        if before.owner_id != after.owner_id:
+            self._recheck_guild(after)
+
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        # members may have changed while the guild was unavailable, and it's
+        # also dispatched once a guild's members have been chunked at startup
+        self._recheck_guild(guild)
+
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        self._recheck_guild(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self._forget_guild(guild)
@@ -0,0 +1,130 @@
+import collections
+import io
+
+import discord
+import lifesaver
+from discord.ext import commands
+from lifesaver.utils import truncate
+
+from dog import instrumentation, profiler
+
+
+def format_seconds(seconds) -> str:
+    if seconds is None:
+        return "n/a"
+    if seconds == float("inf"):
+        return "slow"
+    return f"{seconds * 1000:.1f}ms"
+
+
+def summarize(histogram: instrumentation.Histogram, *, limit: int = 8) -> str:
+    """Summarize the busiest series of a histogram, one per line."""
+    busiest = sorted(
+        histogram.series.items(), key=lambda item: item[1].count, reverse=True
+    )[:limit]
+
+    lines = []
+    for labels, series in busiest:
+        name = " ".join(labels) or histogram.name
+        p50 = histogram.quantile(0.5, *labels)
+        p95 = histogram.quantile(0.95, *labels)
+        mean = series.sum / series.count
+        lines.append(
+            f"{name}: {series.count}x, mean {format_seconds(mean)},"
+            f" p50 <= {format_seconds(p50)}, p95 <= {format_seconds(p95)}"
+        )
+
+    return "\n".join(lines) or "nothing yet"
+
+
+class Diagnostics(lifesaver.Cog):
+    """Commands that give insight into how the bot is performing."""
+
+    @lifesaver.command(hidden=True)
+    @commands.is_owner()
+    async def stats(self, ctx: lifesaver.Context):
+        """Views performance statistics."""
+        monitor = self.bot.loop_monitor
+
+        busiest_cogs = collections.Counter()
+        for (cog, _event), count in instrumentation.EVENTS.values.items():
+            busiest_cogs[cog or "(bot)"] += count
+        cog_lines = "\n".join(
+            f"{cog}: {count}" for cog, count in busiest_cogs.most_common()
+        )
+
+        sections = {
+            "Event loop": (
+                f"lag: {format_seconds(monitor.last_lag)}"
+                f" (max {format_seconds(monitor.max_lag)})\n"
+                f"stalls: {monitor.stalls}"
+                f" ({format_seconds(monitor.stalled_for)} total)"
+            ),
+            "Events by cog": cog_lines or "nothing yet",
+            "Listeners": summarize(instrumentation.LISTENER_LATENCY),
+            "Commands": summarize(instrumentation.COMMAND_LATENCY),
+            "Gatekeeper": summarize(instrumentation.KEEPER_CHECK_LATENCY),
+            "Time maps": summarize(instrumentation.MAP_LATENCY),
+            "Storage writes": summarize(instrumentation.STORAGE_WRITE_LATENCY),
+            "Web": summarize(instrumentation.WEB_LATENCY),
+        }
+
+        content = "\n\n".join(
+            f"# {title}\n{body}" for title, body in sections.items()
+        )
+        await ctx.send(f"```\n{truncate(content, 1950)}\n```")
+
+    @lifesaver.command(name="guildcosts", aliases=["heavy"], hidden=True)
+    @commands.is_owner()
+    async def guild_costs(self, ctx: lifesaver.Context, limit: int = 10):
+        """Views the guilds that the bot spends the most CPU time on.
+
+        This covers listeners and commands over roughly the last hour.
+        """
+        top = self.bot.guild_costs.top(min(max(limit, 1), 25))
+
+        if not top:
+            await ctx.send("Nothing has been recorded yet.")
+            return
+
+        lines = []
+        for guild_id, usage in top:
+            guild = self.bot.get_guild(guild_id)
+            heaviest = ", ".join(
+                f"{name} {format_seconds(cpu)}"
+                for name, cpu in usage.breakdown.most_common(3)
+            )
+            lines.append(
+                f"{guild or '?'} ({guild_id}): {format_seconds(usage.cpu)}"
+                f" over {usage.calls} calls\n    {heaviest}"
+            )
+
+        content = "\n".join(lines)
+        await ctx.send(f"```\n{truncate(content, 1950)}\n```")
+
+    @lifesaver.command(name="cpuprofile", aliases=["sample"], hidden=True)
+    @commands.is_owner()
+    async def cpu_profile(self, ctx: lifesaver.Context, seconds: float = 10.0):
+        """Samples what the bot is spending its time on.
+
+        The event loop and every worker thread are sampled for the given number
+        of seconds (at most 60). The attached file contains collapsed stacks,
+        which can be turned into a flamegraph.
+        """
+        seconds = min(max(seconds, 1.0), 60.0)
+
+        try:
+            async with ctx.typing():
+                result = await profiler.profile(self.bot.loop, duration=seconds)
+        except profiler.ProfilerBusy as error:
+            await ctx.send(f"{ctx.tick(False)} {error}")
+            return
+
+        file = discord.File(
+            fp=io.BytesIO(result.collapsed().encode()), filename="profile.folded"
+        )
+        await ctx.send(f"```\n{truncate(result.summary(), 1950)}\n```", file=file)
+
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
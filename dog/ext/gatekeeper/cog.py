@@ -72,6 +72,21 @@ class Gatekeeper(lifesaver.Cog):
         self.keepers[guild.id] = keeper
         return keeper
 
+    async def warm_up(self, progress):
+        """Create Keepers ahead of time for every guild with Gatekeeper enabled."""
+        guilds = [
+            guild
+            for guild in self.bot.guilds
+            if self.gatekeeper_config(guild).get("enabled", False)
+        ]
+
+        for index, guild in enumerate(guilds, 1):
+            self.keeper(guild)
+
+            if index % 50 == 0 or index == len(guilds):
+                progress(index, len(guilds))
+                await asyncio.sleep(0)
+
     @lifesaver.Cog.listener()
     async def on_guild_config_edit(self, guild: discord.Guild, config):
         if guild.id not in self.keepers:
@@ -83,7 +98,7 @@ class Gatekeeper(lifesaver.Cog):
 
     @contextlib.asynccontextmanager
     async def edit_config(self, guild: discord.Guild):
-        config = self.bot.guild_configs.get(guild, {})
+        config = await self.bot.guild_configs.get_roundtrip(guild, {})
         copied_gatekeeper_config = copy.deepcopy(config["gatekeeper"])
         yield copied_gatekeeper_config
 
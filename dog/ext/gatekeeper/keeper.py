@@ -7,6 +7,7 @@ import discord
 from lifesaver.utils.timing import Ratelimiter
 
 from dog.formatting import represent
+from dog.instrumentation import KEEPER_CHECK_LATENCY, timed
 
 from . import checks as checks_module
 from .core import Ban, Bounce, CheckFailure, Report, create_embed
@@ -158,6 +159,19 @@ class Keeper:
             after_update=remove_unneeded_joins,
         )
 
+    def _decided(
+        self,
+        decision: str,
+        member: T.Optional[discord.Member] = None,
+        reason: T.Optional[str] = None,
+    ):
+        """Dispatch ``gatekeeper_decision`` for a decision that was made about
+        a member (or the guild, for lockdowns).
+
+        ``decision`` is one of ``pass``, ``bounce``, ``ban``, or ``lockdown``.
+        """
+        self.bot.dispatch("gatekeeper_decision", self.guild, decision, member, reason)
+
     async def _lockdown(self):
         """Enable the block_all check for this guild and send a warning report."""
         gatekeeper_cog = self.bot.get_cog("Gatekeeper")
@@ -167,6 +181,8 @@ class Keeper:
                 "block_all": {"enabled": True},
             }
 
+        self._decided("lockdown", reason="Users are joining too quickly")
+
         # TODO: have this be reported in a separate channel, with a mod ping!
         await self.report(
             "Users are joining too quickly. `block_all` has automatically been enabled."
@@ -293,6 +309,7 @@ class Keeper:
             self.log.debug("failed to ban %d: %r", member.id, error)
             await self.report(f"Failed to ban {represent(member)}: `{error}`")
         else:
+            self._decided("ban", member, reason)
             embed = create_embed(
                 member,
                 color=discord.Color.purple(),
@@ -317,6 +334,7 @@ class Keeper:
             self.log.debug("failed to kick %d: %r", member.id, error)
             await self.report(f"Failed to kick {represent(member)}: `{error}`")
         else:
+            self._decided("bounce", member, reason)
             embed = create_embed(
                 member,
                 color=discord.Color.red(),
@@ -391,6 +409,7 @@ class Keeper:
 
         self.bot.loop.create_task(automatic_unban_task())
 
+    @timed(KEEPER_CHECK_LATENCY)
     async def check(self, member: discord.Member) -> bool:
         """Perform checks on a member and bounce or ban them if necessary.
 
@@ -458,4 +477,5 @@ class Keeper:
             self.recent_joins.append(member)
 
         self.log.debug("%d: passed all checks", member.id)
+        self._decided("pass", member)
         return True
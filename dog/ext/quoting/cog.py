@@ -6,7 +6,6 @@ from typing import Any
 import discord
 import lifesaver
 from discord.ext import commands
-from lifesaver.bot.storage import Storage
 from lifesaver.utils import (
     ListPaginator,
     clean_mentions,
@@ -15,6 +14,8 @@ from lifesaver.utils import (
     truncate,
 )
 
+from dog.storage import Storage
+
 from .converters import Messages, QuoteName
 from .utils import stringify_message
 
@@ -44,6 +45,20 @@ class Quoting(lifesaver.Cog):
     def quotes(self, guild: discord.Guild):
         return self.storage.get(str(guild.id), {})
 
+    async def save_quotes(self, guild: discord.Guild, quotes) -> None:
+        """Save the quotes of a guild, dispatching ``guild_quotes_edit``."""
+        await self.storage.put(str(guild.id), quotes)
+        self.bot.dispatch("guild_quotes_edit", guild)
+
+    async def save_many_quotes(self, quotes: dict[str, dict[str, Any]]) -> None:
+        """Save the quotes of many guilds at once, keyed by guild ID."""
+        await self.storage.put_many(quotes)
+
+        for key in quotes:
+            guild = self.bot.get_guild(int(key))
+            if guild is not None:
+                self.bot.dispatch("guild_quotes_edit", guild)
+
     @lifesaver.command(aliases=["rq"])
     @commands.guild_only()
     async def random_quote(self, ctx):
@@ -173,7 +188,7 @@ class Quoting(lifesaver.Cog):
             "guild": {"id": ctx.guild.id},
         }
 
-        await self.storage.put(str(ctx.guild.id), quotes)
+        await self.save_quotes(ctx.guild, quotes)
 
         embed = embed_quote(name=name, quote=quote)
         await (ctx.author if silent else ctx).send(
@@ -217,7 +232,7 @@ class Quoting(lifesaver.Cog):
         quotes[new] = quotes[existing]
         del quotes[existing]
 
-        await self.storage.put(str(ctx.guild.id), quotes)
+        await self.save_quotes(ctx.guild, quotes)
         await ctx.send(f'Quote "{existing}" was renamed to "{new}".')
 
     @quote.command()
@@ -229,5 +244,5 @@ class Quoting(lifesaver.Cog):
 
         del quotes[quote]
 
-        await self.storage.put(str(ctx.guild.id), quotes)
+        await self.save_quotes(ctx.guild, quotes)
         await ctx.ok()
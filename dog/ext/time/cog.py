@@ -1,22 +1,26 @@
+import collections
 import datetime
+import io
 import logging
 import typing as T
 
 import discord
 import lifesaver
-import dateutil.tz
 from discord.ext import commands
 from discord.ext.commands import BucketType, cooldown
 from geopy import exc as geopy_errors
-from lifesaver.bot.storage import Storage
 from lifesaver.utils import clean_mentions
 from lifesaver.utils.timing import Timer
 
-from . import messages
+from dog.rendering import RendererBusy
+from dog.storage import Storage
+
+from . import finder, messages
 from .formatting import format_dt, greeting
 from .converters import Timezone, hour_minute
 from .resolver import Resolver
 from .map import Map
+from .zones import get_zone
 from .messages import (
     QUOTA_EXCEEDED,
     NO_AUTHOR_TIMEZONE,
@@ -45,6 +49,9 @@ DEPRECATED_TIMEZONES = {
 
 log = logging.getLogger(__name__)
 
+#: The number of guilds to keep rendered timezone charts around for.
+CHART_CACHE_CAPACITY = 64
+
 
 class Time(lifesaver.Cog):
     def __init__(self, bot):
@@ -52,6 +59,105 @@ class Time(lifesaver.Cog):
         self.resolver = Resolver(bot=bot, loop=bot.loop)
         self.timezones = Storage[str]("timezones.json")
 
+        #: A mapping of guild IDs to the key and PNG data of their most
+        #: recently rendered timezone chart, least recently used first.
+        self.charts: T.OrderedDict[int, T.Tuple[T.Hashable, bytes]] = (
+            collections.OrderedDict()
+        )
+
+        #: A mapping of timezone names to the IDs of the users that use them.
+        self.users_by_zone: T.DefaultDict[str, T.Set[int]] = (
+            collections.defaultdict(set)
+        )
+        #: A mapping of user IDs to their timezone names.
+        self.zone_by_user: T.Dict[int, str] = {}
+        for user_id, timezone in self.timezones.all().items():
+            self._index(int(user_id), timezone)
+
+    async def cog_unload(self):
+        await self.resolver.close()
+
+    async def set_timezone(self, user: discord.abc.User, timezone: str) -> None:
+        """Store a user's timezone."""
+        await self.reset_timezone(user)
+        # load the zone now, so the first command that uses it doesn't have to
+        await self.bot.loop.run_in_executor(None, get_zone, timezone)
+        await self.timezones.put(str(user.id), timezone)
+        self._index(user.id, timezone)
+
+    async def set_timezones(self, timezones: T.Dict[int, str]) -> None:
+        """Store the timezones of many users at once, keyed by user ID."""
+        for user_id, timezone in timezones.items():
+            self._unindex(user_id)
+            self._index(user_id, timezone)
+
+        await self.timezones.put_many(
+            {str(user_id): timezone for user_id, timezone in timezones.items()}
+        )
+
+    def _index(self, user_id: int, timezone: str) -> None:
+        self.zone_by_user[user_id] = timezone
+        self.users_by_zone[timezone].add(user_id)
+
+    def _unindex(self, user_id: int) -> None:
+        timezone = self.zone_by_user.pop(user_id, None)
+        if timezone is None:
+            return
+
+        user_ids = self.users_by_zone.get(timezone)
+        if user_ids is not None:
+            user_ids.discard(user_id)
+            if not user_ids:
+                del self.users_by_zone[timezone]
+
+    async def reset_timezone(self, user: discord.abc.User) -> None:
+        """Remove a user's timezone, if they have one."""
+        timezone = self.timezones.get(str(user.id))
+        if timezone is None:
+            return
+
+        await self.timezones.delete(str(user.id))
+        self._unindex(user.id)
+
+    def members_by_zone(
+        self, guild: discord.Guild
+    ) -> T.Dict[str, T.List[discord.Member]]:
+        """Return the members of a guild that have a timezone, grouped by it.
+
+        This goes through either the guild's cached members or the users with
+        a timezone, whichever there are fewer of.
+        """
+        zones: T.Dict[str, T.List[discord.Member]] = collections.defaultdict(list)
+
+        members = guild.members
+        if len(members) <= len(self.zone_by_user):
+            for member in members:
+                timezone = self.zone_by_user.get(member.id)
+                if timezone is not None:
+                    zones[timezone].append(member)
+        else:
+            for user_id, timezone in self.zone_by_user.items():
+                member = guild.get_member(user_id)
+                if member is not None:
+                    zones[timezone].append(member)
+
+        return dict(zones)
+
+    async def warm_up(self, progress):
+        """Load the timezones of all stored users and the timezone polygons
+        ahead of time.
+        """
+        await self.bot.loop.run_in_executor(None, finder.lookup.preload)
+
+        names = list(self.users_by_zone)
+
+        for start in range(0, len(names), 50):
+            batch = names[start : start + 50]
+            await self.bot.loop.run_in_executor(
+                None, lambda: [get_zone(name) for name in batch]
+            )
+            progress(start + len(batch), len(names))
+
     def get_timezone_for(self, user: discord.abc.User) -> T.Optional[datetime.tzinfo]:
         """Return a user's timezone as a :class:`datetime.tzinfo`."""
         timezone = self.timezones.get(str(user.id))
@@ -59,7 +165,7 @@ class Time(lifesaver.Cog):
         if not timezone:
             return None
 
-        return dateutil.tz.gettz(timezone)
+        return get_zone(timezone)
 
     def get_time_for(self, user: discord.abc.User) -> T.Optional[datetime.datetime]:
         """Return the current :class:`datetime.datetime` for a user.
@@ -185,33 +291,67 @@ class Time(lifesaver.Cog):
     async def table(self, ctx):
         """Views a timezone chart."""
 
-        map = Map(session=self.session, twelve_hour=False, loop=self.bot.loop)
+        zones = self.members_by_zone(ctx.guild)
+
+        # the chart only changes when the minute ticks over, or when somebody's
+        # timezone, avatar, or name changes
+        minute = datetime.datetime.utcnow().replace(second=0, microsecond=0)
+        key = (
+            minute,
+            frozenset(
+                (member.id, tz, member.display_avatar.key, member.name)
+                for tz, members in zones.items()
+                for member in members
+            ),
+        )
 
-        for member in ctx.guild.members:
-            tz = self.timezones.get(str(member.id))
-            if not tz:
-                continue
-            map.add_member(member, tz)
+        cached = self.charts.get(ctx.guild.id)
+        if cached is not None and cached[0] == key:
+            self.charts.move_to_end(ctx.guild.id)
+            file = discord.File(
+                fp=io.BytesIO(cached[1]), filename=f"map_{ctx.guild.id}.png"
+            )
+            await ctx.send("Rendered from cache.", file=file)
+            return
+
+        map = Map(
+            avatars=self.bot.avatar_cache,
+            twelve_hour=False,
+            renderer=self.bot.renderer,
+            loop=self.bot.loop,
+        )
 
-        with Timer() as timer:
-            await map.draw()
-            buffer = await map.render()
+        for tz, members in zones.items():
+            map.add_members(members, get_zone(tz))
+
+        try:
+            with Timer() as timer:
+                await map.draw()
+                buffer = await map.render()
+        except RendererBusy:
+            await ctx.send(
+                f"{ctx.tick(False)} Too many charts are being drawn right now."
+                " Try again in a bit."
+            )
+            return
+        finally:
+            map.close()
+
+        self.charts[ctx.guild.id] = (key, buffer.getvalue())
+        self.charts.move_to_end(ctx.guild.id)
+        while len(self.charts) > CHART_CACHE_CAPACITY:
+            self.charts.popitem(last=False)
 
         file = discord.File(fp=buffer, filename=f"map_{ctx.guild.id}.png")
         await ctx.send(f"Rendered in {timer}.", file=file)
 
-        map.close()
-
     @time.command(name="reset")
     async def time_reset(self, ctx):
         """Resets your timezone."""
         if await ctx.confirm(
             title="Are you sure?", message="Your timezone will be removed."
         ):
-            try:
-                await self.timezones.delete(str(ctx.author.id))
-            except KeyError:
-                pass
+            await self.reset_timezone(ctx.author)
             await ctx.send(f"{ctx.tick()} Your timezone was removed.")
         else:
             await ctx.send("Operation cancelled.")
@@ -280,8 +420,18 @@ class Time(lifesaver.Cog):
 
         failed_message = f"{ctx.tick(False)} {messages.UNKNOWN_LOCATION}".format(prefix=ctx.prefix)  # fmt: skip
 
+        async def on_queued(position: int, eta: float) -> None:
+            # don't bother if it's only going to take a moment
+            if eta < 3:
+                return
+            await ctx.send(
+                messages.GEOCODE_QUEUED.format(position=position + 1, eta=round(eta))
+            )
+
         try:
-            resolution = await self.resolver.resolve_timezone(location)
+            resolution = await self.resolver.resolve_timezone(
+                location, on_queued=on_queued
+            )
 
             if resolution is None:
                 await ctx.send(failed_message)
@@ -294,7 +444,7 @@ class Time(lifesaver.Cog):
             await ctx.send(failed_message)
             return
 
-        await self.timezones.put(str(ctx.author.id), str(resolution.timezone))
+        await self.set_timezone(ctx.author, str(resolution.timezone))
 
         time = self.get_time_for(ctx.author)
         assert time is not None
@@ -1,8 +1,9 @@
 import datetime
 
-import dateutil.tz
 from discord.ext import commands
 
+from .zones import get_zone
+
 
 class Timezone(commands.Converter):
     async def convert(self, ctx, argument):
@@ -10,13 +11,13 @@ class Timezone(commands.Converter):
 
         try:
             member = await commands.MemberConverter().convert(ctx, argument)
-            timezone = cog.timezones.get(member.id)
+            timezone = cog.get_timezone_for(member)
             if timezone:
-                return (member, dateutil.tz.gettz(timezone))
+                return (member, timezone)
         except commands.BadArgument:
             pass
 
-        timezone = dateutil.tz.gettz(argument)
+        timezone = get_zone(argument)
 
         if timezone is None:
             raise commands.BadArgument(
@@ -53,4 +53,6 @@ def draw_rotated_text(image, angle, xy, text, fill, *args, **kwargs):
     color_image = Image.new("RGBA", image.size, fill)
     image.paste(color_image, mask)
 
-    return draw.textsize(text=text, font=kwargs.get("font"))
+    # the size of the text, like the `textsize` that Pillow 10 removed
+    _, _, width, height = draw.textbbox((0, 0), text, font=kwargs.get("font"))
+    return width, height
@@ -0,0 +1,111 @@
+__all__ = ("TimezoneLookup", "lookup")
+
+import collections
+import logging
+import threading
+from typing import Iterable, List, Optional, OrderedDict, Tuple
+
+from timezonefinder import TimezoneFinder
+
+log = logging.getLogger(__name__)
+
+Cell = Tuple[float, float]
+
+
+class TimezoneLookup:
+    """A process-wide, thread-safe wrapper around :class:`TimezoneFinder`.
+
+    The finder keeps its polygon data in memory instead of reading it from
+    disk on demand. Since that takes a while to load, :meth:`preload` should
+    be called (in an executor) ahead of time.
+
+    Coordinates are snapped to a grid of ``precision`` decimal places (2 is
+    roughly a kilometer) and the timezones of recently looked up cells are
+    kept in an LRU, so nearby lookups are free.
+    """
+
+    def __init__(self, *, precision: int = 2, capacity: int = 4096) -> None:
+        self.precision = precision
+        self.capacity = capacity
+        self.cells: OrderedDict[Cell, Optional[str]] = collections.OrderedDict()
+
+        self._finder: Optional[TimezoneFinder] = None
+        # held while loading the polygons, which can take seconds
+        self._load_lock = threading.Lock()
+        # only ever held briefly, so the event loop can take it
+        self._cells_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<TimezoneLookup loaded={self.loaded} cells={len(self.cells)}>"
+
+    @property
+    def loaded(self) -> bool:
+        return self._finder is not None
+
+    def preload(self) -> None:
+        """Load the timezone polygons into memory. This blocks."""
+        if self._finder is not None:
+            return
+
+        with self._load_lock:
+            if self._finder is None:
+                self._finder = TimezoneFinder(in_memory=True)
+                log.debug("loaded timezone polygons")
+
+    def cell(self, latitude: float, longitude: float) -> Cell:
+        return (round(latitude, self.precision), round(longitude, self.precision))
+
+    def cached(self, latitude: float, longitude: float) -> Tuple[bool, Optional[str]]:
+        """Look up a coordinate in the cache only, without blocking.
+
+        Returns whether the cell was cached and, if it was, its timezone.
+        """
+        cell = self.cell(latitude, longitude)
+        with self._cells_lock:
+            if cell not in self.cells:
+                return False, None
+            self.cells.move_to_end(cell)
+            return True, self.cells[cell]
+
+    def timezone_at(self, latitude: float, longitude: float) -> Optional[str]:
+        """Look up the timezone at a coordinate. This may block."""
+        return self.timezones_at([(latitude, longitude)])[0]
+
+    def timezones_at(self, coordinates: Iterable[Cell]) -> List[Optional[str]]:
+        """Look up the timezones at many coordinates at once. This may block.
+
+        Coordinates that land in the same cell are only looked up once.
+        """
+        self.preload()
+
+        cells = [self.cell(latitude, longitude) for latitude, longitude in coordinates]
+        results = {}
+
+        with self._cells_lock:
+            for cell in cells:
+                if cell in self.cells:
+                    self.cells.move_to_end(cell)
+                    results[cell] = self.cells[cell]
+
+        # look the rest up without holding the lock, since polygon lookups
+        # take a while
+        finder = self._finder
+        assert finder is not None
+        for cell in cells:
+            if cell not in results:
+                latitude, longitude = cell
+                results[cell] = finder.timezone_at(lat=latitude, lng=longitude)
+
+        with self._cells_lock:
+            for cell, timezone in results.items():
+                self.cells[cell] = timezone
+                self.cells.move_to_end(cell)
+
+            while len(self.cells) > self.capacity:
+                self.cells.popitem(last=False)
+
+        return [results[cell] for cell in cells]
+
+
+#: The lookup shared by the entire process.
+lookup = TimezoneLookup()
@@ -0,0 +1,97 @@
+__all__ = ("Gazetteer", "Place")
+
+import bisect
+import logging
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from .geocache import normalize_query
+
+log = logging.getLogger(__name__)
+
+
+class Place(NamedTuple):
+    name: str
+    timezone: str
+    population: int
+
+
+class Gazetteer:
+    """An offline index of well-known places and their timezones.
+
+    Names and aliases are normalized and kept in a single sorted list, which
+    doubles as a prefix index: every name sharing a prefix is in a contiguous
+    run that can be found by bisecting. When several places share a name, the
+    most populous one wins.
+    """
+
+    def __init__(self, places: List[Tuple[Place, List[str]]]) -> None:
+        self.places = [place for place, _aliases in places]
+
+        keys = {}
+        for index, (place, aliases) in enumerate(places):
+            for name in [place.name, *aliases]:
+                key = normalize_query(name)
+                existing = keys.get(key)
+                if (
+                    existing is None
+                    or self.places[existing].population < place.population
+                ):
+                    keys[key] = index
+
+        #: Normalized names, sorted.
+        self.keys: List[str] = sorted(keys)
+
+        #: The index into ``places`` of each name in ``keys``.
+        self.indices: List[int] = [keys[key] for key in self.keys]
+
+    def __repr__(self):
+        return f"<Gazetteer places={len(self.places)} names={len(self.keys)}>"
+
+    def __len__(self):
+        return len(self.places)
+
+    @classmethod
+    def load(cls, path: Path) -> "Gazetteer":
+        """Load a gazetteer from a tab-separated file of names, timezones,
+        populations, and comma-separated aliases.
+        """
+        places = []
+        with open(path, encoding="utf-8") as fp:
+            for line in fp:
+                if line.startswith("#") or not line.strip():
+                    continue
+                name, timezone, population, aliases = line.rstrip("\n").split("\t")
+                places.append(
+                    (
+                        Place(name=name, timezone=timezone, population=int(population)),
+                        [alias for alias in aliases.split(",") if alias],
+                    )
+                )
+
+        log.debug("loaded %d places from %s", len(places), path)
+        return cls(places)
+
+    def lookup(self, query: str) -> Optional[Place]:
+        """Return the place exactly matching a name or alias."""
+        key = normalize_query(query)
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.places[self.indices[position]]
+        return None
+
+    def complete(self, prefix: str, *, limit: int = 10) -> List[Place]:
+        """Return the most populous places with a name or alias starting with
+        a prefix.
+        """
+        key = normalize_query(prefix)
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_left(self.keys, key + "\uffff", lo=start)
+
+        matches = {self.indices[position] for position in range(start, end)}
+        places = sorted(
+            (self.places[index] for index in matches),
+            key=lambda place: place.population,
+            reverse=True,
+        )
+        return places[:limit]
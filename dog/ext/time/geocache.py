@@ -0,0 +1,140 @@
+__all__ = ("GeocodeCache", "GeocodeResult", "normalize_query")
+
+import asyncio
+import collections
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Dict, NamedTuple, Optional, OrderedDict, Tuple
+
+from dog.storage import Storage
+
+log = logging.getLogger(__name__)
+
+NON_WORD_CHARACTERS = re.compile(r"[^\w]+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a place name so trivially different spellings of it (case,
+    accents, punctuation, and spacing) share a cache entry.
+    """
+    decomposed = unicodedata.normalize("NFKD", query.casefold())
+    stripped = "".join(
+        character for character in decomposed if not unicodedata.combining(character)
+    )
+    return NON_WORD_CHARACTERS.sub(" ", stripped).strip()
+
+
+class GeocodeResult(NamedTuple):
+    #: The coordinates of the place, or ``None`` if it couldn't be found.
+    location: Optional[Tuple[float, float]]
+
+    #: The timezone of the place, or ``None`` if it couldn't be found.
+    timezone: Optional[str]
+
+    @property
+    def found(self) -> bool:
+        return self.timezone is not None
+
+
+class GeocodeCache:
+    """A persistent cache of geocoded place names and their timezones.
+
+    Places that couldn't be found are cached too (for a shorter time), so
+    repeatedly asking for nonsense doesn't cost a request to the geocoder
+    each time.
+
+    Entries are kept in memory, and at most ``capacity`` of them are kept,
+    least recently used first out. New entries are saved in batches, at most
+    ``save_delay`` seconds after they're added (or when the cache is closed),
+    and expired entries are dropped whenever the cache is saved.
+    """
+
+    def __init__(
+        self,
+        file: str = "geocode_cache.json",
+        *,
+        ttl: float = 30 * 24 * 60 * 60,
+        negative_ttl: float = 24 * 60 * 60,
+        capacity: int = 10_000,
+        save_delay: float = 30.0,
+    ) -> None:
+        self.storage = Storage[dict](file)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.capacity = capacity
+        self.save_delay = save_delay
+
+        #: A mapping of normalized queries to their entries, least recently
+        #: used first.
+        self.entries: OrderedDict[str, Dict[str, Any]] = collections.OrderedDict(
+            sorted(self.storage.all().items(), key=lambda item: item[1]["expires_at"])
+        )
+        self._purge()
+        self._save_task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f"<GeocodeCache entries={len(self.entries)}>"
+
+    def _purge(self) -> None:
+        now = time.time()
+        for key in [
+            key for key, entry in self.entries.items() if entry["expires_at"] < now
+        ]:
+            del self.entries[key]
+
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def get(self, query: str) -> Optional[GeocodeResult]:
+        """Return the cached result for a query, if there is a fresh one."""
+        key = normalize_query(query)
+        entry = self.entries.get(key)
+        if entry is None or entry["expires_at"] < time.time():
+            return None
+
+        self.entries.move_to_end(key)
+        location = entry["location"]
+        return GeocodeResult(
+            location=tuple(location) if location is not None else None,
+            timezone=entry["timezone"],
+        )
+
+    async def put(self, query: str, result: GeocodeResult) -> None:
+        key = normalize_query(query)
+        if not key:
+            return
+
+        ttl = self.ttl if result.found else self.negative_ttl
+        self.entries[key] = {
+            "location": result.location,
+            "timezone": result.timezone,
+            "expires_at": time.time() + ttl,
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+        if self._save_task is None:
+            self._save_task = asyncio.get_running_loop().create_task(
+                self._save_later(), name="dog: geocode cache save"
+            )
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        await self.save()
+
+    async def save(self) -> None:
+        """Save the cache now, dropping expired entries."""
+        self._purge()
+        log.debug("saving %d geocode cache entries", len(self.entries))
+        await self.storage.replace(self.entries)
+
+    async def close(self) -> None:
+        """Save any unsaved entries."""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+            await self.save()
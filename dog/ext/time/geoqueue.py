@@ -0,0 +1,165 @@
+__all__ = ("GeocodeQueue",)
+
+import asyncio
+import collections
+import logging
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .geocache import normalize_query
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+#: Called when a request has to wait, with the number of requests ahead of it
+#: and roughly how many seconds it'll take to be served.
+QueuedCallback = Callable[[int, float], Awaitable[None]]
+
+
+class _Request(Generic[T]):
+    __slots__ = ("query", "key", "future", "waiters", "started")
+
+    def __init__(self, query: str, key: str, future: "asyncio.Future[T]") -> None:
+        self.query = query
+        self.key = key
+        self.future = future
+        self.waiters = 0
+        self.started = False
+
+
+class GeocodeQueue(Generic[T]):
+    """Serves geocoding requests one at a time, in the order they were made,
+    at most once every ``interval`` seconds.
+
+    Identical queries that are waiting (or in flight) at the same time share a
+    single upstream request. If everybody waiting on a request stops waiting
+    (e.g. the command was cancelled) before it's sent, it's dropped from the
+    queue.
+
+    ``func`` does the actual (blocking) geocoding, and is run in the default
+    executor.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[str], T],
+        *,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = 3.0,
+    ) -> None:
+        self.func = func
+        self.loop = loop
+        self.interval = interval
+
+        self.queue: Deque[_Request[T]] = collections.deque()
+        self.pending: Dict[str, _Request[T]] = {}
+
+        # the loop time at which the next request may be sent
+        self._next_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f"<GeocodeQueue queued={len(self.queue)} pending={len(self.pending)}>"
+
+    def eta(self, position: int) -> float:
+        """Estimate how long until the request at a position is sent."""
+        return max(self._next_at - self.loop.time(), 0.0) + position * self.interval
+
+    def _enqueue(self, query: str) -> Tuple[_Request[T], int]:
+        key = normalize_query(query)
+
+        request = self.pending.get(key)
+        if request is not None:
+            position = 0 if request.started else self.queue.index(request)
+            return request, position
+
+        request = self.pending[key] = _Request(query, key, self.loop.create_future())
+        self.queue.append(request)
+        self._wakeup.set()
+
+        if self._task is None:
+            self._task = self.loop.create_task(self._run(), name="dog: geocode queue")
+
+        return request, len(self.queue) - 1
+
+    async def geocode(
+        self, query: str, *, on_queued: Optional[QueuedCallback] = None
+    ) -> T:
+        """Queue up a query and wait for its result.
+
+        ``on_queued`` is awaited with the request's position and ETA if it
+        can't be sent right away.
+        """
+        request, position = self._enqueue(query)
+        request.waiters += 1
+
+        try:
+            eta = self.eta(position)
+            if on_queued is not None and not request.started and eta > 0:
+                await on_queued(position, eta)
+
+            # shielded, because other callers might be waiting on this too
+            return await asyncio.shield(request.future)
+        finally:
+            # if nobody's waiting anymore (cancelled, or `on_queued` raised),
+            # don't spend a request on it
+            request.waiters -= 1
+            if (
+                not request.waiters
+                and not request.started
+                and self.pending.get(request.key) is request
+            ):
+                log.debug("dropping abandoned geocode request for %r", query)
+                self.queue.remove(request)
+                del self.pending[request.key]
+                request.future.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            if not self.queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._next_at - self.loop.time()
+            if delay > 0:
+                # requests can be dropped while we sleep, so check again after
+                await asyncio.sleep(delay)
+                continue
+
+            request = self.queue.popleft()
+            request.started = True
+            self._next_at = self.loop.time() + self.interval
+
+            try:
+                result = await self.loop.run_in_executor(
+                    None, self.func, request.query
+                )
+            except Exception as error:
+                request.future.set_exception(error)
+                # don't complain about nobody retrieving the exception
+                request.future.exception()
+            else:
+                request.future.set_result(result)
+            finally:
+                self.pending.pop(request.key, None)
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        for request in self.pending.values():
+            request.future.cancel()
+        self.queue.clear()
+        self.pending.clear()
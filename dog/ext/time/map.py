@@ -1,55 +1,299 @@
-__all__ = ["Map"]
+__all__ = ["Map", "draw_chart", "render_chart"]
 
+import asyncio
+import collections
 import datetime
-import os
+import functools
 import inspect
 import logging
+import threading
 from collections import defaultdict
 from io import BytesIO
 from math import ceil, floor
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import Dict, List, Optional, Tuple
 
-import aiohttp
-import dateutil.tz
 import discord
 from PIL import Image, ImageDraw, ImageFont
 
 import dog
+from dog.avatars import AvatarCache, AvatarUnavailable
 from dog.ext.time.drawing import draw_text_cropped
+from dog.ext.time.zones import get_zone
+from dog.instrumentation import MAP_LATENCY, timed
+from dog.rendering import Renderer
 
 log = logging.getLogger(__name__)
 
 
+BACKGROUND_COLOR = (49, 52, 58)
+AVATAR_BACKGROUND_COLOR = (45, 47, 52)
+
+IMAGE_PADDING = 50
+CHUNK_PADDING = 20
+CHUNK_WIDTH = 500
+CHUNK_HEIGHT = 300
+CHUNKS_PER_COLUMN = 3
+AVATAR_SIZE = 64
+
+# the height of the nametag displayed inside of avatars
+NAMETAG_SIZE = 15
+
+# the total size of an avatar with padding
+AVATAR_SIZE_TOTAL = AVATAR_SIZE + (CHUNK_PADDING // 2)  # some margin
+
+
 def bot_package_path() -> Path:
     dog_init_path = Path(inspect.getfile(dog))
     return dog_init_path.parent
 
 
-# XXX: This shouldn't be _here_.
-def state_dir() -> Path:
-    if (data_directory := os.environ.get("DATA_DIRECTORY")) is not None:
-        return Path(data_directory)
-    return Path.cwd()
+@functools.lru_cache(maxsize=None)
+def load_font(filename: str, size: int) -> ImageFont.FreeTypeFont:
+    """Load a font from the assets directory, once per process."""
+    return ImageFont.truetype(str(bot_package_path() / "assets" / filename), size=size)
+
+
+#: A member as they appear on a chart: their ID, avatar hash, name, and avatar
+#: tile (or ``None`` if it couldn't be fetched).
+ChartMember = Tuple[int, str, str, Optional[Image.Image]]
+
+#: Everything needed to draw a chart: each formatted time alongside the
+#: members in it. This is picklable, so charts can be drawn in other processes.
+Chart = List[Tuple[str, List[ChartMember]]]
+
+#: A key identifying the rendered body (avatars and nametags) of a chunk.
+ChunkKey = Tuple[int, Tuple[Tuple[int, str, str], ...]]
+
+
+class ChunkCache:
+    """An LRU of rendered chunk bodies, shared by all charts drawn in this
+    process.
+
+    Chunk bodies only depend on the members inside of them (and how tall the
+    header above them is), so they can be reused across renders even as the
+    time in the header ticks forward.
+    """
+
+    def __init__(self, capacity: int = 32) -> None:
+        self.capacity = capacity
+        self.chunks: "collections.OrderedDict[ChunkKey, Image.Image]" = (
+            collections.OrderedDict()
+        )
+        # charts are drawn in executor threads
+        self._lock = threading.Lock()
+
+    def get(self, key: ChunkKey) -> Optional[Image.Image]:
+        with self._lock:
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                self.chunks.move_to_end(key)
+            return chunk
+
+    def put(self, key: ChunkKey, chunk: Image.Image) -> None:
+        with self._lock:
+            self.chunks[key] = chunk
+            self.chunks.move_to_end(key)
+            while len(self.chunks) > self.capacity:
+                self.chunks.popitem(last=False)
+
+
+chunk_cache = ChunkCache()
+
+
+def draw_chunk(members: List[ChartMember], header_height: int) -> Image.Image:
+    """Draw the body of a chunk: the avatars and nametags of its members, below
+    the header.
+    """
+    tag_font = load_font("SourceSansPro-Black.otf", 14)
+    chunk = Image.new("RGBA", (CHUNK_WIDTH, CHUNK_HEIGHT), (0, 0, 0, 0))
+
+    # a faceplate must be used in order to draw nametags because ImageDraw
+    # can't draw transparent stuff on top of the existing pixels. so, we
+    # create a new image which is exactly the size of the chunk, draw on
+    # that, then composite it exactly on top later
+    faceplate = Image.new("RGBA", chunk.size, (0, 0, 0, 0))
+    draw_faceplate = ImageDraw.Draw(faceplate)
+
+    x_top = CHUNK_PADDING
+    y_top = CHUNK_PADDING
+
+    # the y coordinate for the avatar listing
+    members_y_top = y_top + header_height
+
+    # how many avatars can fit into each row before having to wrap?
+    avatars_per_row = floor(CHUNK_WIDTH / AVATAR_SIZE_TOTAL)
+    safe_width = avatars_per_row * AVATAR_SIZE_TOTAL
+
+    # maximum number of rows of avatars that can fit in each chunk --
+    # calculated by seeing how many rows of avatars can fit in the total
+    # chunk height, along with the header
+    max_rows = floor((CHUNK_HEIGHT - header_height) / (AVATAR_SIZE_TOTAL))
+
+    for n, (_id, _avatar, name, tile) in enumerate(members):
+        row = n // avatars_per_row
+        col = n % avatars_per_row
+
+        # start collapsing on the last row, not the row after the last
+        # row.
+        if row + 1 >= max_rows:
+            # we have run out of rows! we now have to overlap avatars
+            # horizontally on the last row.
+
+            # calculate the amount of remaining avatars that still have
+            # to be rendered on the last row
+            leading_rows = max_rows - 1
+            leading_avatars = leading_rows * avatars_per_row
+            remaining = len(members[leading_avatars:])
+
+            # calculate the overlap between each avatar necessary so
+            # they can all fit into a single row. clamp down to the
+            # normal size increments (avatar size and some margins)
+            even_overlap = min(safe_width // remaining, AVATAR_SIZE_TOTAL)
+
+            x = x_top + (even_overlap * (n - leading_avatars))
+            y = members_y_top + (AVATAR_SIZE_TOTAL * leading_rows)
+        else:
+            x = x_top + (AVATAR_SIZE_TOTAL * col)
+            y = members_y_top + (AVATAR_SIZE_TOTAL * row)
+
+        # overlay transparent avatars with a subtle background
+        chunk.paste(
+            AVATAR_BACKGROUND_COLOR, box=(x, y, x + AVATAR_SIZE, y + AVATAR_SIZE)
+        )
+        if tile is not None:
+            chunk.paste(tile, box=(x, y), mask=tile)
+
+        draw_faceplate.rectangle(
+            (
+                x,
+                y + AVATAR_SIZE - NAMETAG_SIZE - 1,
+                x + AVATAR_SIZE - 1,
+                y + AVATAR_SIZE - 1,
+            ),
+            fill=(0, 0, 0, 100),
+        )
+
+        draw_text_cropped(
+            draw_faceplate,
+            (x, y + AVATAR_SIZE - NAMETAG_SIZE),
+            (0, 0, AVATAR_SIZE, NAMETAG_SIZE),
+            name,
+            fill=(255, 255, 255),
+            font=tag_font,
+        )
+
+    del draw_faceplate
+    return Image.alpha_composite(chunk, faceplate)
+
+
+def draw_chart(chart: Chart) -> Image.Image:
+    """Draw a chart, reusing the bodies of chunks that haven't changed since
+    they were last drawn in this process.
+    """
+    font = load_font("SourceSansPro-Semibold.otf", 64)
+
+    # the number of columns: for every 3 chunks, introduce a new column
+    num_columns = ceil(len(chart) / CHUNKS_PER_COLUMN)
+
+    # the width of the image: clamp down to 1 chunk wide
+    image_width = int(max(num_columns * CHUNK_WIDTH, CHUNK_WIDTH)) + IMAGE_PADDING
+
+    # the height of the image: at most, 3 chunks down vertically
+    image_height = (
+        int(
+            min(
+                # if the number of time chunks is less than 3 chunks, we can
+                # make the image smaller
+                CHUNK_HEIGHT * len(chart),
+                # max out at 3 chunks per column
+                CHUNK_HEIGHT * CHUNKS_PER_COLUMN,
+            )
+        )
+        + IMAGE_PADDING
+    )
+
+    image = Image.new("RGBA", (image_width, image_height), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+
+    font_height_offset = 20
+    font_width_offset = 5
+
+    for offset, (time, members) in enumerate(chart):
+        # calculate the coordinates of this chunk based on the offset of
+        # this timezone's presence in the list
+        x = CHUNK_WIDTH * (offset // CHUNKS_PER_COLUMN) + IMAGE_PADDING
+        y = CHUNK_HEIGHT * (offset % CHUNKS_PER_COLUMN) + IMAGE_PADDING
+
+        *_, header_height = draw.textbbox((0, 0), time, font=font)
+
+        key = (
+            header_height,
+            tuple((id, avatar, name) for id, avatar, name, _tile in members),
+        )
+        chunk = chunk_cache.get(key)
+        if chunk is None:
+            chunk = draw_chunk(members, header_height)
+            # don't keep placeholders for avatars that couldn't be fetched,
+            # so they're drawn once they can be
+            if all(tile is not None for _id, _avatar, _name, tile in members):
+                chunk_cache.put(key, chunk)
+
+        image.alpha_composite(chunk, dest=(x, y))
+
+        # draw the header of the chunk
+        draw.text(
+            (
+                x + CHUNK_PADDING - font_width_offset,
+                y + CHUNK_PADDING - font_height_offset,
+            ),
+            time,
+            fill=(255, 255, 255, 255),
+            font=font,
+        )
+
+    del draw
+    return image
+
+
+def render_chart(chart: Chart) -> bytes:
+    """Draw a chart and encode it as a PNG.
+
+    This is meant to be run in a worker process, see
+    :class:`dog.rendering.Renderer`.
+    """
+    image = draw_chart(chart)
+    try:
+        buffer = BytesIO()
+        image.save(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        image.close()
 
 
 class Map:
     def __init__(
-        self, *, session: aiohttp.ClientSession, twelve_hour: bool = False, loop
+        self,
+        *,
+        avatars: AvatarCache,
+        twelve_hour: bool = False,
+        concurrency: int = 8,
+        renderer: Optional[Renderer] = None,
+        loop,
     ):
-        font_path = bot_package_path() / "assets" / "SourceSansPro-Semibold.otf"
-        tag_font_path = bot_package_path() / "assets" / "SourceSansPro-Black.otf"
-        self.font = ImageFont.truetype(str(font_path), size=64)
-        self.tag_font = ImageFont.truetype(str(tag_font_path), size=14)
-
-        self.session = session
+        self.avatars = avatars
         self.twelve_hour = twelve_hour
+        self.concurrency = concurrency
+        self.renderer = renderer
         self.loop = loop
         self.image = None
+        self.chart: Optional[Chart] = None
         self.timezones = defaultdict(list)
 
-        self.cache = state_dir() / "avatar_cache"
-        self.cache.mkdir(exist_ok=True)
+        # every chunk is computed from the same instant, so members whose
+        # timezones currently share an offset land in the same chunk
+        self.now = datetime.datetime.now(tz=datetime.timezone.utc)
+        self._formatted: Dict[datetime.timedelta, str] = {}
 
     @property
     def format(self):
@@ -59,41 +303,81 @@ class Map:
             return "%H:%M"
 
     def close(self):
-        self.image.close()
+        if self.image is not None:
+            self.image.close()
 
     def add_member(self, member: discord.Member, timezone: str):
         """Add a member to the chart."""
-        now = datetime.datetime.now(tz=dateutil.tz.gettz(timezone))
-        formatted = now.strftime(self.format)
-        self.timezones[formatted].append(member)
-
-    async def draw_member(self, member: discord.Member, box, *, size: int, background):
-        def target(avatar_bytes):
-            # overlay transparent avatars with a subtle background
-            board = Image.new("RGBA", (size, size), background)
-            avatar = (
-                Image.open(fp=BytesIO(avatar_bytes))
-                .convert("RGBA")
-                .resize((size, size), resample=Image.LANCZOS)
-            )
-            board.paste(avatar, (0, 0), mask=avatar)
-            self.image.paste(board, box=box, mask=board)
+        self.add_members([member], get_zone(timezone))
 
-        avatar_url = str(member.display_avatar.replace(format="png", size=size))
-        filename = urlparse(avatar_url).path.split("/")[-1]
-        cached_file = self.cache / filename
-
-        if cached_file.is_file():
-            log.debug("Using cached file for %d: %s", member.id, cached_file)
-            await self.loop.run_in_executor(None, target, cached_file.read_bytes())
-        else:
-            log.debug("Fetching uncached file for %d: %s", member.id, cached_file)
-            async with self.session.get(avatar_url) as resp:
-                avatar_bytes = await resp.read()
-                cached_file.write_bytes(avatar_bytes)
-                await self.loop.run_in_executor(None, target, avatar_bytes)
+    def add_members(
+        self, members: List[discord.Member], timezone: Optional[datetime.tzinfo]
+    ):
+        """Add many members that share a timezone to the chart.
+
+        The time is only formatted once per distinct UTC offset.
+        """
+        if timezone is None:
+            return
+
+        offset = self.now.astimezone(timezone).utcoffset()
+        formatted = self._formatted.get(offset)
+        if formatted is None:
+            formatted = self._formatted[offset] = (self.now + offset).strftime(
+                self.format
+            )
+        self.timezones[formatted].extend(members)
+
+    async def prepare_avatars(
+        self, members: List[discord.Member], *, size: int
+    ) -> Dict[int, Optional[Image.Image]]:
+        """Fetch the avatars of many members as tiles, concurrently.
+
+        At most ``concurrency`` avatars are loaded at once. Members whose
+        avatar couldn't be fetched are mapped to ``None``.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prepare(member: discord.Member) -> Optional[Image.Image]:
+            async with semaphore:
+                try:
+                    return await self.avatars.tile(member.display_avatar, size=size)
+                except AvatarUnavailable as error:
+                    log.warning("Failed to fetch avatar of %d: %r", member.id, error)
+                    return None
+
+        tiles = await asyncio.gather(*(prepare(member) for member in members))
+        return {member.id: tile for member, tile in zip(members, tiles)}
+
+    async def describe(self) -> Chart:
+        """Fetch everything needed to draw this chart."""
+        tiles = await self.prepare_avatars(
+            [member for members in self.timezones.values() for member in members],
+            size=AVATAR_SIZE,
+        )
+        return [
+            (
+                time,
+                [
+                    (
+                        member.id,
+                        member.display_avatar.key,
+                        member.name,
+                        tiles[member.id],
+                    )
+                    for member in members
+                ],
+            )
+            for time, members in self.timezones.items()
+        ]
 
+    @timed(MAP_LATENCY, "render")
     async def render(self):
+        if self.renderer is not None:
+            # drawing and encoding both happen in a worker process
+            data = await self.renderer.run(render_chart, self.chart)
+            return BytesIO(data)
+
         def save():
             buffer = BytesIO()
             self.image.save(buffer, format="png")
@@ -103,142 +387,9 @@ class Map:
         buffer = await self.loop.run_in_executor(None, save)
         return buffer
 
+    @timed(MAP_LATENCY, "draw")
     async def draw(self):
-        time_chunks = list(self.timezones.keys())
-        background_color = (49, 52, 58)
-
-        image_padding = 50
-        chunk_padding = 20
-        chunk_width = 500
-        chunk_height = 300
-        chunks_per_column = 3
-
-        # the number of columns: for every 3 chunks, introduce a new column
-        num_columns = ceil(len(time_chunks) / chunks_per_column)
-
-        # the width of the image: clamp down to 1 chunk wide
-        image_width = int(max(num_columns * chunk_width, chunk_width)) + image_padding
-
-        # the height of the image: at most, 3 chunks down vertically
-        image_height = (
-            int(
-                min(
-                    # if the number of time chunks is less than 3 chunks, we can
-                    # make the image smaller
-                    chunk_height * len(time_chunks),
-                    # max out at 3 chunks per column
-                    chunk_height * chunks_per_column,
-                )
-            )
-            + image_padding
-        )
-
-        self.image = Image.new("RGBA", (image_width, image_height), background_color)
-
-        # a faceplate must be used in order to draw nametags because ImageDraw
-        # can't draw transparent stuff on top of the existing pixels. so, we
-        # create a new image which is exactly the size of the original image,
-        # draw on that, then overlay it exactly on top later
-        faceplate = Image.new("RGBA", self.image.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(self.image)
-        draw_faceplate = ImageDraw.Draw(faceplate)
-
-        font_height_offset = 20
-        font_width_offset = 5
-        avatar_size = 64
-
-        for (time, members) in self.timezones.items():
-            offset = time_chunks.index(time)
-
-            # calculate the x and y coordinates of this chunk based on the
-            # offset of this timezone's presence in the list
-            x_top = chunk_width * (offset // 3) + chunk_padding + image_padding
-            y_top = chunk_height * (offset % 3) + chunk_padding + image_padding
-
-            # draw the header of the chunk
-            draw.text(
-                (
-                    x_top - font_width_offset,
-                    y_top - font_height_offset,
-                ),
-                time,
-                fill=(255, 255, 255, 255),
-                font=self.font,
-            )
-            header_size = draw.textsize(time, font=self.font)
-
-            # the y coordinate for the avatar listing
-            members_y_top = y_top + header_size[1]
-
-            # the total size of an avatar with padding
-            avatar_size_total = avatar_size + (chunk_padding // 2)  # some margin
-
-            # how many avatars can fit into each row before having to wrap?
-            avatars_per_row = floor(chunk_width / avatar_size_total)
-            safe_width = avatars_per_row * avatar_size_total
-
-            # the height of the nametag displayed inside of avatars
-            nametag_size = 15
-
-            # maximum number of rows of avatars that can fit in each chunk --
-            # calculated by seeing how many rows of avatars can fit in the total
-            # chunk height, along with the header
-            max_rows = floor((chunk_height - header_size[1]) / (avatar_size_total))
+        self.chart = await self.describe()
 
-            for n, member in enumerate(members):
-                row = n // avatars_per_row
-                col = n % avatars_per_row
-
-                # start collapsing on the last row, not the row after the last
-                # row.
-                if row + 1 >= max_rows:
-                    # we have run out of rows! we now have to overlap avatars
-                    # horizontally on the last row.
-
-                    # calculate the amount of remaining avatars that still have
-                    # to be rendered on the last row
-                    leading_rows = max_rows - 1
-                    leading_avatars = leading_rows * avatars_per_row
-                    remaining = len(members[leading_avatars:])
-
-                    # calculate the overlap between each avatar necessary so
-                    # they can all fit into a single row. clamp down to the
-                    # normal size increments (avatar size and some margins)
-                    even_overlap = min(safe_width // remaining, avatar_size_total)
-
-                    x = x_top + (even_overlap * (n - leading_avatars))
-                    y = members_y_top + (avatar_size_total * leading_rows)
-                else:
-                    x = x_top + (avatar_size_total * col)
-                    y = members_y_top + (avatar_size_total * row)
-
-                await self.draw_member(
-                    member, (x, y), size=avatar_size, background=(45, 47, 52)
-                )
-
-                text = member.name
-
-                draw_faceplate.rectangle(
-                    (
-                        x,
-                        y + avatar_size - nametag_size - 1,
-                        x + avatar_size - 1,
-                        y + avatar_size - 1,
-                    ),
-                    fill=(0, 0, 0, 100),
-                )
-
-                draw_text_cropped(
-                    draw_faceplate,
-                    (x, y + avatar_size - nametag_size),
-                    (0, 0, avatar_size, nametag_size),
-                    text,
-                    fill=(255, 255, 255),
-                    font=self.tag_font,
-                )
-
-        # apply the transparent faceplate on top of the image
-        self.image.paste(faceplate, (0, 0), mask=faceplate)
-
-        del draw_faceplate
-        del draw
+        if self.renderer is None:
+            self.image = await self.loop.run_in_executor(None, draw_chart, self.chart)
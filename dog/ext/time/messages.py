@@ -36,6 +36,11 @@ TIMEZONE_SAVED = (
     "Use `{prefix}t` to show others your time, or use `{prefix}t <user>` to check someone else's time."
 )
 
+GEOCODE_QUEUED = (
+    "Looking that up... you're #{position} in line, so this should take about "
+    "{eta} seconds."
+)
+
 QUOTA_EXCEEDED = "Can't resolve that location right now. Please try again later."
 
 HARD_OFFSET_WARNING = (
@@ -2,9 +2,7 @@ __all__ = ("Location", "Resolver")
 
 import asyncio
 import functools
-from typing import NamedTuple, cast, Optional
-from lifesaver.utils import Ratelimiter
-from timezonefinder import TimezoneFinder
+from typing import List, NamedTuple, cast, Optional
 import logging
 import zoneinfo
 from contextlib import suppress
@@ -13,6 +11,12 @@ import geopy
 
 from dog.bot import Dogbot
 
+from . import finder
+from .gazetteer import Gazetteer
+from .geocache import GeocodeCache, GeocodeResult
+from .geoqueue import GeocodeQueue, QueuedCallback
+from .map import bot_package_path
+
 
 class Location(NamedTuple):
     latitude: float
@@ -28,26 +32,32 @@ class TimezoneResolution(NamedTuple):
 class Resolver:
     def __init__(self, *, bot: Dogbot, loop: asyncio.AbstractEventLoop) -> None:
         self.client = geopy.Nominatim(user_agent="dogbot/0.0.0 (https://slice.zone)")
-        self.timezone_finder = TimezoneFinder()
+        self.timezone_finder = finder.lookup
         # OpenStreetMap enforces a maximum of 1 request per second, but let's
         # be even more safe (and polite!)
-        self.ratelimiter = Ratelimiter(rate=1, per=3)
+        self.queue = GeocodeQueue(
+            functools.partial(self.client.geocode, exactly_one=True),
+            loop=loop,
+            interval=3,
+        )
+        self.cache = GeocodeCache()
+        self.gazetteer = Gazetteer.load(bot_package_path() / "assets" / "gazetteer.tsv")
         self.bot = bot
         self.loop = loop
         self.log = logging.getLogger(__name__)
         self.log.setLevel(logging.DEBUG)
 
-    async def geocode(self, query: str) -> Optional[Location]:
-        """Resolve the coordinates of a location as indicated by a human-friendly place name."""
-        self.log.info("geocoding: %r", query)
+    async def geocode(
+        self, query: str, *, on_queued: Optional[QueuedCallback] = None
+    ) -> Optional[Location]:
+        """Resolve the coordinates of a location as indicated by a human-friendly place name.
 
-        if self.ratelimiter.hit():
-            remaining_time = self.ratelimiter.remaining_time(True)
-            self.log.debug("hit ratelimit, sleeping for %f", remaining_time)
-            await asyncio.sleep(remaining_time)
+        Requests are queued up and sent in order. ``on_queued`` is awaited
+        with the position in the queue and an ETA if the request has to wait.
+        """
+        self.log.info("geocoding: %r", query)
 
-        geocode_partial = functools.partial(self.client.geocode, query, exactly_one=True)  # fmt: skip
-        location = cast(geopy.Location, await self.loop.run_in_executor(None, geocode_partial))  # fmt: skip
+        location = cast(geopy.Location, await self.queue.geocode(query, on_queued=on_queued))  # fmt: skip
 
         if not location:
             return None
@@ -57,14 +67,32 @@ class Resolver:
 
     async def timezone(self, location: Location) -> Optional[str]:
         """Look up the timezone appropriate for a location."""
-        lookup_partial = functools.partial(
+        cached, timezone = self.timezone_finder.cached(
+            location.latitude, location.longitude
+        )
+        if cached:
+            return timezone
+
+        return await self.loop.run_in_executor(
+            None,
             self.timezone_finder.timezone_at,
-            lng=location.longitude,
-            lat=location.latitude,
+            location.latitude,
+            location.longitude,
+        )
+
+    async def timezones(self, locations: List[Location]) -> List[Optional[str]]:
+        """Look up the timezones appropriate for many locations at once."""
+        return await self.loop.run_in_executor(
+            None, self.timezone_finder.timezones_at, locations
         )
-        return await self.loop.run_in_executor(None, lookup_partial)
 
-    async def resolve_timezone(self, query: str) -> Optional[TimezoneResolution]:
+    async def close(self) -> None:
+        self.queue.close()
+        await self.cache.close()
+
+    async def resolve_timezone(
+        self, query: str, *, on_queued: Optional[QueuedCallback] = None
+    ) -> Optional[TimezoneResolution]:
         """Try to resolve a human-friendly place name into its corresponding timezone.
 
         If a IANA timezone code is provided, it is used directly.
@@ -77,12 +105,41 @@ class Resolver:
                 timezone=query, did_geolocate=False, location=None
             )
 
-        resolved_location = await self.geocode(query)
-        if resolved_location is None:
-            return None
+        # well-known places don't need to be geocoded at all
+        place = self.gazetteer.lookup(query)
+        if place is not None:
+            self.log.info("resolved from the gazetteer: %r -> %r", query, place.name)
+            return TimezoneResolution(
+                timezone=place.timezone, did_geolocate=False, location=None
+            )
+
+        # this is checked before geocoding (and therefore the ratelimiter),
+        # so popular places resolve instantly
+        cached = self.cache.get(query)
+        if cached is not None:
+            self.log.info("resolved from the geocode cache: %r", query)
+            if not cached.found:
+                return None
+            return TimezoneResolution(
+                timezone=cached.timezone,
+                did_geolocate=True,
+                location=Location(*cached.location) if cached.location else None,
+            )
+
+        resolved_location = await self.geocode(query, on_queued=on_queued)
+        timezone = None
+        if resolved_location is not None:
+            timezone = await self.timezone(resolved_location)
+
+        await self.cache.put(
+            query,
+            GeocodeResult(
+                location=tuple(resolved_location) if timezone else None,
+                timezone=timezone,
+            ),
+        )
 
-        timezone = await self.timezone(resolved_location)
-        if timezone is None:
+        if resolved_location is None or timezone is None:
             return None
 
         return TimezoneResolution(
@@ -0,0 +1,29 @@
+__all__ = ("get_zone",)
+
+import datetime
+import functools
+import zoneinfo
+from typing import Optional
+
+import dateutil.tz
+
+
+@functools.lru_cache(maxsize=1024)
+def get_zone(name: str) -> Optional[datetime.tzinfo]:
+    """Resolve a timezone name into a :class:`datetime.tzinfo`.
+
+    Names from the tz database are resolved with :mod:`zoneinfo`. Anything
+    else (like ``UTC+1``) falls back to :func:`dateutil.tz.gettz`. ``None`` is
+    returned if the name can't be resolved at all.
+
+    Results are cached, so this is cheap to call for every request.
+    """
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        pass
+
+    try:
+        return dateutil.tz.gettz(name)
+    except ValueError:
+        return None
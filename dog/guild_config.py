@@ -1,17 +1,103 @@
-__all__ = ["GuildConfigManager"]
+__all__ = ["Editors", "GuildConfigManager", "compile_editors", "parse_config"]
 
+import asyncio
+import functools
 import logging
-from typing import Optional, TypeVar, Union
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, NamedTuple, Optional, TypeVar, Union
 
 import discord
-from lifesaver.bot.storage import Storage
 from ruamel.yaml.error import YAMLError
 from ruamel.yaml import YAML
 
+from .storage import Storage
+
 T = TypeVar("T")
 GuildOrGuildID = Union[discord.Guild, int]
 log = logging.getLogger(__name__)
 
+# Marks a cached configuration that failed to parse, so broken YAML isn't
+# parsed again on every single lookup.
+_INVALID = object()
+
+# YAML instances hold parser state and aren't safe to share between threads,
+# so each executor thread lazily creates its own.
+_local = threading.local()
+
+
+def _yaml(*, roundtrip: bool) -> YAML:
+    attribute = "roundtrip" if roundtrip else "safe"
+    yaml = getattr(_local, attribute, None)
+
+    if yaml is None:
+        # The safe loader uses the C-based parser from ruamel.yaml.clib when it
+        # is available, which is considerably faster than the pure Python
+        # round-trip loader.
+        yaml = YAML() if roundtrip else YAML(typ="safe")
+        setattr(_local, attribute, yaml)
+
+    return yaml
+
+
+def parse_config(text: str, *, roundtrip: bool = False) -> Any:
+    """Parse configuration text.
+
+    The round-trip loader preserves comments and formatting, and should only
+    be used when the configuration is going to be dumped back out again.
+
+    Raises :class:`ruamel.yaml.error.YAMLError` if the text is invalid.
+    """
+    return _yaml(roundtrip=roundtrip).load(text)
+
+
+class Editors(NamedTuple):
+    """The ``editors`` of a configuration, compiled into sets for quick
+    membership tests.
+    """
+
+    #: The IDs of users that can edit.
+    user_ids: FrozenSet[int]
+
+    #: The tags (name#discriminator) of users that can edit.
+    tags: FrozenSet[str]
+
+    #: The IDs of roles whose members can edit.
+    role_ids: FrozenSet[int]
+
+
+NO_EDITORS = Editors(frozenset(), frozenset(), frozenset())
+
+
+def compile_editors(config: Any) -> Optional[Editors]:
+    """Compile the ``editors`` of a parsed configuration.
+
+    ``None`` is returned if there's no configuration at all.
+    """
+    if config is None:
+        return None
+    if not isinstance(config, dict):
+        return NO_EDITORS
+
+    editors = config.get("editors", [])
+
+    # a list of "user targets" (the usual case). ids can refer to either
+    # users or roles
+    if isinstance(editors, list):
+        ids = frozenset(
+            editor
+            for editor in editors
+            if isinstance(editor, int) and not isinstance(editor, bool)
+        )
+        tags = frozenset(editor for editor in editors if isinstance(editor, str))
+        return Editors(user_ids=ids, tags=tags, role_ids=ids)
+
+    # a singular user id
+    if isinstance(editors, int) and not isinstance(editors, bool):
+        return NO_EDITORS._replace(user_ids=frozenset([editors]))
+
+    return NO_EDITORS
+
 
 def into_str_id(entity: Union[discord.Guild, int]) -> str:
     """Ensures that an object is a string of an ID."""
@@ -23,9 +109,11 @@ def into_str_id(entity: Union[discord.Guild, int]) -> str:
 class GuildConfigManager:
     def __init__(self, bot) -> None:
         self.bot = bot
-        self.yaml = YAML()
         self.persistent = Storage[str]("guild_configs.json")
-        self.parsed_cache = {}
+
+        #: A mapping of guild IDs to tuples of the configuration text, the
+        #: parsed configuration, and its compiled editors.
+        self.parsed_cache: dict[str, tuple[str, Any, Optional[Editors]]] = {}
 
     def resolve_guild(self, guild_or_id: GuildOrGuildID) -> Optional[discord.Guild]:
         if isinstance(guild_or_id, int):
@@ -55,39 +143,55 @@ class GuildConfigManager:
             return False
 
         # owners can always edit the guild's configuration
-        if guild.owner == user:
+        if guild.owner_id == user.id:
             return True
 
-        config = with_config or self.get(guild)
+        if with_config:
+            editors = compile_editors(with_config)
+        else:
+            editors = self.get_editors(guild)
         member = guild.get_member(user.id)
 
         # if there's no config, let people who can ban members edit the config.
         # this is useful for expediting setup.
-        if config is None:
+        if editors is None:
             return member is not None and member.guild_permissions.ban_members
 
-        editors = config.get("editors", [])
-
-        # a list of "user targets" to check against for this specific user
-        # (the usual code path)
-        if isinstance(editors, list):
-            return (
-                # name#discriminator
-                str(user) in editors
-                # user id
-                or user.id in editors
-                # role id
-                or (
-                    member is not None
-                    and any(role.id in editors for role in member.roles)
-                )
-            )
+        # user id
+        if user.id in editors.user_ids:
+            return True
+
+        # name#discriminator
+        if editors.tags and str(user) in editors.tags:
+            return True
+
+        if member is None:
+            return False
+
+        # role id. everyone has the @everyone role, whose id is the guild's
+        if guild.id in editors.role_ids:
+            return True
+
+        # `_roles` holds the ids of the member's other roles, which saves
+        # resolving every one of them into a role object like `roles` does
+        return not editors.role_ids.isdisjoint(member._roles)
 
-        # a singular id
-        if isinstance(editors, int):
-            return user.id == editors
+    def get_editors(self, guild: GuildOrGuildID) -> Optional[Editors]:
+        """Return the compiled editors of a guild's configuration, or ``None``
+        if it has no (valid) configuration.
+        """
+        key = into_str_id(guild)
+        config = self.persistent.get(key)
+
+        if not config:
+            return None
 
-        return False
+        cached = self.parsed_cache.get(key)
+        if cached is None or cached[0] != config:
+            self.get(guild)
+            cached = self.parsed_cache[key]
+
+        return cached[2]
 
     async def write(self, guild: GuildOrGuildID, config: str) -> None:
         """Write the configuration of a guild.
@@ -104,6 +208,10 @@ class GuildConfigManager:
         """
         await self.persistent.put(into_str_id(guild), config)
 
+        # parse off of the event loop now, so the upcoming lookup (and any
+        # listeners that are dispatched) hit the cache
+        await self._cache(into_str_id(guild), config)
+
         guild = self.resolve_guild(guild)
 
         if guild is not None:
@@ -113,6 +221,25 @@ class GuildConfigManager:
             )
             self.bot.dispatch("guild_config_edit", guild, parsed_config)
 
+    async def write_many(self, configs: Dict[str, str]) -> None:
+        """Write the configurations of many guilds at once, keyed by guild ID.
+
+        The configurations are saved together, then ``guild_config_edit`` is
+        dispatched for each guild that the bot is in.
+        """
+        await self.persistent.put_many(configs)
+
+        def parse_all():
+            for key, config in configs.items():
+                self._parse_for_cache(key, config)
+
+        await self.bot.loop.run_in_executor(None, parse_all)
+
+        for key in configs:
+            guild = self.bot.get_guild(int(key))
+            if guild is not None:
+                self.bot.dispatch("guild_config_edit", guild, self.get(guild))
+
     def get(
         self, guild: GuildOrGuildID, default: T = None, *, yaml: bool = False
     ) -> Union[dict, str, T]:
@@ -128,7 +255,8 @@ class GuildConfigManager:
         yaml
             Return raw configuration text rather than the parsed configuration.
         """
-        config = self.persistent.get(into_str_id(guild))
+        key = into_str_id(guild)
+        config = self.persistent.get(key)
 
         if not config:  # handles both None and empty string
             return default
@@ -138,17 +266,98 @@ class GuildConfigManager:
             return config
 
         # use the parsed version in cache if available
-        if config in self.parsed_cache:
-            return self.parsed_cache[config]
+        cached = self.parsed_cache.get(key)
+        if cached is not None and cached[0] == config:
+            result = cached[1]
+        else:
+            # this only happens if the configuration was changed behind our
+            # back, since everything is parsed by `prewarm` and `write`
+            started_at = time.perf_counter()
+            result = self._parse_for_cache(key, config)
+            log.debug(
+                "parsed config for %s on the event loop (%.2fms)",
+                key,
+                (time.perf_counter() - started_at) * 1000,
+            )
 
+        if result is _INVALID:
+            return default
+        return result
+
+    def _parse_for_cache(self, key: str, config: str) -> Any:
         try:
-            result = self.yaml.load(config)
-            self.parsed_cache[config] = result
-            return result
+            result = parse_config(config)
         except YAMLError:
-            log.warning("Invalid YAML config (%s): %s", into_str_id(guild), config)
+            log.warning("Invalid YAML config (%s): %s", key, config)
+            result = _INVALID
+
+        editors = None if result is _INVALID else compile_editors(result)
+        self.parsed_cache[key] = (config, result, editors)
+        return result
+
+    async def _cache(self, key: str, config: str) -> None:
+        await self.bot.loop.run_in_executor(
+            None, functools.partial(self._parse_for_cache, key, config)
+        )
+
+    async def parse(self, text: str, *, roundtrip: bool = False) -> Any:
+        """Parse configuration text in a worker thread.
+
+        Raises :class:`ruamel.yaml.error.YAMLError` if the text is invalid.
+        """
+        return await self.bot.loop.run_in_executor(
+            None, functools.partial(parse_config, text, roundtrip=roundtrip)
+        )
+
+    async def get_roundtrip(self, guild: GuildOrGuildID, default: T = None):
+        """Return the configuration of a guild, parsed with the round-trip
+        loader in a worker thread.
+
+        Use this instead of :meth:`get` when the configuration is going to be
+        modified and written back, so comments and formatting are kept.
+        """
+        config = self.get(guild, yaml=True)
+
+        if not config:
             return default
 
+        try:
+            return await self.parse(config, roundtrip=True)
+        except YAMLError:
+            return default
+
+    async def prewarm(
+        self,
+        *,
+        batch_size: int = 50,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """Parse all stored configurations in worker threads.
+
+        Configurations are parsed in concurrent batches of ``batch_size``.
+        ``progress`` is called with the number of parsed configurations and
+        the total after each batch.
+        """
+        started_at = time.perf_counter()
+        configs = [
+            (key, config)
+            for key, config in self.persistent.all().items()
+            if config and self.parsed_cache.get(key, (None,))[0] != config
+        ]
+
+        for start in range(0, len(configs), batch_size):
+            batch = configs[start : start + batch_size]
+            await asyncio.gather(*(self._cache(key, config) for key, config in batch))
+
+            if progress is not None:
+                progress(start + len(batch), len(configs))
+
+        log.info(
+            "prewarmed %d guild config(s) in %.2fms",
+            len(configs),
+            (time.perf_counter() - started_at) * 1000,
+        )
+
     def __getitem__(self, guild: GuildOrGuildID) -> str:
         config = self.get(guild)
         if not config:
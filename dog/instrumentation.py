@@ -0,0 +1,270 @@
+__all__ = [
+    "Counter",
+    "Histogram",
+    "timed",
+    "render",
+    "registry",
+    "EVENTS",
+    "LISTENER_LATENCY",
+    "COMMAND_LATENCY",
+    "KEEPER_CHECK_LATENCY",
+    "MAP_LATENCY",
+    "STORAGE_WRITE_LATENCY",
+    "WEB_LATENCY",
+    "LOOP_LAG",
+    "LOOP_STALLS",
+]
+
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = Tuple[str, ...]
+
+# Metrics are plain in-process counters and histograms that are rendered in the
+# Prometheus text exposition format. Recording a sample is a dictionary lookup
+# and a bisection, so instrumenting hot paths stays cheap.
+
+#: Every metric that has been created, in order of creation.
+registry: List["Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        registry.append(self)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A monotonically increasing count, optionally split by labels."""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+            for labels, value in self.values.items()
+        ]
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started_at")
+
+    def __init__(self, histogram: "Histogram", labels: Labels) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started_at, *self.labels)
+
+
+class Histogram(Metric):
+    """A distribution of observed values (usually durations in seconds),
+    counted into fixed buckets and optionally split by labels.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Labels, _Series] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            # the final slot counts values above the largest bucket (+Inf)
+            series = self.series[labels] = _Series(len(self.buckets) + 1)
+
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def time(self, *labels: str) -> _Timer:
+        """Return a context manager that observes the time spent inside of it."""
+        return _Timer(self, labels)
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Estimate a quantile of a series, as the upper bound of the bucket
+        that contains it.
+        """
+        series = self.series.get(labels)
+        if series is None or not series.count:
+            return None
+
+        target = q * series.count
+        seen = 0
+        for bound, count in zip(self.buckets, series.counts):
+            seen += count
+            if seen >= target:
+                return bound
+
+        return float("inf")
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = self.label_names + ("le",)
+
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, labels + (str(bound),))}"
+                    f" {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))}"
+                f" {series.count}"
+            )
+
+            formatted_labels = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{formatted_labels} {series.sum}")
+            lines.append(f"{self.name}_count{formatted_labels} {series.count}")
+
+        return lines
+
+
+def timed(histogram: Histogram, *labels: str):
+    """Decorate a function (or coroutine function) to observe how long it
+    takes to run.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapped(*args, **kwargs):
+                started_at = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started_at, *labels)
+
+            return async_wrapped
+
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started_at, *labels)
+
+        return wrapped
+
+    return decorator
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+EVENTS = Counter(
+    "dog_events_total",
+    "Events dispatched to listeners, by cog and event.",
+    ("cog", "event"),
+)
+LISTENER_LATENCY = Histogram(
+    "dog_listener_seconds", "Time spent running event listeners.", ("event",)
+)
+COMMAND_LATENCY = Histogram(
+    "dog_command_seconds", "Time spent invoking commands.", ("command",)
+)
+KEEPER_CHECK_LATENCY = Histogram(
+    "dog_keeper_check_seconds", "Time spent gatekeeping joining members."
+)
+MAP_LATENCY = Histogram(
+    "dog_time_map_seconds", "Time spent drawing and rendering time maps.", ("stage",)
+)
+STORAGE_WRITE_LATENCY = Histogram(
+    "dog_storage_write_seconds", "Time spent writing to storage.", ("storage",)
+)
+WEB_LATENCY = Histogram(
+    "dog_web_request_seconds",
+    "Time spent handling web requests.",
+    ("endpoint", "status"),
+)
+LOOP_LAG = Histogram(
+    "dog_event_loop_lag_seconds", "How late the event loop was in waking up."
+)
+LOOP_STALLS = Counter(
+    "dog_event_loop_stalls_total", "Event loop wakeups that were late enough to stall."
+)
@@ -0,0 +1,78 @@
+__all__ = ["LoopMonitor"]
+
+import asyncio
+import logging
+from typing import Optional
+
+from dog.instrumentation import LOOP_LAG, LOOP_STALLS
+
+log = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measures how late the event loop is in waking up sleeping tasks.
+
+    A task repeatedly sleeps for ``interval`` seconds and records how much
+    longer than that it actually took to be resumed. Any delay is time where
+    something was hogging the loop (parsing, image processing, etc.) and no
+    other events could be handled. Delays longer than ``threshold`` are
+    counted as stalls and logged.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        interval: float = 0.25,
+        threshold: float = 0.1,
+    ) -> None:
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+
+        #: The lag measured on the most recent wakeup, in seconds.
+        self.last_lag: float = 0.0
+
+        #: The largest lag ever measured, in seconds.
+        self.max_lag: float = 0.0
+
+        #: The number of wakeups that were late by more than ``threshold``.
+        self.stalls: int = 0
+
+        #: The total amount of time spent stalled, in seconds.
+        self.stalled_for: float = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return (
+            f"<LoopMonitor last_lag={self.last_lag:.4f} max_lag={self.max_lag:.4f}"
+            f" stalls={self.stalls}>"
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = self.loop.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def record(self, lag: float) -> None:
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        LOOP_LAG.observe(lag)
+
+        if lag >= self.threshold:
+            self.stalls += 1
+            LOOP_STALLS.inc()
+            self.stalled_for += lag
+            log.warning("event loop stalled for %.1fms", lag * 1000)
+
+    async def _run(self) -> None:
+        while True:
+            started_at = self.loop.time()
+            await asyncio.sleep(self.interval)
+            lag = self.loop.time() - started_at - self.interval
+            self.record(max(lag, 0.0))
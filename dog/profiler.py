@@ -0,0 +1,177 @@
+__all__ = ["Profile", "ProfilerBusy", "profile"]
+
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Counter, List, Optional, Tuple
+
+# Only one profile may be taken at a time, since sampling every thread in the
+# process isn't free.
+_lock = threading.Lock()
+
+# Frames that mean a thread is waiting for something to do rather than
+# burning CPU. Samples that end in these are dropped.
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+class Profile:
+    """The result of sampling the stacks of the process's threads."""
+
+    def __init__(self, duration: float, interval: float) -> None:
+        self.duration = duration
+        self.interval = interval
+
+        #: The number of times all threads were sampled.
+        self.rounds = 0
+
+        #: A counter of semicolon-separated stacks (root first) to the number
+        #: of samples in which they were seen.
+        self.stacks: Counter[str] = collections.Counter()
+
+        #: A counter of task names (on the event loop thread) to samples.
+        self.tasks: Counter[str] = collections.Counter()
+
+        #: A counter of functions to the number of samples in which they were
+        #: the innermost frame.
+        self.functions: Counter[str] = collections.Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        """Render this profile in the collapsed stack format understood by
+        flamegraph.pl, speedscope, and friends.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+    def summary(self, *, limit: int = 10) -> str:
+        """Summarize which tasks and functions dominated the samples."""
+        total = self.samples or 1
+
+        def lines(counter: Counter[str]) -> str:
+            return "\n".join(
+                f"{count / total:6.1%}  {name}"
+                for name, count in counter.most_common(limit)
+            )
+
+        return (
+            f"{self.samples} samples over {self.rounds} rounds"
+            f" ({self.duration:.1f}s at {self.interval * 1000:.0f}ms)\n\n"
+            f"# Tasks\n{lines(self.tasks) or 'none'}\n\n"
+            f"# Functions (self)\n{lines(self.functions) or 'none'}"
+        )
+
+
+def _walk(frame) -> List[Tuple[str, str, str]]:
+    """Return the filename, name, and qualified name of each frame in a stack,
+    outermost first."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        stack.append(
+            (filename, code.co_name, getattr(code, "co_qualname", code.co_name))
+        )
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _task_name(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    # this is read from another thread, but it's only a lookup
+    task = asyncio.current_task(loop)
+    if task is None:
+        return None
+    return task.get_name()
+
+
+def _sample(
+    duration: float, interval: float, loop: asyncio.AbstractEventLoop, loop_thread_id
+) -> Profile:
+    profile = Profile(duration, interval)
+    own_id = threading.get_ident()
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+
+            stack = _walk(frame)
+            if not stack or stack[-1][:2] in IDLE_FRAMES:
+                continue
+
+            roots = [names.get(thread_id, str(thread_id))]
+            if thread_id == loop_thread_id:
+                roots[0] = "event loop"
+                task_name = _task_name(loop)
+                if task_name is not None:
+                    roots.append(task_name)
+                    profile.tasks[task_name] += 1
+
+            frames = [f"{name} ({filename})" for filename, _, name in stack]
+            profile.stacks[";".join(roots + frames)] += 1
+            profile.functions[frames[-1]] += 1
+
+        profile.rounds += 1
+        time.sleep(interval)
+
+    return profile
+
+
+async def profile(
+    loop: asyncio.AbstractEventLoop,
+    *,
+    duration: float,
+    interval: float = 0.005,
+) -> Profile:
+    """Sample the stacks of every thread in the process for ``duration``
+    seconds, including the event loop thread and executor threads.
+
+    Sampling happens in a dedicated thread, so the event loop is free to keep
+    running (and being profiled) in the meantime.
+
+    Raises :class:`ProfilerBusy` if a profile is already being taken.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being taken.")
+
+    future = loop.create_future()
+    loop_thread_id = threading.get_ident()
+
+    def settle(result, error):
+        # the awaiting task could've been cancelled while we were sampling
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        try:
+            result = _sample(duration, interval, loop, loop_thread_id)
+        except Exception as error:
+            loop.call_soon_threadsafe(settle, None, error)
+        else:
+            loop.call_soon_threadsafe(settle, result, None)
+        finally:
+            _lock.release()
+
+    threading.Thread(target=target, name="dog-profiler", daemon=True).start()
+    return await future
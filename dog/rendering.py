@@ -0,0 +1,98 @@
+__all__ = ["Renderer", "RendererBusy"]
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RendererBusy(RuntimeError):
+    """Raised when too many renders are already queued up."""
+
+
+class Renderer:
+    """Runs image rendering in a pool of worker processes.
+
+    PIL releases the GIL for some operations, but drawing and compositing are
+    largely bound to it, so rendering in threads doesn't scale across cores.
+    Functions submitted here must be picklable (defined at the top level of a
+    module), as must their arguments and return values.
+
+    At most ``max_pending`` renders may be queued or running at once. Past
+    that, :meth:`run` raises :class:`RendererBusy` instead of letting the
+    queue (and the memory held by it) grow without bound.
+    """
+
+    def __init__(
+        self,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        processes: int = 2,
+        max_pending: int = 16,
+    ) -> None:
+        self.loop = loop
+        self.processes = processes
+        self.max_pending = max_pending
+
+        #: The number of renders that are queued or running.
+        self.pending = 0
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __repr__(self):
+        return (
+            f"<Renderer processes={self.processes} pending={self.pending}"
+            f" max_pending={self.max_pending}>"
+        )
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # don't fork, because the worker would inherit the event loop, open
+        # sockets, and every other thread's locks in whatever state they're in
+        context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = self._create_pool()
+        return self._pool
+
+    @property
+    def busy(self) -> bool:
+        return self.pending >= self.max_pending
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Run a function in a worker process and return its result.
+
+        Raises :class:`RendererBusy` if ``max_pending`` renders are already
+        queued or running.
+        """
+        if self.busy:
+            raise RendererBusy("Too many images are being rendered right now.")
+
+        self.pending += 1
+        try:
+            pool = self.pool
+            try:
+                return await self.loop.run_in_executor(pool, func, *args)
+            except BrokenProcessPool:
+                # a worker died (killed by the OOM killer, etc.), which makes
+                # the entire pool unusable. replace it for the next render
+                log.warning("rendering process pool broke, replacing it")
+                if self._pool is pool:
+                    self._pool = None
+                    pool.shutdown(wait=False)
+                raise
+        finally:
+            self.pending -= 1
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
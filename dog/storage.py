@@ -0,0 +1,39 @@
+__all__ = ["Storage"]
+
+from typing import Mapping, TypeVar
+
+from lifesaver.bot import storage
+
+from dog.instrumentation import STORAGE_WRITE_LATENCY
+
+VT = TypeVar("VT")
+
+
+class Storage(storage.Storage[VT]):
+    """A :class:`lifesaver.bot.storage.Storage` that records how long writes
+    take.
+    """
+
+    def __init__(self, file: str, *args, **kwargs) -> None:
+        super().__init__(file, *args, **kwargs)
+        self.name = file
+
+    async def put(self, key, value) -> None:
+        with STORAGE_WRITE_LATENCY.time(self.name):
+            await super().put(key, value)
+
+    async def put_many(self, items: Mapping[str, VT]) -> None:
+        """Put many values at once, only saving the file a single time."""
+        with STORAGE_WRITE_LATENCY.time(self.name):
+            self._data.update({str(key): value for key, value in items.items()})
+            await self.save()
+
+    async def replace(self, items: Mapping[str, VT]) -> None:
+        """Replace everything with new values, saving the file a single time."""
+        with STORAGE_WRITE_LATENCY.time(self.name):
+            self._data = {str(key): value for key, value in items.items()}
+            await self.save()
+
+    async def delete(self, key) -> None:
+        with STORAGE_WRITE_LATENCY.time(self.name):
+            await super().delete(key)
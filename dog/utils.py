@@ -1,3 +1,7 @@
+import os
+from pathlib import Path
+
+
 def chained_decorators(decorators):
     def decorator(func):
         for decorator in decorators:
@@ -5,3 +9,10 @@ def chained_decorators(decorators):
         return func
 
     return decorator
+
+
+def state_dir() -> Path:
+    """Return the directory that state (caches, etc.) should be stored in."""
+    if (data_directory := os.environ.get("DATA_DIRECTORY")) is not None:
+        return Path(data_directory)
+    return Path.cwd()
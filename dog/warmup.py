@@ -0,0 +1,72 @@
+__all__ = ["WarmUp"]
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+Progress = Callable[[int, int], None]
+
+
+class WarmUp:
+    """Prepares expensive, lazily created state ahead of time after startup.
+
+    Without this, the first message or join in each guild pays for parsing
+    its configuration, creating its Keeper, and so on.
+
+    Warming up happens in stages. First, all guild configurations are parsed
+    in concurrent batches of worker threads. Then, once the bot is ready, each
+    cog that defines an asynchronous ``warm_up`` method has it called with a
+    progress callback. These methods should do their work in batches and
+    yield to the event loop in between, so the bot stays responsive.
+    """
+
+    def __init__(self, bot, *, batch_size: int = 50) -> None:
+        self.bot = bot
+        self.batch_size = batch_size
+
+        #: Set once all stages have finished.
+        self.finished = asyncio.Event()
+
+        self._task = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = self.bot.loop.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _progress(self, stage: str) -> Progress:
+        def report(done: int, total: int) -> None:
+            log.info("warm-up: %s (%d/%d)", stage, done, total)
+
+        return report
+
+    async def run(self) -> None:
+        started_at = time.perf_counter()
+
+        await self.bot.guild_configs.prewarm(
+            batch_size=self.batch_size, progress=self._progress("guild configs")
+        )
+
+        # cogs are only guaranteed to be loaded (and guilds to be available)
+        # once we're ready
+        await self.bot.wait_until_ready()
+
+        for name, cog in list(self.bot.cogs.items()):
+            warm_up = getattr(cog, "warm_up", None)
+            if warm_up is None:
+                continue
+
+            try:
+                await warm_up(self._progress(name))
+            except Exception:
+                log.exception("failed to warm up %s", name)
+
+        log.info("warm-up finished in %.2fs", time.perf_counter() - started_at)
+        self.finished.set()
@@ -1,93 +1,101 @@
-from typing import cast, Any
+import asyncio
 
-import discord
-from quart import Blueprint, g
+from quart import Blueprint
+from quart import current_app as app
+from quart import g
 from quart import jsonify as json
-from quart import request
-from ruamel.yaml import YAML, YAMLError
+from quart import Response, request
+from ruamel.yaml import YAMLError
 
-from dog.bot import TYPE_CHECKING
+from dog import backup
+from dog.guild_config import parse_config
 
-from .decorators import require_auth
-
-if TYPE_CHECKING:
-    from dog.bot import Dogbot
+from .backend import BackendError
+from .cache import cached
+from .decorators import require_auth, require_owner, require_token
+from .events import format_event
+from .streaming import stream_json_array
 
 api = Blueprint("api", __name__)
-yaml = YAML(typ="safe")
-
 
-def global_bot() -> "Dogbot":
-    return cast("Dogbot", g.bot)
+# How often to send a comment down idle event streams, so proxies don't time
+# them out.
+KEEPALIVE_INTERVAL = 15.0
 
+UNKNOWN_GUILD = {
+    "error": True,
+    "message": "Unknown guild.",
+    "code": "UNKNOWN_GUILD",
+}
 
-def inflate_guild(guild: discord.Guild) -> dict[str, Any]:
-    icon = guild.icon
-    if icon is not None:
-        icon = icon.replace(size=64, format="png")
-    assert guild.owner is not None  # when can this be None, though?
 
-    return {
-        "id": str(guild.id),
-        "name": guild.name,
-        "members": guild.member_count,
-        "owner": {"id": str(guild.owner.id), "tag": str(guild.owner)},
-        "icon_url": str(icon),
-    }
+async def editable_guild(guild_id: int):
+    """Return a guild if the current user can edit it."""
+    guild = await g.backend.guild(guild_id)
+    if guild is None or not await g.backend.can_edit(g.user_id, guild_id):
+        return None
+    return guild
 
 
 @api.route("/status")
+@cached(5)
 async def api_ping():
-    bot = global_bot()
+    return json(await g.backend.status())
+
 
-    return json(
-        {"ready": bot.is_ready(), "ping": bot.latency, "guilds": len(bot.guilds)}
+@api.route("/metrics")
+@require_token("METRICS_TOKEN")
+async def api_metrics():
+    return Response(
+        await g.backend.metrics(), content_type="text/plain; version=0.0.4"
+    )
+
+
+@api.route("/profile")
+@require_auth
+@require_owner
+async def api_profile():
+    seconds = min(max(request.args.get("seconds", 10.0, type=float), 1.0), 60.0)
+    summary = request.args.get("format") == "summary"
+
+    # `BackendError`s (like PROFILER_BUSY) are handled by the app
+    result = await g.backend.profile(seconds, summary)
+
+    if summary:
+        return Response(result, content_type="text/plain")
+
+    return Response(
+        result,
+        content_type="text/plain",
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
     )
 
 
 @api.route("/guild/<int:guild_id>", methods=["GET"])
 @require_auth
+@cached(60, per_user=True)
 async def api_guild(guild_id):
-    bot = global_bot()
-    guild = bot.get_guild(guild_id)
+    guild = await editable_guild(guild_id)
 
-    if guild is None or not bot.guild_configs.can_edit(g.user, guild_id):
-        return (
-            json(
-                {
-                    "error": True,
-                    "message": "Unknown guild.",
-                    "code": "UNKNOWN_GUILD",
-                }
-            ),
-            404,
-        )
+    if guild is None:
+        return json(UNKNOWN_GUILD), 404
 
-    return json(inflate_guild(guild))
+    return json(guild)
 
 
 @api.route("/guild/<int:guild_id>/config", methods=["GET", "PATCH"])
 @require_auth
 async def api_guild_config(guild_id):
-    guild = global_bot().get_guild(guild_id)
-
-    if guild is None or not g.bot.guild_configs.can_edit(g.user, guild_id):
-        return (
-            json(
-                {
-                    "error": True,
-                    "message": "Unknown guild.",
-                    "code": "UNKNOWN_GUILD",
-                }
-            ),
-            404,
-        )
+    if await editable_guild(guild_id) is None:
+        return json(UNKNOWN_GUILD), 404
 
     if request.method == "PATCH":
         text = await request.get_data(as_text=True)
 
         try:
-            yml = yaml.load(text)
+            yml = await asyncio.get_running_loop().run_in_executor(
+                None, parse_config, text
+            )
         except YAMLError as err:
             return (
                 json(
@@ -100,48 +108,132 @@ async def api_guild_config(guild_id):
                 400,
             )
 
-        if not g.bot.guild_configs.can_edit(g.user, guild_id, with_config=yml):
+        # of course, it's possible for a singular, basic scalar value to be
+        # passed in
+        if yml is not None and not isinstance(yml, dict):
             return (
                 json(
                     {
                         "error": True,
-                        "message": "This configuration will lock you out. Make sure to add yourself as an editor.",
-                        "code": "SELF_LOCKOUT",
+                        "message": "This configuration isn't a mapping.",
+                        "code": "INVALID_CONFIG",
                     }
                 ),
-                403,
+                400,
             )
 
-        # of course, it's possible for a singular, basic scalar value to be
-        # passed in
-        if yml is not None and not isinstance(yml, dict):
+        # only the editors matter for this check, so don't bother sending the
+        # rest of the config to the backend
+        with_config = {"editors": yml.get("editors", [])} if yml else yml
+        if not await g.backend.can_edit(g.user_id, guild_id, with_config):
             return (
                 json(
                     {
                         "error": True,
-                        "message": "This configuration isn't a mapping.",
-                        "code": "INVALID_CONFIG",
+                        "message": "This configuration will lock you out. Make sure to add yourself as an editor.",
+                        "code": "SELF_LOCKOUT",
                     }
                 ),
-                400,
+                403,
             )
 
-        await g.bot.guild_configs.write(guild_id, text)
+        await g.backend.write_config(guild_id, text)
         return json({"success": True})
 
-    config = g.bot.guild_configs.get(guild_id, yaml=True)
+    config = await g.backend.get_config(guild_id)
     return json({"guild_id": guild_id, "config": config})
 
 
+@api.route("/guild/<int:guild_id>/events")
+@require_auth
+async def api_guild_events(guild_id):
+    if await editable_guild(guild_id) is None:
+        return json(UNKNOWN_GUILD), 404
+
+    backend = g.backend
+    user_id = g.user_id
+    subscription = app.broadcaster.subscribe(guild_id)
+
+    async def stream():
+        try:
+            # have clients wait a bit before reconnecting
+            yield b"retry: 5000\n\n"
+
+            while True:
+                try:
+                    item = await subscription.get(timeout=KEEPALIVE_INTERVAL)
+                except EOFError:
+                    return
+
+                if item is None:
+                    yield b": keepalive\n\n"
+                    continue
+
+                event, data = item
+                # a config edit can remove the user as an editor
+                if event == "guild_config_edit":
+                    try:
+                        if not await backend.can_edit(user_id, guild_id):
+                            return
+                    except BackendError:
+                        return
+
+                yield format_event(event, data)
+        finally:
+            subscription.close()
+
+    response = Response(
+        stream(),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.timeout = None  # type: ignore
+    return response
+
+
 @api.route("/guilds")
 @require_auth
 async def api_guilds():
-    guilds = sorted(
-        [
-            inflate_guild(guild)
-            for guild in g.bot.guilds
-            if g.bot.guild_configs.can_edit(g.user, guild)
-        ],
-        key=lambda guild: guild["id"],
+    guilds = await g.backend.editable_guilds(g.user_id)
+    return stream_json_array(guilds)
+
+
+@api.route("/export")
+@require_auth
+@require_owner
+async def api_export():
+    kinds = request.args.get("kinds", ",".join(backup.KINDS)).split(",")
+    if not set(kinds) <= set(backup.KINDS):
+        return (
+            json(
+                {
+                    "error": True,
+                    "message": f"Kinds must be some of {', '.join(backup.KINDS)}.",
+                    "code": "INVALID_KINDS",
+                }
+            ),
+            400,
+        )
+
+    response = Response(
+        backup.export_lines(g.backend, kinds),
+        content_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="dogbot.ndjson"'},
+    )
+    response.timeout = None  # type: ignore
+    return response
+
+
+@api.route("/import", methods=["POST"])
+@require_auth
+@require_owner
+async def api_import():
+    # bodies are limited by `MAX_CONTENT_LENGTH`; use `python -m dog.backup`
+    # to restore larger backups
+    request.body_timeout = None
+    dry_run = request.args.get("dry_run", "false").lower() in ("1", "true")
+
+    report = await backup.import_lines(
+        g.backend, backup.split_lines(request.body), dry_run=dry_run
     )
-    return json(guilds)
+    return json(report), 400 if report["failed"] else 200
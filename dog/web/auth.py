@@ -1,22 +1,33 @@
+import logging
 import secrets
-from typing import Tuple
+from typing import Optional, Tuple
 from urllib.parse import quote_plus
 
 import aiohttp
-from quart import Blueprint, g
+from quart import Blueprint
+from quart import current_app as app
+from quart import g
 from quart import jsonify as json
 from quart import redirect, request, session
 
+from .client import request_json
+from .sessions import Session, get_store
+
+log = logging.getLogger(__name__)
+
 auth = Blueprint("auth", __name__)
 API_BASE = "https://discordapp.com/api/v6"
 
+# Access tokens are refreshed when they're this close to expiring.
+TOKEN_REFRESH_MARGIN = 24 * 60 * 60
+
 
 def redirect_url() -> Tuple[str, str]:
     """Generate a redirect URL, returning the state and URL."""
     state = secrets.token_hex(64)
 
-    client_id = g.bot.config.oauth.client_id
-    redirect_uri = g.bot.config.oauth.redirect_uri
+    client_id = app.oauth.client_id
+    redirect_uri = app.oauth.redirect_uri
 
     url = (
         f"https://discordapp.com/oauth2/authorize"
@@ -33,32 +44,124 @@ def redirect_url() -> Tuple[str, str]:
 async def fetch_user(bearer: str) -> dict:
     """Fetch information about a user from their bearer token."""
     headers = {"Authorization": f"Bearer {bearer}"}
-    async with aiohttp.ClientSession(headers=headers, raise_for_status=True) as sess:
-        resp = await sess.get(f"{API_BASE}/users/@me")
-        return await resp.json()
+    return await request_json(
+        app.api_session, "GET", f"{API_BASE}/users/@me", headers=headers
+    )
+
 
+async def fetch_access_token(code: str, *, refresh: bool = False) -> dict:
+    """Exchange an authorization code (or, with ``refresh``, a refresh token)
+    for an access token.
 
-async def fetch_access_token(code: str, *, refresh: bool = False) -> str:
+    Returns the token response, which also includes the refresh token and
+    how many seconds the access token expires in.
+    """
     ENDPOINT = f"{API_BASE}/oauth2/token"
 
     data = {
-        "client_id": str(g.bot.config.oauth.client_id),
-        "client_secret": g.bot.config.oauth.client_secret,
-        "grant_type": "authorization_code",
-        "redirect_uri": g.bot.config.oauth.redirect_uri,
+        "client_id": str(app.oauth.client_id),
+        "client_secret": app.oauth.client_secret,
     }
 
     if refresh:
+        data["grant_type"] = "refresh_token"
         data["refresh_token"] = code
     else:
+        data["grant_type"] = "authorization_code"
         data["code"] = code
+        data["redirect_uri"] = app.oauth.redirect_uri
 
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    async with aiohttp.ClientSession(raise_for_status=True) as sess:
-        resp = await sess.post(ENDPOINT, data=data, headers=headers)
-        data = await resp.json()
-        return data["access_token"]
+    # codes and refresh tokens can only be used once, so retrying could only
+    # ever fail
+    return await request_json(
+        app.api_session, "POST", ENDPOINT, data=data, headers=headers, retry=False
+    )
+
+
+async def refresh_session(user_session: Session) -> bool:
+    """Refresh the access token of a session, returning whether it could be."""
+    try:
+        token = await fetch_access_token(user_session.refresh_token, refresh=True)
+        user = await fetch_user(token["access_token"])
+    except aiohttp.ClientResponseError as error:
+        if error.status not in (400, 401):
+            raise
+        log.info("couldn't refresh the token of %d: %r", user_session.user_id, error)
+        return False
+
+    user_session.update_token(token)
+    user_session.user = user
+    await get_store().save(user_session)
+    return True
+
+
+async def _refresh_if_needed(user_session: Session) -> Optional[Session]:
+    # refresh tokens can only be used once, so only one request (in any
+    # process) may refresh a session's token at a time
+    store = get_store()
+    session_id = user_session.id
+
+    async with user_session.refresh_lock:
+        # another process could have refreshed it already
+        fresh_session = await store.get(session_id, fresh=True)
+        if fresh_session is None or not fresh_session.token_needs_refresh(
+            TOKEN_REFRESH_MARGIN
+        ):
+            return fresh_session
+
+        if not await store.claim_refresh(session_id):
+            # another process is refreshing it, and the current token is still
+            # good for a while
+            return fresh_session
+
+        refresh_token = fresh_session.refresh_token
+        try:
+            refreshed = await refresh_session(fresh_session)
+        finally:
+            await store.release_refresh(session_id)
+
+        if refreshed:
+            return fresh_session
+
+        # only log out if nobody else managed to refresh it in the meantime
+        if await store.delete(session_id, refresh_token=refresh_token):
+            return None
+        return await store.get(session_id, fresh=True)
+
+
+async def current_session() -> Optional[Session]:
+    """Return the session of the user making the current request, if they're
+    logged in.
+
+    The session's access token is refreshed if it's about to expire. If it
+    can't be refreshed anymore (because the user deauthorized the app, for
+    example), the user is logged out.
+    """
+    if "user_session" in g:
+        return g.user_session
+
+    g.user_session = None
+    session_id = session.get("id")
+    if session_id is None:
+        return None
+
+    store = get_store()
+    user_session = await store.get(session_id)
+    if user_session is None:
+        # the session expired, or was logged out of somewhere else
+        del session["id"]
+        return None
+
+    if user_session.token_needs_refresh(TOKEN_REFRESH_MARGIN):
+        user_session = await _refresh_if_needed(user_session)
+        if user_session is None:
+            del session["id"]
+            return None
+
+    g.user_session = user_session
+    return user_session
 
 
 @auth.route("/redirect")
@@ -69,20 +172,24 @@ async def auth_redirect():
     if "code" not in request.args:
         return "no code", 400
 
-    access_token = await fetch_access_token(request.args["code"])
-    session["token"] = access_token
+    token = await fetch_access_token(request.args["code"])
+    user = await fetch_user(token["access_token"])
+
+    user_session = Session.create(user, token)
+    await get_store().save(user_session)
 
-    user = await fetch_user(access_token)
-    session["user"] = user
+    # the cookie only holds the ID of the session
+    session.pop("oauth_state", None)
+    session["id"] = user_session.id
 
     return redirect("/guilds")
 
 
 @auth.route("/logout")
-def auth_logout():
-    if "token" in session:
-        del session["token"]
-        del session["user"]
+async def auth_logout():
+    session_id = session.pop("id", None)
+    if session_id is not None:
+        await get_store().delete(session_id)
     return redirect("/")
 
 
@@ -95,9 +202,9 @@ def auth_login():
 
 @auth.route("/profile")
 async def auth_profile():
-    active = "token" in session
+    user_session = await current_session()
 
-    if not active:
+    if user_session is None:
         return json(None)
 
-    return json(session["user"])
+    return json(user_session.user)
@@ -0,0 +1,266 @@
+__all__ = ["BACKEND_METHODS", "BackendError", "LocalBackend", "inflate_guild"]
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+import discord
+
+from dog import backup, instrumentation, profiler
+
+from .sessions import default_database
+
+if TYPE_CHECKING:
+    from dog.bot import Dogbot
+
+log = logging.getLogger(__name__)
+
+#: Receives events published by a backend, as an event name and some JSON
+#: serializable data.
+Subscriber = Callable[[str, Any], None]
+
+#: The names of the backend methods that can be called over IPC.
+BACKEND_METHODS = frozenset(
+    {
+        "status",
+        "metrics",
+        "web_config",
+        "user_exists",
+        "is_owner",
+        "guild",
+        "can_edit",
+        "editable_guilds",
+        "get_config",
+        "write_config",
+        "published_quotes",
+        "profile",
+        "export_page",
+        "import_records",
+    }
+)
+
+
+class BackendError(Exception):
+    """Raised by a backend when a request can't be fulfilled."""
+
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def inflate_guild(guild: discord.Guild) -> dict[str, Any]:
+    icon = guild.icon
+    if icon is not None:
+        icon = icon.replace(size=64, format="png")
+    assert guild.owner is not None  # when can this be None, though?
+
+    return {
+        "id": str(guild.id),
+        "name": guild.name,
+        "members": guild.member_count,
+        "owner": {"id": str(guild.owner.id), "tag": str(guild.owner)},
+        "icon_url": str(icon),
+    }
+
+
+class LocalBackend:
+    """Answers the web app's questions about the bot from within the bot's
+    process.
+
+    Everything the web app needs from the bot goes through a backend, so the
+    app can also be served from separate worker processes that talk to the
+    bot over IPC instead (see :mod:`dog.web.ipc`). Because of that, every
+    method takes and returns plain, JSON serializable data.
+
+    Backends also publish events to their subscribers. ``invalidate`` (with
+    a ``guild_id``) is published whenever something that the web app's
+    responses about a guild are built from changes. ``guild_config_edit``
+    and ``gatekeeper_decision`` are published as they happen, for the web
+    app to stream to dashboards.
+    """
+
+    def __init__(self, bot: "Dogbot") -> None:
+        self.bot = bot
+        self.subscribers: List[Subscriber] = []
+
+        for listener in (
+            self.on_guild_config_edit,
+            self.on_gatekeeper_decision,
+            self.on_guild_quotes_edit,
+            self.on_guild_update,
+            self.on_guild_remove,
+            self.on_member_update,
+            self.on_member_remove,
+        ):
+            bot.add_listener(listener)
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.remove(subscriber)
+
+    def publish(self, event: str, data: Any) -> None:
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(event, data)
+            except Exception:
+                log.exception("backend subscriber %r failed", subscriber)
+
+    def _invalidate(self, guild: discord.Guild) -> None:
+        self.publish("invalidate", {"guild_id": guild.id})
+
+    async def on_guild_config_edit(self, guild: discord.Guild, _config) -> None:
+        self._invalidate(guild)
+        self.publish(
+            "guild_config_edit",
+            {
+                "guild_id": guild.id,
+                "config": self.bot.guild_configs.get(guild, yaml=True),
+            },
+        )
+
+    async def on_gatekeeper_decision(
+        self,
+        guild: discord.Guild,
+        decision: str,
+        member: Optional[discord.Member],
+        reason: Optional[str],
+    ) -> None:
+        self.publish(
+            "gatekeeper_decision",
+            {
+                "guild_id": guild.id,
+                "decision": decision,
+                "member": (
+                    {"id": str(member.id), "tag": str(member)}
+                    if member is not None
+                    else None
+                ),
+                "reason": reason,
+                "at": time.time(),
+            },
+        )
+
+    async def on_guild_quotes_edit(self, guild: discord.Guild) -> None:
+        self._invalidate(guild)
+
+    async def on_guild_update(
+        self, before: discord.Guild, after: discord.Guild
+    ) -> None:
+        self._invalidate(after)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self._invalidate(guild)
+
+    async def on_member_update(
+        self, before: discord.Member, after: discord.Member
+    ) -> None:
+        # roles decide who can edit the guild
+        if before.roles != after.roles:
+            self._invalidate(after.guild)
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self._invalidate(member.guild)
+
+    def _user(self, user_id: int) -> discord.User:
+        user = self.bot.get_user(user_id)
+        if user is None:
+            raise BackendError("UNKNOWN_DISCORD_USER", "Unknown user.")
+        return user
+
+    async def status(self) -> Dict[str, Any]:
+        bot = self.bot
+        return {
+            "ready": bot.is_ready(),
+            "ping": bot.latency,
+            "guilds": len(bot.guilds),
+        }
+
+    async def metrics(self) -> str:
+        return instrumentation.render()
+
+    async def web_config(self) -> Dict[str, Any]:
+        """Return the configuration that web workers need to serve the app."""
+        oauth = self.bot.config.oauth
+
+        # workers have to share sessions with each other, so point them all
+        # at the same database
+        app_config = dict(self.bot.config.web.app)
+        app_config.setdefault("SESSION_DATABASE", default_database())
+
+        return {
+            "app": app_config,
+            "oauth": {
+                "client_id": oauth.client_id,
+                "client_secret": oauth.client_secret,
+                "redirect_uri": oauth.redirect_uri,
+            },
+        }
+
+    async def user_exists(self, user_id: int) -> bool:
+        return self.bot.get_user(user_id) is not None
+
+    async def is_owner(self, user_id: int) -> bool:
+        return await self.bot.is_owner(self._user(user_id))
+
+    async def guild(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        guild = self.bot.get_guild(guild_id)
+        return inflate_guild(guild) if guild is not None else None
+
+    async def can_edit(
+        self, user_id: int, guild_id: int, with_config: Optional[dict] = None
+    ) -> bool:
+        return self.bot.guild_configs.can_edit(
+            self._user(user_id), guild_id, with_config=with_config
+        )
+
+    async def editable_guilds(self, user_id: int) -> List[Dict[str, Any]]:
+        bot = self.bot
+
+        def build(guild_ids):
+            guilds = (bot.get_guild(guild_id) for guild_id in guild_ids)
+            return sorted(
+                [inflate_guild(guild) for guild in guilds if guild is not None],
+                key=lambda guild: guild["id"],
+            )
+
+        return bot.editable_guilds.response(self._user(user_id), build)
+
+    async def get_config(self, guild_id: int) -> Optional[str]:
+        return self.bot.guild_configs.get(guild_id, yaml=True)
+
+    async def write_config(self, guild_id: int, text: str) -> None:
+        await self.bot.guild_configs.write(guild_id, text)
+
+    async def published_quotes(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """Return the quotes of a guild, or ``None`` if the guild doesn't
+        publish them.
+        """
+        config = self.bot.guild_configs.get(guild_id, {})
+        if not isinstance(config, dict) or not config.get("publish_quotes", False):
+            return None
+
+        cog = self.bot.get_cog("Quoting")
+        if cog is None:
+            return {}
+        return cog.storage.get(str(guild_id)) or {}
+
+    async def profile(self, seconds: float, summary: bool = False) -> str:
+        try:
+            result = await profiler.profile(self.bot.loop, duration=seconds)
+        except profiler.ProfilerBusy as error:
+            raise BackendError("PROFILER_BUSY", str(error))
+
+        return result.summary() if summary else result.collapsed()
+
+    async def export_page(
+        self, kind: str, after: Optional[str], limit: int
+    ) -> Dict[str, Any]:
+        return backup.export_page(self.bot, kind, after, limit)
+
+    async def import_records(
+        self, records: List[Any], dry_run: bool = False
+    ) -> Dict[str, Any]:
+        return await backup.import_batch(self.bot, records, dry_run=dry_run)
@@ -0,0 +1,199 @@
+__all__ = ["ResponseCache", "cached"]
+
+import collections
+import functools
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Hashable, NamedTuple, Optional, OrderedDict, Set, Tuple
+
+from quart import Response
+from quart import current_app as app
+from quart import g, make_response, request
+from quart.wrappers.response import DataBody
+
+from .streaming import negotiate_encoding
+
+log = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    guild_id: Optional[int]
+    status: int
+    headers: Tuple[Tuple[str, str], ...]
+    body: bytes
+    etag: str
+
+
+def _etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """An in-process cache of rendered responses.
+
+    Entries expire after the TTL of their route, and entries belonging to a
+    guild can be dropped early with :meth:`invalidate`. The backend publishes
+    an ``invalidate`` event whenever something that a guild's responses are
+    built from changes (see :meth:`handle_event`).
+
+    At most ``capacity`` entries are kept, least recently used first out.
+    Bodies larger than ``max_entry_size`` aren't cached.
+    """
+
+    def __init__(
+        self, *, capacity: int = 1024, max_entry_size: int = 1024 * 1024
+    ) -> None:
+        self.capacity = capacity
+        self.max_entry_size = max_entry_size
+
+        self.entries: OrderedDict[Hashable, _Entry] = collections.OrderedDict()
+        self.by_guild: Dict[int, Set[Hashable]] = collections.defaultdict(set)
+
+        #: Bumped on every invalidation, so responses that were being built
+        #: while one happened aren't stored.
+        self.generation = 0
+
+    def __repr__(self):
+        return f"<ResponseCache entries={len(self.entries)}>"
+
+    def get(self, key: Hashable) -> Optional[_Entry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, entry: _Entry) -> None:
+        self._remove(key)
+        self.entries[key] = entry
+        if entry.guild_id is not None:
+            self.by_guild[entry.guild_id].add(key)
+
+        while len(self.entries) > self.capacity:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None or entry.guild_id is None:
+            return
+
+        keys = self.by_guild.get(entry.guild_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_guild[entry.guild_id]
+
+    def invalidate(self, guild_id: int) -> None:
+        """Drop every cached response belonging to a guild."""
+        self.generation += 1
+        for key in self.by_guild.pop(guild_id, ()):
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.entries.clear()
+        self.by_guild.clear()
+
+    def handle_event(self, event: str, data: Any) -> None:
+        """Handle an event published by the backend."""
+        if event == "invalidate":
+            self.invalidate(int(data["guild_id"]))
+        elif event == "reset":
+            # we could have missed invalidations
+            log.debug("clearing response cache after losing the backend")
+            self.clear()
+
+
+def _conditional(entry: _Entry, *, private: bool) -> Response:
+    if request.if_none_match.contains(entry.etag):
+        response = Response(b"", status=304)
+    else:
+        response = Response(entry.body, status=entry.status, headers=entry.headers)
+
+    response.set_etag(entry.etag)
+    # clients can keep the response, but have to revalidate it every time
+    response.headers["Cache-Control"] = "private, no-cache" if private else "no-cache"
+    return response
+
+
+def cached(ttl: float, *, per_user: bool = False):
+    """Cache successful responses of a route for ``ttl`` seconds, answering
+    conditional requests with ``304 Not Modified``.
+
+    If the route takes a ``guild_id``, its responses are dropped when the
+    guild is invalidated. With ``per_user``, responses are cached separately
+    for each user, so this has to be applied beneath ``require_auth``.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            cache: ResponseCache = app.response_cache  # type: ignore
+            guild_id = kwargs.get("guild_id")
+            key = (
+                request.full_path,
+                negotiate_encoding(),
+                g.user_id if per_user else None,
+            )
+
+            entry = cache.get(key)
+            if entry is not None:
+                return _conditional(entry, private=per_user)
+
+            generation = cache.generation
+            response = await make_response(await func(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            def store(body: bytes) -> _Entry:
+                entry = _Entry(
+                    expires_at=time.monotonic() + ttl,
+                    guild_id=guild_id,
+                    status=response.status_code,
+                    headers=tuple(response.headers.items()),
+                    body=body,
+                    etag=_etag(body),
+                )
+                if cache.generation == generation:
+                    cache.put(key, entry)
+                return entry
+
+            body = response.response
+            if isinstance(body, DataBody):
+                if len(body.data) > cache.max_entry_size:
+                    return response
+                return _conditional(store(body.data), private=per_user)
+
+            # the response is being streamed, so keep a copy of it on the way
+            # out; we can't send an ETag this time around, though
+            async def tee():
+                chunks = []
+                size = 0
+
+                async with body as iterable:
+                    async for chunk in iterable:
+                        if chunks is not None:
+                            size += len(chunk)
+                            if size > cache.max_entry_size:
+                                chunks = None
+                            else:
+                                chunks.append(chunk)
+                        yield chunk
+
+                if chunks is not None:
+                    store(b"".join(chunks))
+
+            return Response(
+                tee(), status=response.status_code, headers=response.headers
+            )
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,103 @@
+__all__ = ["create_session", "request_json"]
+
+import asyncio
+import logging
+import random
+from typing import Any, Optional
+
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+# Statuses that are worth retrying, as they're usually transient.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def create_session(
+    *, limit_per_host: int = 10, timeout: float = 10.0
+) -> aiohttp.ClientSession:
+    """Create a pooled, keep-alive client session for talking to APIs.
+
+    Connections (and DNS lookups) are reused across requests, and at most
+    ``limit_per_host`` connections are opened to any one host.
+    """
+    connector = aiohttp.TCPConnector(
+        limit_per_host=limit_per_host,
+        keepalive_timeout=60,
+        ttl_dns_cache=300,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout, sock_connect=timeout / 2),
+    )
+
+
+def _retry_after(resp: aiohttp.ClientResponse) -> Optional[float]:
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def request_json(
+    session: aiohttp.ClientSession,
+    method: str,
+    url: str,
+    *,
+    attempts: int = 3,
+    backoff: float = 0.5,
+    max_delay: float = 10.0,
+    retry: bool = True,
+    **kwargs,
+) -> Any:
+    """Make a request and return the decoded JSON response.
+
+    Connection errors, timeouts, and transient statuses are retried up to
+    ``attempts`` times in total, with exponential backoff (or for as long as
+    the server asks through ``Retry-After``). Other error statuses raise
+    :class:`aiohttp.ClientResponseError` immediately, as do servers asking
+    to wait longer than ``max_delay`` seconds.
+
+    Pass ``retry=False`` for requests that mustn't be repeated, like ones
+    that spend a single-use OAuth code.
+    """
+    if not retry:
+        attempts = 1
+
+    for attempt in range(attempts):
+        final = attempt == attempts - 1
+        delay = min(backoff * 2**attempt, max_delay)
+
+        try:
+            async with session.request(method, url, **kwargs) as resp:
+                if resp.status not in RETRY_STATUSES or final:
+                    resp.raise_for_status()
+                    return await resp.json()
+
+                retry_after = _retry_after(resp)
+                if retry_after is not None:
+                    if retry_after > max_delay:
+                        # not worth holding up the request for
+                        log.debug(
+                            "%s %s asked to retry after %.2fs, giving up",
+                            method,
+                            url,
+                            retry_after,
+                        )
+                        resp.raise_for_status()
+                    delay = retry_after
+
+                log.debug(
+                    "%s %s returned %d, retrying in %.2fs",
+                    method,
+                    url,
+                    resp.status,
+                    delay,
+                )
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+            if final:
+                raise
+            log.debug("%s %s failed (%r), retrying in %.2fs", method, url, error, delay)
+
+        # jitter, so concurrent retries don't all land at once
+        await asyncio.sleep(delay * random.uniform(1.0, 1.25))
@@ -1,30 +1,39 @@
 import functools
+import hmac
 import logging
+import math
+import time
 
 from quart import current_app as app
-from quart import g
+from quart import g, request
 from quart import jsonify as json
-from quart import request, session
 
-from lifesaver.utils import Ratelimiter
+from .auth import current_session
+from .ratelimit import client_address, get_backend
 
 log = logging.getLogger(__name__)
 
+# How often to check that a logged in user is still known to the bot.
+USER_VERIFY_INTERVAL = 60.0
+
 
 def ratelimit(rate, per):
-    ratelimiter = Ratelimiter(rate, per)
+    """Allow ``rate`` requests every ``per`` seconds from each client, with
+    bursts of up to ``rate`` requests.
+    """
 
     def wrapper(func):
-        log.debug("ratelimiting %r with %d/%f", func, ratelimiter.rate, ratelimiter.per)
+        log.debug("ratelimiting %r with %d/%f", func, rate, per)
 
         @functools.wraps(func)
         async def wrapped(*args, **kwargs):
-            connecting_ip = request.headers.get("X-Forwarded-For", request.remote_addr)
+            connecting_ip = client_address()
 
-            is_being_ratelimited = ratelimiter.hit(connecting_ip)
-            time_remaining = ratelimiter.time_remaining(connecting_ip)
+            allowed, time_remaining = await get_backend().take(
+                f"{func.__qualname__}:{connecting_ip}", rate, per
+            )
 
-            if is_being_ratelimited:
+            if not allowed:
                 log.warning("%s is being ratelimited", connecting_ip)
                 return (
                     json(
@@ -37,6 +46,7 @@ def ratelimit(rate, per):
                         }
                     ),
                     429,
+                    {"Retry-After": str(math.ceil(time_remaining))},
                 )
 
             return await func(*args, **kwargs)
@@ -48,13 +58,13 @@ def ratelimit(rate, per):
 
 def guild_resolver(func):
     @functools.wraps(func)
-    def wrapped(guild_id, *args, **kwargs):
-        guild = g.bot.get_guild(guild_id)
+    async def wrapped(guild_id, *args, **kwargs):
+        guild = await g.backend.guild(guild_id)
 
         if not guild:
             return json({"error": True, "message": "Guild not found."}), 404
 
-        return func(guild, *args, **kwargs)
+        return await func(guild, *args, **kwargs)
 
     return wrapped
 
@@ -62,7 +72,9 @@ def guild_resolver(func):
 def require_auth(func):
     @functools.wraps(func)
     async def wrapped(*args, **kwargs):
-        if "user" not in session:
+        user_session = await current_session()
+
+        if user_session is None:
             return (
                 json(
                     {
@@ -74,25 +86,88 @@ def require_auth(func):
                 401,
             )
 
-        user_id = int(session["user"]["id"])
-        user_object = app.bot.get_user(user_id)
+        user_id = user_session.user_id
+        now = time.monotonic()
+
+        # the user is only looked up every so often, instead of on every
+        # request
+        verified_at = user_session.verified_at
+        if verified_at is None or now - verified_at >= USER_VERIFY_INTERVAL:
+            if not await g.backend.user_exists(user_id):
+                return (
+                    json(
+                        {
+                            "error": True,
+                            "message": (
+                                "Unknown user. I am unable to locate you on "
+                                "Discord. Do you share any servers with me?"
+                            ),
+                            "code": "UNKNOWN_DISCORD_USER",
+                        }
+                    ),
+                    401,
+                )
+            user_session.verified_at = now
+
+        g.user_id = user_id
+        return await func(*args, **kwargs)
+
+    return wrapped
+
+
+def require_owner(func):
+    """Only let the owner of the bot use a route. This has to be applied
+    beneath ``require_auth``.
+    """
 
-        if not user_object:
+    @functools.wraps(func)
+    async def wrapped(*args, **kwargs):
+        if not await g.backend.is_owner(g.user_id):
             return (
                 json(
                     {
                         "error": True,
-                        "message": (
-                            "Unknown user. I am unable to locate you on "
-                            "Discord. Do you share any servers with me?"
-                        ),
-                        "code": "UNKNOWN_DISCORD_USER",
+                        "message": "Only the owner of the bot can do that.",
+                        "code": "NOT_OWNER",
                     }
                 ),
-                401,
+                403,
             )
 
-        g.user = user_object
         return await func(*args, **kwargs)
 
     return wrapped
+
+
+def require_token(config_key):
+    """Only let requests bearing the token at ``config_key`` in the app's
+    config (as ``Authorization: Bearer <token>``) use a route. This is for
+    clients that can't log in, like metrics scrapers. If no token is
+    configured, nobody can use the route.
+    """
+
+    def wrapper(func):
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            token = app.config.get(config_key)
+            authorization = request.headers.get("Authorization", "")
+
+            if not token or not hmac.compare_digest(
+                authorization.encode(), f"Bearer {token}".encode()
+            ):
+                return (
+                    json(
+                        {
+                            "error": True,
+                            "message": "A valid token is required to do that.",
+                            "code": "INVALID_TOKEN",
+                        }
+                    ),
+                    401,
+                )
+
+            return await func(*args, **kwargs)
+
+        return wrapped
+
+    return wrapper
@@ -0,0 +1,117 @@
+__all__ = ["Broadcaster", "Subscription"]
+
+import asyncio
+import collections
+import json
+import logging
+from typing import Any, Dict, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+#: The backend events that are passed on to a guild's subscribers.
+GUILD_EVENTS = frozenset({"guild_config_edit", "gatekeeper_decision"})
+
+# Marks the end of a subscription.
+_CLOSED = object()
+
+
+def format_event(event: str, data: Any) -> bytes:
+    """Format an event for a ``text/event-stream`` response."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class Subscription:
+    """A subscriber's queue of events from a guild.
+
+    If the subscriber falls ``max_pending`` events behind, it is dropped
+    instead of being buffered indefinitely. Clients can always reconnect.
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", guild_id: int, max_pending: int):
+        self.broadcaster = broadcaster
+        self.guild_id = guild_id
+        self.queue: asyncio.Queue = asyncio.Queue(max_pending + 1)
+        self.closed = False
+
+    def __repr__(self):
+        return f"<Subscription guild_id={self.guild_id} pending={self.queue.qsize()}>"
+
+    def push(self, event: str, data: Any) -> None:
+        if self.closed:
+            return
+
+        # one slot is reserved for closing
+        if self.queue.qsize() >= self.queue.maxsize - 1:
+            log.info("dropping slow subscriber to guild %d", self.guild_id)
+            self.close()
+            return
+
+        self.queue.put_nowait((event, data))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        self.closed = True
+        self.broadcaster.unsubscribe(self)
+        self.queue.put_nowait(_CLOSED)
+
+    async def get(self, *, timeout: float) -> Optional[Tuple[str, Any]]:
+        """Wait for the next event.
+
+        ``None`` is returned if nothing happens within ``timeout`` seconds, and
+        :class:`EOFError` is raised once the subscription is closed.
+        """
+        try:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        if item is _CLOSED:
+            raise EOFError
+        return item
+
+
+class Broadcaster:
+    """Fans events published by the backend out to the subscribers of each
+    guild.
+    """
+
+    def __init__(self, *, max_pending: int = 64) -> None:
+        self.max_pending = max_pending
+        self.subscriptions: Dict[int, Set[Subscription]] = collections.defaultdict(
+            set
+        )
+
+    def __repr__(self):
+        total = sum(map(len, self.subscriptions.values()))
+        return f"<Broadcaster subscriptions={total}>"
+
+    def subscribe(self, guild_id: int) -> Subscription:
+        subscription = Subscription(self, guild_id, self.max_pending)
+        self.subscriptions[guild_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self.subscriptions.get(subscription.guild_id)
+        if subscriptions is None:
+            return
+
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self.subscriptions[subscription.guild_id]
+
+    def handle_event(self, event: str, data: Any) -> None:
+        """Handle an event published by the backend."""
+        if event == "reset":
+            # the connection to the bot was lost, so have everyone reconnect
+            for subscriptions in list(self.subscriptions.values()):
+                for subscription in list(subscriptions):
+                    subscription.close()
+            return
+
+        if event not in GUILD_EVENTS:
+            return
+
+        for subscription in list(self.subscriptions.get(int(data["guild_id"]), ())):
+            subscription.push(event, data)
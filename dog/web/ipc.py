@@ -0,0 +1,253 @@
+__all__ = ["IPCServer", "RemoteBackend"]
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from .backend import BACKEND_METHODS, BackendError, Subscriber
+
+log = logging.getLogger(__name__)
+
+# Messages are newline-delimited JSON. Requests look like
+# {"id": 1, "method": "guild", "args": [...], "kwargs": {...}}, and responses
+# look like {"id": 1, "result": ...} or {"id": 1, "error": {"code", "message"}}.
+# Requests on a connection are handled concurrently, so responses can arrive
+# out of order. Events published by the backend are pushed to every
+# connection as {"event": "invalidate", "data": ...}.
+
+# Configs and quote listings can be fairly large.
+LINE_LIMIT = 16 * 1024 * 1024
+
+# Connections that let this many bytes of unsent events pile up are dropped,
+# instead of buffering events for them forever.
+EVENT_BUFFER_LIMIT = 4 * 1024 * 1024
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":"), default=str).encode() + b"\n"
+
+
+class IPCServer:
+    """Serves a backend over a Unix socket, so web workers in other processes
+    can use it.
+    """
+
+    def __init__(self, backend, path: str) -> None:
+        self.backend = backend
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=self.path, limit=LINE_LIMIT
+        )
+        # the socket hands out secrets (see `LocalBackend.web_config`)
+        os.chmod(self.path, 0o600)
+        self.backend.subscribe(self._broadcast)
+        log.info("serving web backend over %s", self.path)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self.backend.unsubscribe(self._broadcast)
+            self._server.close()
+            self._server = None
+
+    def _broadcast(self, event: str, data: Any) -> None:
+        message = _encode({"event": event, "data": data})
+
+        for writer in list(self._writers):
+            if writer.transport.get_write_buffer_size() > EVENT_BUFFER_LIMIT:
+                log.warning("dropping web backend connection that isn't reading")
+                writer.close()
+                self._writers.discard(writer)
+                continue
+            writer.write(message)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        tasks = set()
+        self._writers.add(writer)
+
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._handle_request(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as error:
+            log.warning("web backend connection failed: %r", error)
+        finally:
+            self._writers.discard(writer)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _handle_request(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        response: Dict[str, Any] = {"id": None}
+        method = None
+
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise BackendError("BAD_REQUEST", "Invalid JSON.") from None
+            if not isinstance(request, dict):
+                raise BackendError("BAD_REQUEST", "Requests must be objects.")
+
+            response["id"] = request.get("id")
+            method = request.get("method")
+            if method not in BACKEND_METHODS:
+                raise BackendError("UNKNOWN_METHOD", f"Unknown method {method!r}.")
+            response["result"] = await getattr(self.backend, method)(
+                *request.get("args", []), **request.get("kwargs", {})
+            )
+        except BackendError as error:
+            response["error"] = {"code": error.code, "message": error.message}
+        except Exception:
+            log.exception("web backend method %r failed", method)
+            response["error"] = {"code": "INTERNAL", "message": "Internal error."}
+
+        writer.write(_encode(response))
+        await writer.drain()
+
+
+class RemoteBackend:
+    """A backend that forwards every call to an :class:`IPCServer`.
+
+    It has the same methods as :class:`dog.web.backend.LocalBackend`. Calls
+    time out after ``timeout`` seconds (plus the duration of profiles). The
+    connection is made lazily, and remade if it's lost. Events published by
+    the bot's backend are passed on to subscribers while connected, and a
+    ``reset`` event is published when the connection is lost, since events
+    could have been missed.
+    """
+
+    def __init__(self, path: str, *, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self.subscribers: List[Subscriber] = []
+
+    def __repr__(self):
+        return f"<RemoteBackend path={self.path!r} pending={len(self._pending)}>"
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.remove(subscriber)
+
+    def _publish(self, event: str, data: Any) -> None:
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(event, data)
+            except Exception:
+                log.exception("backend subscriber %r failed", subscriber)
+
+    async def profile(self, seconds: float, summary: bool = False) -> str:
+        # profiling takes as long as it's asked to, on top of the usual
+        return await self._call(
+            "profile", (seconds, summary), {}, timeout=seconds + self.timeout
+        )
+
+    def __getattr__(self, name: str):
+        if name not in BACKEND_METHODS:
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await self._call(name, args, kwargs)
+
+        call.__name__ = name
+        return call
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await asyncio.open_unix_connection(
+                    self.path, limit=LINE_LIMIT
+                )
+                self._reader_task = asyncio.create_task(self._read(reader))
+            return self._writer
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                if "event" in response:
+                    self._publish(response["event"], response.get("data"))
+                    continue
+
+                future = self._pending.pop(response["id"], None)
+                if future is None or future.done():
+                    continue
+
+                if "error" in response:
+                    error = response["error"]
+                    future.set_exception(BackendError(error["code"], error["message"]))
+                else:
+                    future.set_result(response.get("result"))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as error:
+            log.warning("lost connection to the web backend: %r", error)
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+            lost = BackendError("BACKEND_UNAVAILABLE", "Lost connection to the bot.")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(lost)
+            self._pending.clear()
+            self._publish("reset", None)
+
+    async def _call(
+        self, method: str, args, kwargs, *, timeout: Optional[float] = None
+    ) -> Any:
+        try:
+            writer = await self._connect()
+        except OSError as error:
+            log.warning("can't connect to the web backend: %r", error)
+            raise BackendError("BACKEND_UNAVAILABLE", "The bot is unavailable.")
+
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+
+        try:
+            writer.write(
+                _encode(
+                    {
+                        "id": request_id,
+                        "method": method,
+                        "args": list(args),
+                        "kwargs": kwargs,
+                    }
+                )
+            )
+            await writer.drain()
+            if timeout is None:
+                timeout = self.timeout
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise BackendError("BACKEND_TIMEOUT", "The bot took too long to respond.")
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -3,7 +3,9 @@ import functools
 from quart import Blueprint, g
 from quart import jsonify as json
 
+from .cache import cached
 from .decorators import guild_resolver
+from .streaming import stream_json_array
 
 quotes = Blueprint("quotes", __name__)
 
@@ -14,30 +16,26 @@ QUOTES_PRIVATE = {
 }
 
 
-def get_quotes(guild):
-    return g.bot.get_cog("Quoting").storage.get(str(guild.id), None)
-
-
-def guild_exposes_quotes(guild) -> bool:
-    config = g.bot.guild_configs.get(guild, {})
-    return config.get("publish_quotes", False)
-
-
 def quotes_resolver(func):
+    """Pass the quotes of a guild to the route instead of the guild, as long
+    as it publishes them.
+    """
+
     @functools.wraps(func)
-    def wrapper(guild, *args, **kwargs):
-        if not guild_exposes_quotes(guild):
+    async def wrapper(guild, *args, **kwargs):
+        quotes = await g.backend.published_quotes(int(guild["id"]))
+        if quotes is None:
             return json(QUOTES_PRIVATE), 401
-        return func(guild, *args, **kwargs)
+        return await func(quotes, *args, **kwargs)
 
     return wrapper
 
 
 @quotes.route("/<int:guild_id>/<quote_name>", methods=["GET"])
+@cached(300)
 @guild_resolver
 @quotes_resolver
-async def guild_quote(guild, quote_name):
-    quotes = get_quotes(guild)
+async def guild_quote(quotes, quote_name):
     quote = quotes.get(quote_name)
     if not quote:
         return (
@@ -55,8 +53,10 @@ async def guild_quote(guild, quote_name):
 
 
 @quotes.route("/<int:guild_id>", methods=["GET"])
+@cached(300)
 @guild_resolver
 @quotes_resolver
-async def guild_all(guild):
-    quotes = get_quotes(guild)
-    return json([{"name": name, **quote} for name, quote in quotes.items()])
+async def guild_all(quotes):
+    # snapshot the quotes, since they could change while we're streaming
+    quotes = list(quotes.items())
+    return stream_json_array({"name": name, **quote} for name, quote in quotes)
@@ -0,0 +1,173 @@
+__all__ = ["MemoryBackend", "SQLiteBackend", "client_address", "get_backend"]
+
+import asyncio
+import collections
+import sqlite3
+import threading
+import time
+from typing import Optional, OrderedDict, Tuple
+
+from quart import current_app as app
+from quart import request
+
+#: Whether a request was allowed, and if it wasn't, how many seconds until it
+#: would be.
+Decision = Tuple[bool, float]
+
+
+def _refill(
+    tokens: float, updated_at: float, now: float, rate: int, per: float
+) -> float:
+    return min(float(rate), tokens + (now - updated_at) * rate / per)
+
+
+def _take(tokens: float, rate: int, per: float) -> Tuple[float, Decision]:
+    if tokens >= 1:
+        return tokens - 1, (True, 0.0)
+    return tokens, (False, (1 - tokens) * per / rate)
+
+
+class MemoryBackend:
+    """Token buckets kept in memory, for a single process.
+
+    At most ``capacity`` buckets are kept. Past that, the least recently used
+    bucket is dropped, which at worst grants its key a full bucket again.
+    """
+
+    def __init__(self, *, capacity: int = 10_000) -> None:
+        self.capacity = capacity
+        self.buckets: OrderedDict[str, Tuple[float, float]] = collections.OrderedDict()
+
+    def __repr__(self):
+        return f"<MemoryBackend buckets={len(self.buckets)}>"
+
+    async def take(self, key: str, rate: int, per: float) -> Decision:
+        now = time.monotonic()
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            tokens = float(rate)
+        else:
+            tokens = _refill(*bucket, now, rate, per)
+            self.buckets.move_to_end(key)
+
+        tokens, decision = _take(tokens, rate, per)
+        self.buckets[key] = (tokens, now)
+
+        while len(self.buckets) > self.capacity:
+            self.buckets.popitem(last=False)
+
+        return decision
+
+
+class SQLiteBackend:
+    """Token buckets kept in a SQLite database, so multiple processes serving
+    the web app on the same machine share one limit.
+
+    Buckets that have refilled completely are periodically deleted, which
+    keeps the table small.
+    """
+
+    def __init__(self, path: str, *, vacuum_every: int = 1000) -> None:
+        self.path = path
+        self.vacuum_every = vacuum_every
+
+        self._takes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL,"
+            " full_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at)"
+        )
+
+    def __repr__(self):
+        return f"<SQLiteBackend path={self.path!r}>"
+
+    def _take_sync(self, key: str, rate: int, per: float) -> Decision:
+        # wall clock time, since it's shared between processes
+        now = time.time()
+        connection = self._connection
+
+        with self._lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = float(rate) if row is None else _refill(*row, now, rate, per)
+                tokens, decision = _take(tokens, rate, per)
+
+                full_at = now + (rate - tokens) * per / rate
+                connection.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, full_at),
+                )
+
+                self._takes += 1
+                if self._takes % self.vacuum_every == 0:
+                    connection.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        return decision
+
+    async def take(self, key: str, rate: int, per: float) -> Decision:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._take_sync, key, rate, per
+        )
+
+
+def get_backend():
+    """Return the ratelimiting backend of the current app, creating it if
+    necessary.
+
+    If ``RATELIMIT_DATABASE`` is set in the app's config, a
+    :class:`SQLiteBackend` using that path is created. Otherwise, buckets are
+    kept in memory.
+    """
+    backend = getattr(app, "ratelimit_backend", None)
+    if backend is None:
+        path: Optional[str] = app.config.get("RATELIMIT_DATABASE")
+        backend = SQLiteBackend(path) if path else MemoryBackend()
+        app.ratelimit_backend = backend  # type: ignore
+    return backend
+
+
+def client_address() -> str:
+    """Return the address of the client making the current request.
+
+    ``RATELIMIT_TRUSTED_PROXIES`` in the app's config is how many reverse
+    proxies sit in front of the app. Each of them appends the address it
+    received the request from to ``X-Forwarded-For``, so the client is that
+    many entries from the right. Anything further left was supplied by the
+    client and can't be trusted.
+
+    By default, no proxies are trusted and ``X-Forwarded-For`` is ignored,
+    since clients that can reach the app directly could otherwise pick any
+    address they like.
+    """
+    trusted = app.config.get("RATELIMIT_TRUSTED_PROXIES", 0)
+    remote = request.remote_addr or "unknown"
+
+    if trusted <= 0:
+        return remote
+
+    forwarded = [
+        hop.strip()
+        for hop in request.headers.get("X-Forwarded-For", "").split(",")
+        if hop.strip()
+    ]
+    if not forwarded:
+        return remote
+
+    return forwarded[-min(trusted, len(forwarded))]
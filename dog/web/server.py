@@ -1,16 +1,78 @@
+import time
+from typing import NamedTuple
+
 from quart import Quart, g
+from quart import jsonify as json
+from quart import request
+
+from dog.instrumentation import WEB_LATENCY
 
 from .api import api
 from .auth import auth
+from .backend import BackendError
+from .cache import ResponseCache
+from .events import Broadcaster
 from .quotes import quotes
 
+
+class OAuthSettings(NamedTuple):
+    client_id: str
+    client_secret: str
+    redirect_uri: str
+
+
 app = Quart(__name__)
-app.bot = None  # type: ignore
+
+# These are assigned by whatever is serving the app: the bot itself (see
+# `Dogbot.setup_hook`), or a web worker (see `dog.web.worker`).
+app.backend = None  # type: ignore
+app.oauth = None  # type: ignore
+app.api_session = None  # type: ignore
+app.response_cache = ResponseCache()  # type: ignore
+app.broadcaster = Broadcaster()  # type: ignore
+
+BACKEND_ERROR_STATUSES = {
+    "UNKNOWN_DISCORD_USER": 401,
+    "PROFILER_BUSY": 409,
+    "BACKEND_UNAVAILABLE": 503,
+    "BACKEND_TIMEOUT": 503,
+}
+
+
+@app.before_serving
+async def subscribe_to_backend():
+    app.backend.subscribe(app.response_cache.handle_event)  # type: ignore
+    app.backend.subscribe(app.broadcaster.handle_event)  # type: ignore
+
+
+@app.after_serving
+async def unsubscribe_from_backend():
+    app.backend.unsubscribe(app.response_cache.handle_event)  # type: ignore
+    app.backend.unsubscribe(app.broadcaster.handle_event)  # type: ignore
 
 
 @app.before_request
 def assign_globals():
-    g.bot = app.bot  # type: ignore
+    g.backend = app.backend  # type: ignore
+    g.request_started_at = time.perf_counter()
+
+
+@app.errorhandler(BackendError)
+async def handle_backend_error(error: BackendError):
+    status = BACKEND_ERROR_STATUSES.get(error.code, 500)
+    return json({"error": True, "message": error.message, "code": error.code}), status
+
+
+@app.after_request
+def observe_latency(response):
+    started_at = g.get("request_started_at")
+    if started_at is not None:
+        WEB_LATENCY.observe(
+            time.perf_counter() - started_at,
+            request.endpoint or "unknown",
+            str(response.status_code),
+        )
+    return response
 
 
 app.register_blueprint(api, url_prefix="/api")
@@ -0,0 +1,336 @@
+__all__ = ["Session", "SessionStore", "default_database", "get_store"]
+
+import asyncio
+import collections
+import hashlib
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, OrderedDict, Tuple
+
+from quart import current_app as app
+
+from dog.utils import state_dir
+
+# How long a session lasts after logging in.
+SESSION_LIFETIME = 30 * 24 * 60 * 60
+
+
+class Session:
+    """A user's login, kept on the server. The client only holds its ID.
+
+    Besides what's saved, sessions also hold some state that's only kept in
+    the memory of the process serving the user: when the user was last
+    verified to be known to the bot.
+    """
+
+    __slots__ = (
+        "id",
+        "user",
+        "access_token",
+        "refresh_token",
+        "token_expires_at",
+        "expires_at",
+        "verified_at",
+        "refresh_lock",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        *,
+        user: Dict[str, Any],
+        access_token: str,
+        refresh_token: Optional[str],
+        token_expires_at: float,
+        expires_at: float,
+    ) -> None:
+        self.id = id
+        self.user = user
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.token_expires_at = token_expires_at
+        self.expires_at = expires_at
+
+        self.verified_at: Optional[float] = None
+        self.refresh_lock = asyncio.Lock()
+
+    def __repr__(self):
+        return f"<Session user_id={self.user_id}>"
+
+    @classmethod
+    def create(cls, user: Dict[str, Any], token: Dict[str, Any]) -> "Session":
+        session = cls(
+            secrets.token_urlsafe(32),
+            user=user,
+            access_token="",
+            refresh_token=None,
+            token_expires_at=0.0,
+            expires_at=time.time() + SESSION_LIFETIME,
+        )
+        session.update_token(token)
+        return session
+
+    @property
+    def user_id(self) -> int:
+        return int(self.user["id"])
+
+    def token_needs_refresh(self, margin: float) -> bool:
+        """Return whether the access token expires within ``margin`` seconds
+        and can be refreshed.
+        """
+        return (
+            self.refresh_token is not None
+            and self.token_expires_at - time.time() < margin
+        )
+
+    def update_token(self, token: Dict[str, Any]) -> None:
+        """Update the session with a token from Discord's OAuth2 token endpoint."""
+        self.access_token = token["access_token"]
+        self.refresh_token = token.get("refresh_token", self.refresh_token)
+        self.token_expires_at = time.time() + token.get("expires_in", 0)
+
+    def dump(self) -> str:
+        return json.dumps(
+            {
+                "user": self.user,
+                "access_token": self.access_token,
+                "refresh_token": self.refresh_token,
+                "token_expires_at": self.token_expires_at,
+                "expires_at": self.expires_at,
+            }
+        )
+
+    @classmethod
+    def load(cls, id: str, data: str) -> "Session":
+        return cls(id, **json.loads(data))
+
+
+def _key(session_id: str) -> str:
+    # only hashes of session IDs are stored, so the database can't be used to
+    # impersonate anyone
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+class SessionStore:
+    """Sessions kept in an in-memory LRU cache, and optionally saved to a
+    SQLite database.
+
+    Without a database, at most ``capacity`` sessions are kept, least
+    recently used first out, and sessions don't survive restarts.
+
+    With a database, every process serving the web app shares the same
+    sessions, and the in-memory cache only saves reading them back. Cached
+    sessions are reread after ``cache_ttl`` seconds, so logging out in one
+    process takes effect in the others shortly after.
+
+    Since refresh tokens can only be used once, refreshing a session's token
+    is claimed in the database first (see :meth:`claim_refresh`), so only
+    one process refreshes it at a time.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        capacity: int = 10_000,
+        cache_ttl: float = 10.0,
+        vacuum_every: int = 1000,
+        refresh_lease: float = 30.0,
+    ) -> None:
+        self.path = path
+        self.capacity = capacity
+        self.cache_ttl = cache_ttl
+        self.vacuum_every = vacuum_every
+        self.refresh_lease = refresh_lease
+
+        #: A mapping of session IDs to when they were cached and the session.
+        self.cache: OrderedDict[str, Tuple[float, Session]] = collections.OrderedDict()
+
+        self._saves = 0
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+        if path is not None:
+            self._connection = sqlite3.connect(
+                path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " key TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_expires_at"
+                " ON sessions (expires_at)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS refresh_claims ("
+                " key TEXT PRIMARY KEY, claimed_until REAL NOT NULL)"
+            )
+
+    def __repr__(self):
+        return f"<SessionStore path={self.path!r} cached={len(self.cache)}>"
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _cache(self, session: Session) -> None:
+        self.cache[session.id] = (time.monotonic(), session)
+        self.cache.move_to_end(session.id)
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+
+    def _read(self, session_id: str) -> Optional[str]:
+        assert self._connection is not None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM sessions WHERE key = ? AND expires_at > ?",
+                (_key(session_id), time.time()),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def _write(self, session_id: str, data: str, expires_at: float) -> None:
+        assert self._connection is not None
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (_key(session_id), data, expires_at),
+            )
+
+            self._saves += 1
+            if self._saves % self.vacuum_every == 0:
+                now = time.time()
+                self._connection.execute(
+                    "DELETE FROM sessions WHERE expires_at < ?", (now,)
+                )
+                self._connection.execute(
+                    "DELETE FROM refresh_claims WHERE claimed_until < ?", (now,)
+                )
+
+    def _remove(self, session_id: str, refresh_token: Optional[str]) -> bool:
+        assert self._connection is not None
+        query = "DELETE FROM sessions WHERE key = ?"
+        params: Tuple[Any, ...] = (_key(session_id),)
+        if refresh_token is not None:
+            query += " AND json_extract(data, '$.refresh_token') = ?"
+            params += (refresh_token,)
+
+        with self._lock:
+            return self._connection.execute(query, params).rowcount > 0
+
+    def _claim(self, session_id: str) -> bool:
+        assert self._connection is not None
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO refresh_claims VALUES (?, ?) ON CONFLICT (key)"
+                " DO UPDATE SET claimed_until = excluded.claimed_until"
+                " WHERE claimed_until < ?",
+                (_key(session_id), now + self.refresh_lease, now),
+            )
+            return cursor.rowcount > 0
+
+    def _unclaim(self, session_id: str) -> None:
+        assert self._connection is not None
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM refresh_claims WHERE key = ?", (_key(session_id),)
+            )
+
+    async def get(self, session_id: str, *, fresh: bool = False) -> Optional[Session]:
+        """Return a session, or ``None`` if it doesn't exist or expired.
+
+        With ``fresh``, the session is always reread from the database, in
+        case another process changed it.
+        """
+        cached = self.cache.get(session_id)
+        if cached is not None:
+            cached_at, session = cached
+            usable = self._connection is None or (
+                not fresh and time.monotonic() - cached_at < self.cache_ttl
+            )
+            if usable and session.expires_at > time.time():
+                self.cache.move_to_end(session_id)
+                return session
+
+            del self.cache[session_id]
+
+        if self._connection is None:
+            return None
+
+        data = await self._run(self._read, session_id)
+        if data is None:
+            return None
+
+        session = Session.load(session_id, data)
+        if cached is not None:
+            # keep what was only kept in memory, since it's still accurate
+            session.verified_at = cached[1].verified_at
+            session.refresh_lock = cached[1].refresh_lock
+
+        self._cache(session)
+        return session
+
+    async def save(self, session: Session) -> None:
+        self._cache(session)
+        if self._connection is not None:
+            await self._run(self._write, session.id, session.dump(), session.expires_at)
+
+    async def delete(
+        self, session_id: str, *, refresh_token: Optional[str] = None
+    ) -> bool:
+        """Delete a session, returning whether it was.
+
+        If ``refresh_token`` is passed, the session is only deleted if that's
+        still its refresh token, so a session another process has just
+        refreshed isn't.
+        """
+        cached = self.cache.get(session_id)
+        if self._connection is None:
+            if cached is None or refresh_token not in (None, cached[1].refresh_token):
+                return False
+            del self.cache[session_id]
+            return True
+
+        self.cache.pop(session_id, None)
+        return await self._run(self._remove, session_id, refresh_token)
+
+    async def claim_refresh(self, session_id: str) -> bool:
+        """Claim refreshing the token of a session for ``refresh_lease``
+        seconds, returning whether it was claimed.
+
+        This can only be claimed by one process at a time. Release the claim
+        with :meth:`release_refresh` when done.
+        """
+        if self._connection is None:
+            return True
+        return await self._run(self._claim, session_id)
+
+    async def release_refresh(self, session_id: str) -> None:
+        if self._connection is not None:
+            await self._run(self._unclaim, session_id)
+
+
+def default_database() -> str:
+    return str((state_dir() / "web_sessions.db").resolve())
+
+
+def get_store() -> SessionStore:
+    """Return the session store of the current app, creating it if necessary.
+
+    Sessions are saved to a SQLite database at ``SESSION_DATABASE`` in the
+    app's config, which defaults to ``web_sessions.db`` in the state
+    directory. If it's set to ``false``, sessions are only kept in memory,
+    which only works when the app is served by a single process.
+    """
+    store = getattr(app, "session_store", None)
+    if store is None:
+        path = app.config.get("SESSION_DATABASE")
+        if path is None:
+            path = default_database()
+        store = SessionStore(path or None)
+        app.session_store = store  # type: ignore
+    return store
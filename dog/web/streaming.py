@@ -0,0 +1,115 @@
+__all__ = ["negotiate_encoding", "stream_json_array"]
+
+import asyncio
+import json
+import zlib
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from quart import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# How many bytes of JSON to buffer up before sending (and compressing) them.
+CHUNK_SIZE = 16 * 1024
+
+
+class _Identity:
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _Gzip:
+    def __init__(self) -> None:
+        # a wbits of 31 writes a gzip header and trailer
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # sync flushes let the client decode everything sent so far
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self) -> None:
+        self.compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Return the content encoding to compress the current response with.
+
+    The encoding the client prefers most is picked (brotli if it doesn't
+    mind), leaving out those it refuses with ``q=0``.
+    """
+    accepted = request.accept_encodings
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    # on ties, the first encoding wins
+    encoding = max(encodings, key=accepted.quality)
+    return encoding if accepted.quality(encoding) > 0 else None
+
+
+def stream_json_array(items: Iterable[Any], *, status: int = 200) -> Response:
+    """Respond with a JSON array, encoding and sending its elements as they
+    are produced instead of building the entire payload in memory first.
+
+    The body is compressed with brotli or gzip if the client accepts it.
+    """
+    encoding = negotiate_encoding()
+    if encoding == "br":
+        compressor = _Brotli()
+    elif encoding == "gzip":
+        compressor = _Gzip()
+    else:
+        compressor = _Identity()
+
+    encoder = json.JSONEncoder(separators=(",", ":"))
+
+    async def generate() -> AsyncIterator[bytes]:
+        buffer = bytearray(b"[")
+        first = True
+
+        for item in items:
+            if not first:
+                buffer += b","
+            first = False
+            buffer += encoder.encode(item).encode()
+
+            if len(buffer) >= CHUNK_SIZE:
+                yield compressor.compress(bytes(buffer)) + compressor.flush()
+                buffer.clear()
+                # let other requests (and the bot) run in between chunks
+                await asyncio.sleep(0)
+
+        buffer += b"]"
+        yield compressor.compress(bytes(buffer)) + compressor.finish()
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        generate(), status=status, content_type="application/json", headers=headers
+    )
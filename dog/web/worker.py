@@ -0,0 +1,40 @@
+__all__ = ["app"]
+
+import logging
+import os
+
+from .client import create_session
+from .ipc import RemoteBackend
+from .server import OAuthSettings, app
+
+log = logging.getLogger(__name__)
+
+# Serves the web app from a process other than the bot's, talking to the bot
+# over the socket at `web.ipc_socket` in the bot's config. The socket path is
+# passed through the environment, since it's all the worker needs:
+#
+#     DOG_IPC_SOCKET=/run/dog/web.sock hypercorn dog.web.worker:app --workers 4
+#
+# Everything else (the Quart config and the OAuth credentials) is fetched from
+# the bot when the worker starts up. Workers share sessions through
+# `SESSION_DATABASE`, which defaults to a file in the bot's state directory.
+
+app.backend = RemoteBackend(os.environ["DOG_IPC_SOCKET"])  # type: ignore
+
+
+@app.before_serving
+async def configure():
+    config = await app.backend.web_config()  # type: ignore
+    app.config.from_mapping(config["app"])
+    if not app.config.get("SESSION_DATABASE"):
+        # sessions kept in memory would only be known to one worker
+        raise RuntimeError("web workers can't keep sessions in memory")
+    app.oauth = OAuthSettings(**config["oauth"])  # type: ignore
+    app.api_session = create_session()  # type: ignore
+    log.info("web worker %d is serving", os.getpid())
+
+
+@app.after_serving
+async def shut_down():
+    await app.api_session.close()  # type: ignore
+    await app.backend.close()  # type: ignore
@@ -29,6 +29,7 @@
           };
           loadList = [
             "dog.ext.admin"
+            "dog.ext.diagnostics"
             "dog.ext.gatekeeper"
             "dog.ext.info"
             "dog.ext.mod"
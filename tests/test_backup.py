@@ -0,0 +1,143 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from dog import backup
+from dog.backup import InvalidRecord, export_page, import_lines, validate_record
+
+
+@pytest.mark.parametrize(
+    "record, expected",
+    [
+        (
+            {"kind": "config", "guild_id": "1", "config": "editors: [1]"},
+            ("config", "1", "editors: [1]"),
+        ),
+        (
+            {"kind": "quotes", "guild_id": 1, "quotes": {"a": {"content": "hi"}}},
+            ("quotes", "1", {"a": {"content": "hi"}}),
+        ),
+        (
+            {"kind": "timezone", "user_id": "2", "timezone": "Europe/London"},
+            ("timezone", "2", "Europe/London"),
+        ),
+    ],
+)
+def test_valid_records(record, expected):
+    assert validate_record(record) == expected
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        [],
+        {"kind": "nope"},
+        {"kind": "config", "guild_id": "x", "config": ""},
+        {"kind": "config", "guild_id": True, "config": ""},
+        {"kind": "config", "guild_id": "1", "config": "a: [b"},
+        {"kind": "config", "guild_id": "1", "config": "- a list"},
+        {"kind": "quotes", "guild_id": "1", "quotes": {"a": {}}},
+        {"kind": "timezone", "user_id": "2", "timezone": "Not/A_Zone"},
+    ],
+)
+def test_invalid_records(record):
+    with pytest.raises(InvalidRecord):
+        validate_record(record)
+
+
+class FakeStorage:
+    def __init__(self, data):
+        self.data = data
+
+    def all(self):
+        return self.data
+
+
+def make_bot(timezones):
+    cog = SimpleNamespace(timezones=FakeStorage(timezones))
+    return SimpleNamespace(get_cog={"Time": cog}.get)
+
+
+def export_all(bot, kind, limit, *, between_pages=None):
+    records, after = [], None
+    while True:
+        page = export_page(bot, kind, after, limit)
+        records += page["records"]
+        after = page["next"]
+        if after is None:
+            return records
+        if between_pages is not None:
+            between_pages()
+
+
+def test_export_pages_in_order_of_ids():
+    timezones = {str(user_id): "UTC" for user_id in (30, 4, 100, 2, 5)}
+    records = export_all(make_bot(timezones), "timezone", 2)
+    assert [record["user_id"] for record in records] == ["2", "4", "5", "30", "100"]
+
+
+def test_export_isnt_thrown_off_by_deletions():
+    timezones = {str(user_id): "UTC" for user_id in range(1, 11)}
+
+    def delete_first():
+        del timezones[min(timezones, key=int)]
+
+    records = export_all(make_bot(timezones), "timezone", 3, between_pages=delete_first)
+    assert [int(record["user_id"]) for record in records] == list(range(1, 11))
+
+
+def test_export_without_cog():
+    bot = SimpleNamespace(get_cog=lambda name: None)
+    assert export_page(bot, "quotes", None, 10) == {"records": [], "next": None}
+
+
+class FakeBackend:
+    def __init__(self):
+        self.batches = []
+
+    async def import_records(self, records, dry_run):
+        self.batches.append(list(records))
+        errors = [
+            {"index": index, "message": "Nope."}
+            for index, record in enumerate(records)
+            if record.get("bad")
+        ]
+        return {
+            "imported": {"timezone": len(records) - len(errors)},
+            "errors": errors,
+        }
+
+
+def test_import_lines(monkeypatch):
+    monkeypatch.setattr(backup, "IMPORT_BATCH_SIZE", 2)
+    records = [{"kind": "timezone"}, {"bad": True}, {"kind": "timezone"}]
+    lines = [json.dumps(record).encode() for record in records]
+    lines[1:1] = [b"not json", b"  "]
+
+    async def read():
+        for line in lines:
+            yield line
+
+    backend = FakeBackend()
+    report = asyncio.run(import_lines(backend, read()))
+
+    assert [len(batch) for batch in backend.batches] == [2, 1]
+    assert report["imported"]["timezone"] == 2
+    assert report["failed"] == 2
+    assert report["errors"] == [
+        {"line": 2, "message": "Invalid JSON."},
+        {"line": 4, "message": "Nope."},
+    ]
+
+
+def test_split_lines():
+    async def chunks():
+        for chunk in [b"a\nb", b"c\n", b"d"]:
+            yield chunk
+
+    async def collect():
+        return [line async for line in backup.split_lines(chunks())]
+
+    assert asyncio.run(collect()) == [b"a", b"bc", b"d"]
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+from quart import Quart, jsonify
+
+from dog.web.cache import ResponseCache, _Entry, cached
+
+
+def entry(guild_id=None, *, ttl=60.0, body=b"{}"):
+    return _Entry(
+        expires_at=time.monotonic() + ttl,
+        guild_id=guild_id,
+        status=200,
+        headers=(),
+        body=body,
+        etag="etag",
+    )
+
+
+def test_get_and_put():
+    cache = ResponseCache()
+    assert cache.get("a") is None
+
+    cache.put("a", entry())
+    assert cache.get("a").body == b"{}"
+
+
+def test_expired_entries_are_dropped():
+    cache = ResponseCache()
+    cache.put("a", entry(1, ttl=-1))
+
+    assert cache.get("a") is None
+    assert not cache.entries
+    assert not cache.by_guild
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(capacity=2)
+    cache.put("a", entry(1))
+    cache.put("b", entry(1))
+    cache.get("a")
+    cache.put("c", entry(2))
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.by_guild == {1: {"a"}, 2: {"c"}}
+
+
+def test_invalidate():
+    cache = ResponseCache()
+    cache.put("a", entry(1))
+    cache.put("b", entry(2))
+    cache.put("c", entry())
+    generation = cache.generation
+
+    cache.handle_event("invalidate", {"guild_id": "1"})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+    assert cache.generation > generation
+
+    cache.handle_event("reset", None)
+    assert not cache.entries
+
+
+def make_app():
+    app = Quart(__name__)
+    app.response_cache = ResponseCache()
+    app.hits = 0
+
+    @app.route("/guild/<int:guild_id>")
+    @cached(60)
+    async def guild(guild_id):
+        app.hits += 1
+        return jsonify({"id": guild_id, "hits": app.hits})
+
+    @app.route("/missing")
+    @cached(60)
+    async def missing():
+        app.hits += 1
+        return jsonify({"error": True}), 404
+
+    return app
+
+
+def test_cached_route():
+    app = make_app()
+    client = app.test_client()
+
+    async def run():
+        first = await client.get("/guild/1")
+        second = await client.get("/guild/1")
+        assert app.hits == 1
+        assert await first.get_data() == await second.get_data()
+
+        etag = second.headers["ETag"].strip('"')
+        unchanged = await client.get("/guild/1", headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304
+
+        app.response_cache.invalidate(1)
+        third = await client.get("/guild/1")
+        assert app.hits == 2
+        assert (await third.get_json())["hits"] == 2
+
+    asyncio.run(run())
+
+
+def test_errors_are_not_cached():
+    app = make_app()
+    client = app.test_client()
+
+    async def run():
+        await client.get("/missing")
+        await client.get("/missing")
+        assert app.hits == 2
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+from dog.editables import EditableGuilds
+
+
+class Guild:
+    def __init__(self, id, member_ids):
+        self.id = id
+        self.member_ids = set(member_ids)
+
+    def get_member(self, user_id):
+        if user_id in self.member_ids:
+            return SimpleNamespace(id=user_id, guild=self)
+        return None
+
+
+class GuildConfigs:
+    def __init__(self):
+        self.checked = []
+
+    def can_edit(self, user, guild):
+        self.checked.append(guild.id)
+        return guild.id % 2 == 0
+
+
+def make_bot(guilds):
+    def get_user(user_id):
+        mutual = [guild for guild in guilds if guild.get_member(user_id)]
+        return SimpleNamespace(id=user_id, mutual_guilds=mutual) if mutual else None
+
+    return SimpleNamespace(
+        guilds=guilds,
+        guild_configs=GuildConfigs(),
+        add_listener=lambda listener: None,
+        get_user=get_user,
+    )
+
+
+def test_entries_are_seeded_from_mutual_guilds():
+    guilds = [Guild(1, [5]), Guild(2, [5]), Guild(4, [6])]
+    bot = make_bot(guilds)
+    editables = EditableGuilds(bot)
+
+    assert editables.get(bot.get_user(5)) == {2}
+    assert sorted(bot.guild_configs.checked) == [1, 2]
+
+
+def test_entries_follow_members_leaving_and_joining():
+    guilds = [Guild(2, [5]), Guild(4, [5])]
+    bot = make_bot(guilds)
+    editables = EditableGuilds(bot)
+    user = bot.get_user(5)
+    assert editables.get(user) == {2, 4}
+
+    guilds[0].member_ids.discard(5)
+    asyncio.run(editables.on_member_remove(SimpleNamespace(id=5, guild=guilds[0])))
+    assert editables.get(user) == {4}
+
+    guilds[0].member_ids.add(5)
+    asyncio.run(editables.on_member_join(SimpleNamespace(id=5, guild=guilds[0])))
+    assert editables.get(user) == {2, 4}
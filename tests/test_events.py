@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from dog.web.events import Broadcaster, format_event
+
+
+def test_format_event():
+    assert format_event("ping", {"a": 1}) == b'event: ping\ndata: {"a": 1}\n\n'
+
+
+def test_events_go_to_the_guilds_subscribers():
+    async def run():
+        broadcaster = Broadcaster()
+        first = broadcaster.subscribe(1)
+        second = broadcaster.subscribe(2)
+
+        data = {"guild_id": "1"}
+        broadcaster.handle_event("guild_config_edit", data)
+        broadcaster.handle_event("invalidate", data)
+
+        assert await first.get(timeout=1) == ("guild_config_edit", data)
+        assert await first.get(timeout=0.01) is None
+        assert await second.get(timeout=0.01) is None
+
+    asyncio.run(run())
+
+
+def test_slow_subscribers_are_dropped():
+    async def run():
+        broadcaster = Broadcaster(max_pending=2)
+        subscription = broadcaster.subscribe(1)
+
+        for _ in range(3):
+            broadcaster.handle_event("gatekeeper_decision", {"guild_id": 1})
+
+        assert subscription.closed
+        assert not broadcaster.subscriptions
+        # what was queued before is still delivered
+        assert await subscription.get(timeout=1) is not None
+        assert await subscription.get(timeout=1) is not None
+        with pytest.raises(EOFError):
+            await subscription.get(timeout=1)
+
+    asyncio.run(run())
+
+
+def test_reset_closes_everything():
+    async def run():
+        broadcaster = Broadcaster()
+        subscriptions = [broadcaster.subscribe(guild_id) for guild_id in (1, 1, 2)]
+
+        broadcaster.handle_event("reset", None)
+
+        assert not broadcaster.subscriptions
+        for subscription in subscriptions:
+            with pytest.raises(EOFError):
+                await subscription.get(timeout=1)
+
+    asyncio.run(run())
+
+
+def test_close_unsubscribes():
+    async def run():
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe(1)
+        subscription.close()
+        subscription.close()
+
+        assert not broadcaster.subscriptions
+        subscription.push("guild_config_edit", {})
+        with pytest.raises(EOFError):
+            await subscription.get(timeout=1)
+
+    asyncio.run(run())
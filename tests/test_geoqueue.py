@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from dog.ext.time.geoqueue import GeocodeQueue
+
+
+def test_requests_are_dropped_when_on_queued_raises():
+    async def run():
+        queue = GeocodeQueue(str.upper, loop=asyncio.get_running_loop())
+        # keep anything from being sent for now
+        queue._next_at = queue.loop.time() + 60
+
+        async def on_queued(position, eta):
+            raise RuntimeError("can't tell the user")
+
+        with pytest.raises(RuntimeError):
+            await queue.geocode("somewhere", on_queued=on_queued)
+
+        assert not queue.queue
+        assert not queue.pending
+        queue.close()
+
+    asyncio.run(run())
+
+
+def test_shared_requests_outlive_one_waiter():
+    async def run():
+        queue = GeocodeQueue(str.upper, loop=asyncio.get_running_loop())
+        queue._next_at = queue.loop.time() + 0.05
+
+        first = asyncio.ensure_future(queue.geocode("somewhere"))
+        second = asyncio.ensure_future(queue.geocode("somewhere"))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "SOMEWHERE"
+        queue.close()
+
+    asyncio.run(run())
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+from dog.guild_config import NO_EDITORS, GuildConfigManager, compile_editors
+
+GUILD_ID = 100
+OWNER_ID = 1
+ROLE_ID = 200
+
+
+def test_compile_editors_without_config():
+    assert compile_editors(None) is None
+    assert compile_editors("not a mapping") == NO_EDITORS
+    assert compile_editors({}) == NO_EDITORS
+
+
+def test_compile_editors_list():
+    editors = compile_editors({"editors": [5, "someone#1234", True, 6.0]})
+    assert editors.user_ids == {5}
+    assert editors.role_ids == {5}
+    assert editors.tags == {"someone#1234"}
+
+
+def test_compile_editors_single_id():
+    editors = compile_editors({"editors": 5})
+    assert editors.user_ids == {5}
+    assert not editors.role_ids
+    assert compile_editors({"editors": True}) == NO_EDITORS
+
+
+class User:
+    def __init__(self, id, tag="user#0001"):
+        self.id = id
+        self.tag = tag
+
+    def __str__(self):
+        return self.tag
+
+
+def make_guild(*members):
+    by_id = {member.id: member for member in members}
+    return SimpleNamespace(id=GUILD_ID, owner_id=OWNER_ID, get_member=by_id.get)
+
+
+def make_member(user_id, role_ids=(), *, ban_members=False):
+    return SimpleNamespace(
+        id=user_id,
+        _roles=set(role_ids),
+        guild_permissions=SimpleNamespace(ban_members=ban_members),
+    )
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return GuildConfigManager(bot=None)
+
+
+def test_owner_can_always_edit(manager):
+    guild = make_guild()
+    assert manager.can_edit(User(OWNER_ID), guild, with_config={"editors": []})
+
+
+def test_can_edit_by_id_and_tag(manager):
+    guild = make_guild(make_member(2), make_member(3))
+    config = {"editors": [2, "three#0003"]}
+
+    assert manager.can_edit(User(2), guild, with_config=config)
+    assert manager.can_edit(User(3, "three#0003"), guild, with_config=config)
+    assert not manager.can_edit(User(4), guild, with_config=config)
+
+
+def test_can_edit_by_role(manager):
+    guild = make_guild(make_member(2, [ROLE_ID]), make_member(3, [ROLE_ID + 1]))
+    config = {"editors": [ROLE_ID]}
+
+    assert manager.can_edit(User(2), guild, with_config=config)
+    assert not manager.can_edit(User(3), guild, with_config=config)
+
+
+def test_can_edit_by_everyone_role(manager):
+    # members' roles don't include @everyone, whose ID is the guild's
+    guild = make_guild(make_member(2))
+    config = {"editors": [GUILD_ID]}
+
+    assert manager.can_edit(User(2), guild, with_config=config)
+    # only members have the @everyone role
+    assert not manager.can_edit(User(3), guild, with_config=config)
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from quart import Quart
+
+from dog.web.ratelimit import MemoryBackend, SQLiteBackend, client_address
+
+
+def take_many(backend, key, count, rate=3, per=60.0):
+    async def take():
+        return [await backend.take(key, rate, per) for _ in range(count)]
+
+    return asyncio.run(take())
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "ratelimits.db"))
+
+
+def test_allows_up_to_rate(backend):
+    decisions = take_many(backend, "a", 4)
+    assert [allowed for allowed, _ in decisions] == [True, True, True, False]
+
+    # a token comes back every 20 seconds
+    _, retry_after = decisions[-1]
+    assert 0 < retry_after <= 20
+
+
+def test_keys_are_separate(backend):
+    take_many(backend, "a", 3)
+    assert take_many(backend, "b", 1) == [(True, 0.0)]
+
+
+def test_refills(backend):
+    take_many(backend, "a", 2, rate=2, per=0.1)
+    assert not take_many(backend, "a", 1, rate=2, per=0.1)[0][0]
+
+    asyncio.run(asyncio.sleep(0.1))
+    assert take_many(backend, "a", 1, rate=2, per=0.1)[0][0]
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(capacity=10)
+    for key in range(100):
+        take_many(backend, str(key), 1)
+
+    assert len(backend.buckets) == 10
+    assert list(backend.buckets) == [str(key) for key in range(90, 100)]
+
+
+def test_sqlite_backends_share_buckets(tmp_path):
+    path = str(tmp_path / "ratelimits.db")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+
+    take_many(first, "a", 3)
+    assert not take_many(second, "a", 1)[0][0]
+
+
+def address(headers=None, **config):
+    app = Quart(__name__)
+    app.config.update(config)
+
+    async def get():
+        async with app.test_request_context("/", headers=headers or {}):
+            return client_address()
+
+    return asyncio.run(get())
+
+
+def test_client_address_ignores_forwarded_for_by_default():
+    assert address({"X-Forwarded-For": "1.2.3.4"}) != "1.2.3.4"
+
+
+def test_client_address_with_trusted_proxies():
+    headers = {"X-Forwarded-For": "6.6.6.6, 1.2.3.4, 10.0.0.1"}
+    assert address(headers, RATELIMIT_TRUSTED_PROXIES=1) == "10.0.0.1"
+    assert address(headers, RATELIMIT_TRUSTED_PROXIES=2) == "1.2.3.4"
+    # there are never more proxies than hops
+    assert address(headers, RATELIMIT_TRUSTED_PROXIES=5) == "6.6.6.6"
@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+import pytest
+
+from dog.web.sessions import Session, SessionStore
+
+TOKEN = {"access_token": "access", "refresh_token": "refresh", "expires_in": 3600}
+
+
+def create_session():
+    return Session.create({"id": "5", "username": "someone"}, TOKEN)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_session_tokens():
+    session = create_session()
+    assert session.user_id == 5
+    assert not session.token_needs_refresh(60)
+    assert session.token_needs_refresh(2 * 3600)
+
+    session.update_token({"access_token": "new", "expires_in": 10})
+    assert session.access_token == "new"
+    # Discord doesn't always send a new refresh token
+    assert session.refresh_token == "refresh"
+
+    loaded = Session.load(session.id, session.dump())
+    assert loaded.user == session.user
+    assert loaded.token_expires_at == session.token_expires_at
+
+
+def test_memory_store():
+    async def run():
+        store = SessionStore(capacity=2)
+        sessions = [create_session() for _ in range(3)]
+        for session in sessions:
+            await store.save(session)
+
+        # least recently used first out
+        assert await store.get(sessions[0].id) is None
+        assert await store.get(sessions[2].id) is sessions[2]
+
+        assert await store.delete(sessions[2].id)
+        assert await store.get(sessions[2].id) is None
+
+    asyncio.run(run())
+
+
+def test_expired_sessions(path):
+    async def run():
+        store = SessionStore(path)
+        session = create_session()
+        session.expires_at = time.time() - 1
+        await store.save(session)
+
+        assert await store.get(session.id) is None
+        assert await SessionStore(path).get(session.id) is None
+
+    asyncio.run(run())
+
+
+def test_stores_share_sessions(path):
+    async def run():
+        first, second = SessionStore(path), SessionStore(path, cache_ttl=0)
+        session = create_session()
+        await first.save(session)
+
+        loaded = await second.get(session.id)
+        assert loaded.access_token == "access"
+
+        await first.delete(session.id)
+        assert await second.get(session.id) is None
+
+    asyncio.run(run())
+
+
+def test_session_ids_are_not_stored(path):
+    async def run():
+        session = create_session()
+        await SessionStore(path).save(session)
+
+        with open(path, "rb") as fp:
+            assert session.id.encode() not in fp.read()
+
+    asyncio.run(run())
+
+
+def test_fresh_get_skips_the_cache(path):
+    async def run():
+        first, second = SessionStore(path), SessionStore(path)
+        session = create_session()
+        await first.save(session)
+        cached = await second.get(session.id)
+
+        session.update_token({"access_token": "new", "refresh_token": "new"})
+        await first.save(session)
+
+        assert (await second.get(session.id)).refresh_token == "refresh"
+        fresh = await second.get(session.id, fresh=True)
+        assert fresh.refresh_token == "new"
+        # what's only kept in memory carries over
+        assert fresh.refresh_lock is cached.refresh_lock
+
+    asyncio.run(run())
+
+
+def test_refresh_claims(path):
+    async def run():
+        first, second = SessionStore(path), SessionStore(path)
+        session = create_session()
+        await first.save(session)
+
+        assert await first.claim_refresh(session.id)
+        assert not await second.claim_refresh(session.id)
+        await first.release_refresh(session.id)
+        assert await second.claim_refresh(session.id)
+
+        expiring = SessionStore(path, refresh_lease=-1)
+        other = create_session()
+        await expiring.save(other)
+        assert await expiring.claim_refresh(other.id)
+        assert await second.claim_refresh(other.id)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("database", [True, False])
+def test_delete_only_if_token_unchanged(path, database):
+    async def run():
+        store = SessionStore(path if database else None)
+        session = create_session()
+        await store.save(session)
+
+        assert not await store.delete(session.id, refresh_token="rotated")
+        assert await store.get(session.id, fresh=True) is not None
+
+        assert await store.delete(session.id, refresh_token="refresh")
+        assert await store.get(session.id, fresh=True) is None
+
+    asyncio.run(run())
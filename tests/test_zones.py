@@ -0,0 +1,31 @@
+import datetime
+
+import dateutil.tz
+
+from dog.ext.time.zones import get_zone
+
+
+def test_tz_database_names():
+    zone = get_zone("Europe/Berlin")
+    assert zone is not None
+    summer = datetime.datetime(2024, 7, 1, 12, tzinfo=zone)
+    assert summer.utcoffset() == datetime.timedelta(hours=2)
+
+
+def test_fallback_to_dateutil():
+    zone = get_zone("UTC+3")
+    assert isinstance(zone, dateutil.tz.tzstr)
+    # unlike POSIX TZ strings, dateutil reads this the way people mean it
+    offset = datetime.datetime(2024, 1, 1, tzinfo=zone).utcoffset()
+    assert offset == datetime.timedelta(hours=3)
+
+
+def test_unknown_names():
+    assert get_zone("Not/A_Zone") is None
+    assert get_zone("../../etc/passwd") is None
+
+
+def test_cached():
+    get_zone.cache_clear()
+    assert get_zone("Asia/Tokyo") is get_zone("Asia/Tokyo")
+    assert get_zone.cache_info().hits == 1
@@ -43,6 +43,7 @@ export default class GuildConfig extends Component {
     lint: null,
     saved: false,
     saving: false,
+    dirty: false,
     config: '',
   }
 
@@ -61,10 +62,29 @@ export default class GuildConfig extends Component {
 
     this.setState({ guild, config: config || '' })
     window.addEventListener('keydown', this.handleKeydown)
+
+    this.events = new window.EventSource(`/api/guild/${this.guildId}/events`, {
+      withCredentials: true,
+    })
+    this.events.addEventListener('guild_config_edit', this.handleRemoteEdit)
   }
 
   componentWillUnmount() {
     window.removeEventListener('keydown', this.handleKeydown)
+
+    if (this.events != null) {
+      this.events.close()
+    }
+  }
+
+  handleRemoteEdit = (event) => {
+    // don't clobber unsaved changes
+    if (this.state.dirty) {
+      return
+    }
+
+    const { config } = JSON.parse(event.data)
+    this.setState({ config: config || '' })
   }
 
   handleKeydown = (event) => {
@@ -76,7 +96,7 @@ export default class GuildConfig extends Component {
   }
 
   handleConfigChange = async (config) => {
-    this.setState({ config, saved: false })
+    this.setState({ config, saved: false, dirty: true })
 
     try {
       await validate(config)
@@ -108,7 +128,7 @@ export default class GuildConfig extends Component {
       return
     }
 
-    this.setState({ saved: true, error: null, saving: false })
+    this.setState({ saved: true, error: null, saving: false, dirty: false })
   }
 
   render() {